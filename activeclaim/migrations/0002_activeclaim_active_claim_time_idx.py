@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activeclaim', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activeclaim',
+            index=models.Index(fields=['claim_time'], name='active_claim_time_idx'),
+        ),
+    ]
@@ -8,6 +8,11 @@ class ActiveClaim(models.Model):
 
     claim_time = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['claim_time'], name='active_claim_time_idx'),
+        ]
+
 
     def __str__(self):
         return f"ID: {self.pk}, Casenum: {self.casenum}, User ID: {self.user_id.email}, Claim Time: {self.claim_time}"
@@ -1,3 +1,112 @@
-from django.test import TestCase
+from django.contrib.auth.models import User, Group
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from rest_framework.test import APITestCase, APIClient
+
+from activeclaim.models import ActiveClaim
+from activeclaim.serializers import ActiveClaimSerializer
+from events import changelog
+from events.models import ClaimChange
+from user.decorators import _group_cache
+
+
+class ActiveClaimSerializerTest(TestCase):
+    def test_values_data_matches_model_serializer(self):
+        user = User.objects.create_user(username='tech', password='pw', first_name='Ada', last_name='Lovelace')
+        ActiveClaim.objects.create(casenum='11111111', user_id=user)
+        ActiveClaim.objects.create(casenum='22222222', user_id=user)
+
+        claims = ActiveClaim.objects.order_by('id')
+        expected = [dict(row) for row in ActiveClaimSerializer(claims, many=True).data]
+        self.assertEqual(ActiveClaimSerializer.values_data(claims), expected)
+
+
+class ListActiveClaimsQueryCountTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.tech = User.objects.create_user(username='tech', password='pw')
+        self.tech.groups.add(Group.objects.get(name='Tech'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.tech)
+
+    def _add_claims(self, count):
+        start = ActiveClaim.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create(username=f'user{i}')
+            ActiveClaim.objects.create(casenum=f'{i:08d}', user_id=user)
+
+    def test_query_count_independent_of_rows(self):
+        self.client.get('/api/activeclaim/list/')  # warm the role cache
+
+        self._add_claims(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/activeclaim/list/')
+        self.assertEqual(len(response.data), 3)
+
+        self._add_claims(30)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/activeclaim/list/')
+        self.assertEqual(len(response.data), 33)
+        self.assertEqual(response.data[0]['user_name'], 'user0')
+
+
+class ActiveClaimDeltaTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.tech = User.objects.create(username='tech')
+        self.tech.groups.add(Group.objects.get(name='Tech'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.tech)
+
+    def _since(self, version):
+        response = self.client.get('/api/activeclaim/list/', {'since': version})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_delta_since_version(self):
+        self.client.post('/api/activeclaim/create/11111111/')
+        snapshot = self._since(0)
+        self.assertTrue(snapshot['reset'])
+        self.assertEqual([row['casenum'] for row in snapshot['changed']], ['11111111'])
+        first = ActiveClaim.objects.get(casenum='11111111')
+
+        self.client.post('/api/activeclaim/create/22222222/')
+        self.client.post('/api/activeclaim/create/33333333/')
+        self.client.delete('/api/activeclaim/unclaim/33333333/')
+        self.client.delete('/api/activeclaim/complete/11111111/')
+
+        # change log + changed rows
+        with self.assertNumQueries(2):
+            delta = self._since(snapshot['version'])
+        self.assertFalse(delta['reset'])
+        self.assertEqual([row['casenum'] for row in delta['changed']], ['22222222'])
+        self.assertEqual(len(delta['deleted']), 2)
+        self.assertIn(first.id, delta['deleted'])
+        self.assertGreater(delta['version'], snapshot['version'])
+
+        with self.assertNumQueries(1):
+            unchanged = self._since(delta['version'])
+        self.assertEqual(unchanged, {'version': delta['version'], 'reset': False, 'changed': [], 'deleted': []})
+
+    def test_unknown_version_gets_snapshot(self):
+        self.client.post('/api/activeclaim/create/11111111/')
+        version = self._since(0)['version']
+        self.assertTrue(self._since(version + 1)['reset'])
+
+        changelog.reset()
+        self.client.post('/api/activeclaim/create/22222222/')
+        stale = self._since(version)
+        self.assertTrue(stale['reset'])
+        self.assertEqual(len(stale['changed']), 2)
+
+        response = self.client.get('/api/activeclaim/list/', {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CLAIM_CHANGELOG_SIZE=10)
+    def test_pruned_version_gets_snapshot(self):
+        self.client.post('/api/activeclaim/create/00000000/')
+        version = self._since(0)['version']
+        for i in range(1, changelog.PRUNE_INTERVAL + 1):
+            changelog.record(ClaimChange.ACTIVE, i)
+        self.assertLessEqual(ClaimChange.objects.count(), changelog.PRUNE_INTERVAL)
+        self.assertTrue(self._since(version)['reset'])
@@ -1,20 +1,24 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from django.db import IntegrityError, transaction
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from api.broadcast import CLAIMS, publish
 
 from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from user.authentication import CachedTokenAuthentication
 from user.decorators import group_required, role_required
 
 from activeclaim.models import ActiveClaim
 from activeclaim.serializers import ActiveClaimSerializer
 from completeclaim.models import CompleteClaim
 from completeclaim.serializers import CompleteClaimSerializer
+from caselookup import caseindex
+from events import changelog
+from events.models import ClaimChange
 
 
 @api_view(['GET'])
@@ -42,83 +46,96 @@ def get_routes(request):
             'Endpoint': '/list/',
             'method': 'GET',
             'body': None,
-            'description': 'Lists all active claims.'
+            'query_params': {'since': 'version from the previous response (0 for a full snapshot)'},
+            'description': 'Lists all active claims, or with since only those changed after that version.'
         },
     ]
     return Response(routes)
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Tech')  # Tech and above (hierarchical)
 def create_active_claim(request, pk):
-    if ActiveClaim.objects.filter(casenum=pk).exists():
+    # casenum is unique, so the insert itself decides who gets the claim
+    try:
+        with transaction.atomic():
+            claim = ActiveClaim.objects.create(user_id=request.user, casenum=pk)
+            caseindex.sync_case(claim.casenum)
+            changelog.record(ClaimChange.ACTIVE, claim.pk)
+    except IntegrityError:
         return Response("Casenum already exists.", status=400)
-    
-    claim = ActiveClaim.objects.create(user_id=request.user, casenum=pk)
 
     serializer = ActiveClaimSerializer(claim)
 
     # Notify WebSocket
-    async_to_sync(get_channel_layer().group_send)(
-        "caseflow",
-        {
-            "type": "activeclaim",
-            "event": "claim",
-            "casenum": claim.casenum,
-            "user": claim.user_id.username
-        }
-    )
+    publish({
+        "type": "activeclaim",
+        "event": "claim",
+        "casenum": claim.casenum,
+        "user": claim.user_id.username
+    }, CLAIMS)
 
     return Response(serializer.data, status=status.HTTP_201_CREATED)
     
 @api_view(['DELETE'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Tech')  # Tech and above (hierarchical)
 def complete_active_claim(request, pk):
     try:
-        claim = ActiveClaim.objects.get(casenum=pk)
-
-        new_claim = CompleteClaim.objects.create(
-            casenum=claim.casenum,
-            user_id=claim.user_id,
-            claim_time=claim.claim_time
-        )
-        claim.delete()
+        claim = ActiveClaim.objects.select_related('user_id').get(casenum=pk)
+
+        with transaction.atomic():
+            # Only the request that removes the active claim moves it on;
+            # a concurrent complete/unclaim that got there first wins.
+            if not ActiveClaim.objects.filter(pk=claim.pk).delete()[0]:
+                raise ActiveClaim.DoesNotExist
+            new_claim = CompleteClaim.objects.create(
+                casenum=claim.casenum,
+                user_id=claim.user_id,
+                claim_time=claim.claim_time
+            )
+            changelog.record(ClaimChange.ACTIVE, claim.pk)
+            changelog.record(ClaimChange.COMPLETE, new_claim.pk)
+            caseindex.sync_case(claim.casenum)
 
         serializer = CompleteClaimSerializer(new_claim)
 
         # Notify WebSocket
-        async_to_sync(get_channel_layer().group_send)(
-            "caseflow",
-            {
-                "type": "activeclaim",
-                "event": "complete",
-                "casenum": claim.casenum,
-                "user": claim.user_id.username
-            }
-        )
+        publish({
+            "type": "activeclaim",
+            "event": "complete",
+            "casenum": claim.casenum,
+            "user": claim.user_id.username
+        }, CLAIMS)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     except ActiveClaim.DoesNotExist:
         return Response({'error': 'Claim not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Tech')  # Tech and above (hierarchical)
 def list_active_claims(request):
     claims = ActiveClaim.objects.all()
-    serializer = ActiveClaimSerializer(claims, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    since = request.query_params.get('since')
+    if since is None:
+        return Response(ActiveClaimSerializer.values_data(claims), status=status.HTTP_200_OK)
+    
+    try:
+        data = changelog.delta(ClaimChange.ACTIVE, claims, since, ActiveClaimSerializer.values_data)
+    except ValueError:
+        return Response({'error': 'since must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data, status=status.HTTP_200_OK)
 
 @api_view(['DELETE'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def unclaim_active_claim(request, pk):
     try:
-        claim = ActiveClaim.objects.get(casenum=pk)
+        claim = ActiveClaim.objects.select_related('user_id').get(casenum=pk)
 
         # Check permissions: Lead+ can unclaim any, Techs can only unclaim their own
         from user.decorators import get_user_highest_role_level, ROLE_HIERARCHY
@@ -130,18 +147,20 @@ def unclaim_active_claim(request, pk):
         if not (is_lead_or_above or is_owner):
             return Response({'error': 'Permission denied. You can only unclaim your own cases.'}, status=status.HTTP_403_FORBIDDEN)
 
-        claim.delete()
+        with transaction.atomic():
+            # Delete the claim that was checked above, if it is still there
+            if not ActiveClaim.objects.filter(pk=claim.pk).delete()[0]:
+                raise ActiveClaim.DoesNotExist
+            changelog.record(ClaimChange.ACTIVE, claim.pk)
+            caseindex.sync_case(claim.casenum)
 
         # Notify WebSocket
-        async_to_sync(get_channel_layer().group_send)(
-            "caseflow",
-            {
-                "type": "activeclaim",
-                "event": "unclaimed",
-                "casenum": claim.casenum,
-                "user": claim.user_id.username
-            }
-        )
+        publish({
+            "type": "activeclaim",
+            "event": "unclaimed",
+            "casenum": claim.casenum,
+            "user": claim.user_id.username
+        }, CLAIMS)
 
         return Response({'message': 'Claim successfully unclaimed.'}, status=status.HTTP_204_NO_CONTENT)
     except ActiveClaim.DoesNotExist:
@@ -2,15 +2,27 @@ import os
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 from channels.auth import AuthMiddlewareStack
-import api.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
+# Set up Django before importing the consumers, which use models
+django_asgi_app = get_asgi_application()
+
+import api.routing
+from evaluation import jobs
+from user.authentication import QueryTokenAuthMiddleware
+
+# Only server processes load this module, so export jobs are recovered here
+# rather than in an AppConfig (which manage.py commands and tests also run)
+jobs.recover()
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            api.routing.websocket_urlpatterns
+        QueryTokenAuthMiddleware(
+            URLRouter(
+                api.routing.websocket_urlpatterns
+            )
         )
     ),
 })
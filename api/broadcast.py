@@ -0,0 +1,126 @@
+"""
+Publishing caseflow events to WebSocket clients.
+
+Views call publish() with the event dict clients receive. The event is
+serialized to JSON once here and travels through the channel layer as text,
+so each Consumer only forwards (and batches) strings instead of running
+json.dumps for every connected client.
+
+Each event is published on a topic, and only reaches the clients allowed to
+see it (see subscriptions()): claim queue changes go to everyone, reviews to
+Lead and above, and pings and export jobs only to the user they concern.
+
+Every event is also stored as a CaseflowEvent, whose id becomes the event's
+"seq". A client that reconnects with the last seq it saw gets the events it
+missed from replay(), as long as that event is still in the buffer.
+
+seq is global, so a client's own events skip the numbers of events it may
+not see, and events published by different server processes can arrive
+slightly out of seq order. The highest seq a client has seen is therefore
+not a safe resume point: it should resume from a seq a little behind it and
+drop events it already has, as websocket_listener_demo.py does.
+"""
+
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from events.models import CaseflowEvent
+from user.decorators import ROLE_HIERARCHY, get_user_highest_role_level
+
+# Topics clients can subscribe to with ?topics=a,b
+CLAIMS = "claims"    # active/complete queue changes: every client
+REVIEWS = "reviews"  # reviews starting and finishing: Lead and above
+PINGS = "pings"      # pings raised, acknowledged or resolved: the tech (or lead) involved
+EXPORTS = "exports"  # export jobs finishing: the user who requested them
+TOPICS = (CLAIMS, REVIEWS, PINGS, EXPORTS)
+
+# Topics delivered per user rather than to everyone allowed to subscribe
+USER_TOPICS = (PINGS, EXPORTS)
+
+# Sent instead of a replay when the client is too far behind; it should
+# re-fetch the list endpoints.
+RESYNC = '{"type":"resync"}'
+
+# Trim the buffer on every Nth event rather than on each publish
+PRUNE_INTERVAL = 100
+
+
+def _with_seq(payload, seq):
+    """Add "seq" to an already serialized event."""
+    return f'{payload[:-1]},"seq":{seq}}}'
+
+
+def group_name(topic, user_id=None):
+    """Channel layer group carrying a topic (for one user, for per-user topics)."""
+    if topic in USER_TOPICS:
+        return f"caseflow.{topic}.{user_id}"
+    return f"caseflow.{topic}"
+
+
+def subscriptions(user, topics=None):
+    """
+    Groups a ws/caseflow/ client may join, limited to the requested topics
+    (all permitted topics when topics is None). Anonymous clients only get
+    the claim queues.
+    """
+    allowed = [CLAIMS]
+    if user is not None and user.is_authenticated:
+        if get_user_highest_role_level(user) >= ROLE_HIERARCHY['Lead']:
+            allowed.append(REVIEWS)
+        allowed += USER_TOPICS
+        user_id = user.pk
+    else:
+        user_id = None
+    return [
+        group_name(topic, user_id)
+        for topic in allowed
+        if topics is None or topic in topics
+    ]
+
+
+def publish(event, topic, user_id=None):
+    """
+    Record an event and send it to the clients subscribed to topic
+    (user_id picks the recipient of per-user topics).
+    """
+    group = group_name(topic, user_id)
+    payload = json.dumps(event, separators=(',', ':'))
+    seq = CaseflowEvent.objects.create(group=group, payload=payload).pk
+    if seq % PRUNE_INTERVAL == 0:
+        CaseflowEvent.objects.filter(pk__lte=seq - settings.CASEFLOW_REPLAY_BUFFER).delete()
+
+    async_to_sync(get_channel_layer().group_send)(
+        group,
+        {
+            "type": "caseflow.event",
+            "seq": seq,
+            "text": _with_seq(payload, seq),
+        }
+    )
+    return seq
+
+
+def replay(last_seq, groups):
+    """
+    Events in groups published after last_seq, as (seq, text) pairs in order.
+
+    Returns None when last_seq is no longer buffered (pruned, or from before
+    a database reset), in which case the client has to resync.
+    """
+    rows = list(
+        CaseflowEvent.objects
+        .filter(pk__gte=last_seq)
+        .order_by('pk')
+        .values_list('pk', 'group', 'payload')
+    )
+    if not rows or rows[0][0] != last_seq:
+        return None
+    groups = set(groups)
+    return [
+        (seq, _with_seq(payload, seq))
+        for seq, group, payload in rows[1:]
+        if group in groups
+    ]
@@ -1,16 +1,88 @@
-import json
+import asyncio
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from api.broadcast import RESYNC, TOPICS, replay, subscriptions
+
+
+def _frame(texts):
+    if len(texts) == 1:
+        return texts[0]
+    # Join the pre-serialized events; nothing is re-encoded per client
+    return '{"type":"batch","events":[' + ','.join(texts) + ']}'
+
 
 class Consumer(AsyncWebsocketConsumer):
+    """
+    Streams caseflow events to a browser.
+
+    Events arrive already serialized (see api.broadcast.publish) and are held
+    for CASEFLOW_BATCH_WINDOW seconds so a burst goes out as one frame. A
+    window with a single event sends it unchanged; otherwise the frame is
+    {"type": "batch", "events": [...]} with the events in the order sent.
+
+    Each event carries a "seq". Connecting to ws/caseflow/?last_seq=N first
+    sends the events after N (one frame), or {"type": "resync"} if N has
+    already dropped out of the replay buffer.
+
+    Clients only join the groups their user may see (api.broadcast.subscriptions),
+    optionally narrowed with ?topics=claims,pings.
+    """
+
     async def connect(self):
-        await self.channel_layer.group_add("caseflow", self.channel_name)
+        self.pending = []
+        self.flush_task = None
+        self.replayed = set()
+
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        topics = None
+        if 'topics' in params:
+            topics = {topic for value in params['topics'] for topic in value.split(',') if topic in TOPICS}
+        self.subscriptions = await database_sync_to_async(subscriptions)(self.scope.get('user'), topics)
+
+        # Join before reading the buffer so nothing published in between is
+        # lost; events received during the replay are dropped as duplicates.
+        for group in self.subscriptions:
+            await self.channel_layer.group_add(group, self.channel_name)
         await self.accept()
 
+        if params.get('last_seq'):
+            await self.resume(params['last_seq'][-1])
+
+    async def resume(self, last_seq):
+        try:
+            missed = await database_sync_to_async(replay)(int(last_seq), self.subscriptions)
+        except ValueError:
+            missed = None
+        if missed is None:
+            await self.send(text_data=RESYNC)
+        elif missed:
+            self.replayed = {seq for seq, _ in missed}
+            await self.send(text_data=_frame([text for _, text in missed]))
+
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("caseflow", self.channel_name)
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        for group in getattr(self, 'subscriptions', ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def caseflow_event(self, event):
+        if event['seq'] in self.replayed:
+            self.replayed.discard(event['seq'])
+            return
+        window = settings.CASEFLOW_BATCH_WINDOW
+        if window <= 0:
+            await self.send(text_data=event['text'])
+            return
+        self.pending.append(event['text'])
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_after(window))
 
-    async def activeclaim(self, event):
-        await self.send(text_data=json.dumps(event))
-    
-    async def completeclaim(self, event):
-        await self.send(text_data=json.dumps(event))
+    async def flush_after(self, window):
+        await asyncio.sleep(window)
+        texts, self.pending = self.pending, []
+        self.flush_task = None
+        await self.send(text_data=_frame(texts))
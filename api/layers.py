@@ -0,0 +1,168 @@
+"""
+Channel layer for running several Daphne processes on one host without Redis.
+
+InMemoryChannelLayer only reaches consumers in the process that sent the
+event. UnixSocketChannelLayer keeps the same in-memory queues and groups, and
+links the processes with Unix datagram sockets in a shared directory:
+
+- Every process with consumers binds `<path>/<process id>.sock` and names its
+  channels `specific.<process id>!<random>`, so a send to another process's
+  channel is a single datagram to that process's socket.
+- Group membership stays local. group_send delivers to local members and
+  forwards one datagram to every other socket in the directory, whose reader
+  delivers it to that process's members.
+
+Messages are JSON encoded, so they must be JSON serializable (the caseflow
+events are). A message too large for one datagram (about 200 KB, the socket
+send buffer) reaches local consumers only and is logged. Sockets of
+processes that died are removed the first time a send to them is refused.
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import random
+import socket
+import string
+import time
+import uuid
+
+from channels.layers import InMemoryChannelLayer
+
+logger = logging.getLogger(__name__)
+
+
+class UnixSocketChannelLayer(InMemoryChannelLayer):
+
+    def __init__(self, path='/tmp/caseflow-channels', **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.process_id = uuid.uuid4().hex[:12]
+        self.socket_name = f"{self.process_id}.sock"
+        os.makedirs(path, mode=0o700, exist_ok=True)
+
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        # No datagram larger than the send buffer can be sent, so reading
+        # this much never truncates one
+        self.max_datagram = self._sender.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        self._reader = None
+        self._reader_loop = None
+        atexit.register(self._stop_reader)
+
+    # Channel layer API
+
+    async def new_channel(self, prefix="specific."):
+        self._ensure_reader()
+        return "%s%s!%s" % (
+            prefix,
+            self.process_id,
+            "".join(random.choice(string.ascii_letters) for i in range(12)),
+        )
+
+    async def send(self, channel, message):
+        owner = self._channel_owner(channel)
+        if owner is None or owner == self.process_id:
+            return await super().send(channel, message)
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        self._send_datagram(f"{owner}.sock", self._encode({'channel': channel, 'message': message}))
+
+    async def group_send(self, group, message):
+        await super().group_send(group, message)
+        payload = self._encode({'group': group, 'message': message})
+        for name in os.listdir(self.path):
+            if name.endswith('.sock') and name != self.socket_name:
+                self._send_datagram(name, payload)
+
+    async def close(self):
+        self._stop_reader()
+
+    # Sockets
+
+    def _channel_owner(self, channel):
+        """Process id of a specific channel created by new_channel(), else None."""
+        if '!' not in channel:
+            return None
+        return channel.split('!', 1)[0].rsplit('.', 1)[-1]
+
+    def _encode(self, data):
+        return json.dumps(data, separators=(',', ':')).encode()
+
+    def _send_datagram(self, name, payload):
+        try:
+            self._sender.sendto(payload, os.path.join(self.path, name))
+        except ConnectionRefusedError:
+            # Nobody is reading: the process that bound it has exited
+            try:
+                os.unlink(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+        except (FileNotFoundError, BlockingIOError):
+            # Peer gone, or its receive buffer is full - drop like ChannelFull
+            pass
+        except OSError as e:
+            # e.g. EMSGSIZE or ENOBUFS. Views send right after committing, so
+            # drop the message rather than fail a request whose write succeeded
+            logger.warning("Dropped %d byte message to %s: %s", len(payload), name, e)
+
+    def _ensure_reader(self):
+        """Bind this process's socket and read it on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._reader_loop is loop:
+            return
+        self._stop_reader()
+
+        path = os.path.join(self.path, self.socket_name)
+        reader = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        if os.path.exists(path):
+            os.unlink(path)
+        reader.bind(path)
+        os.chmod(path, 0o600)
+        reader.setblocking(False)
+        loop.add_reader(reader.fileno(), self._on_readable)
+        self._reader, self._reader_loop = reader, loop
+
+    def _stop_reader(self):
+        if self._reader is None:
+            return
+        if not self._reader_loop.is_closed():
+            self._reader_loop.remove_reader(self._reader.fileno())
+        self._reader.close()
+        self._reader = self._reader_loop = None
+        try:
+            os.unlink(os.path.join(self.path, self.socket_name))
+        except FileNotFoundError:
+            pass
+
+    def _on_readable(self):
+        while self._reader is not None:
+            try:
+                payload = self._reader.recv(self.max_datagram)
+            except BlockingIOError:
+                return
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                # Raising here would break the event loop's reader callback
+                logger.warning("Ignored undecodable %d byte datagram", len(payload))
+                continue
+            # Deliver synchronously so messages keep the order they were sent in
+            if 'group' in data:
+                self._clean_expired()
+                for channel in list(self.groups.get(data['group'], {})):
+                    self._deliver(channel, data['message'])
+            else:
+                self._deliver(data['channel'], data['message'])
+
+    def _deliver(self, channel, message):
+        """Queue a message from another process for a local channel."""
+        queue = self.channels.setdefault(
+            channel, asyncio.Queue(maxsize=self.get_capacity(channel))
+        )
+        try:
+            queue.put_nowait((time.time() + self.expiry, message))
+        except asyncio.QueueFull:
+            pass
@@ -0,0 +1,121 @@
+"""
+Compression of HTTP responses.
+
+CompressionMiddleware encodes responses of at least
+RESPONSE_COMPRESSION_MIN_SIZE bytes with the first encoding in
+RESPONSE_COMPRESSION_ENCODINGS that the client accepts. gzip is always
+available (with Django's GZipMiddleware BREACH mitigation). br and zstd need
+the brotli and zstandard packages (listed in the Pipfile); both are optional,
+and a coding whose package is missing is simply never chosen.
+
+Only text, JSON and MessagePack bodies are compressed. HTML pages (the
+browsable API and admin, which carry CSRF tokens) are only ever gzipped, as
+br and zstd have no BREACH mitigation. Streamed responses (the evaluation
+zip exports) and files that are already compressed pass through untouched.
+"""
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# brotli's default quality (11) costs many times the CPU of 4 for a few percent
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/msgpack', 'application/javascript')
+
+# Pages that can carry secrets next to reflected input, and the codings that pad them against BREACH
+HTML_TYPES = ('text/html',)
+PADDED_ENCODINGS = ('gzip',)
+
+
+def _gzip(data):
+    return compress_string(data, max_random_bytes=GZipMiddleware.max_random_bytes)
+
+
+# Content-Encoding -> function compressing a bytes body
+COMPRESSORS = {'gzip': _gzip}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+if zstandard is not None:
+    # ZstdCompressor instances are not thread safe, so make one per response
+    COMPRESSORS['zstd'] = lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def accepted_encodings(header):
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header, preference):
+    """The first installed coding in preference the header allows, or None."""
+    accepted = accepted_encodings(header)
+    for coding in preference:
+        if coding in COMPRESSORS and accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with gzip, br or zstd, whichever the client accepts
+    first in RESPONSE_COMPRESSION_ENCODINGS.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        preference = settings.RESPONSE_COMPRESSION_ENCODINGS
+        if content_type.startswith(HTML_TYPES):
+            preference = [coding for coding in preference if coding in PADDED_ENCODINGS]
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), preference)
+        if coding is None:
+            return response
+
+        compressed = COMPRESSORS[coding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+        # Compression changes the bytes, so a strong ETag must become weak (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,62 @@
+"""
+Faster response renderers, chosen per request by the Accept header.
+
+ORJSONRenderer produces the same JSON as DRF's JSONRenderer (dates and
+everything else the serializers hand back go through DRF's encoder) but
+serializes with orjson. MessagePackRenderer answers Accept:
+application/msgpack with the same data as compact MessagePack.
+
+Both libraries are optional. settings.REST_FRAMEWORK only lists a renderer
+when its library is installed, and DRF's JSONRenderer is the fallback.
+"""
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# DRF's conversions for the types orjson and msgpack leave to us
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson; indented output still goes through json."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=_default,
+            # DRF writes UTC datetimes with a Z suffix; keep its format
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Like JSONRenderer, escape U+2028/U+2029 so the output is valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders the JSON data model as MessagePack, with dates as the same strings."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
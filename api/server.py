@@ -0,0 +1,44 @@
+"""
+Daphne with permessage-deflate (RFC 7692) on WebSocket connections.
+
+Daphne's own entry point never negotiates WebSocket compression, so the
+JSON frames on ws/caseflow/ go out as plain text. Start the server through
+this module instead, with the same arguments as daphne:
+
+    python -m api.server -b 0.0.0.0 -p 8000 api.asgi:application
+
+Clients that do not offer permessage-deflate are served uncompressed.
+"""
+
+from autobahn.websocket.compress import PerMessageDeflateOffer, PerMessageDeflateOfferAccept
+from daphne.cli import CommandLineInterface as DaphneCommandLineInterface
+from daphne.server import Server as DaphneServer
+
+
+def accept_deflate(offers):
+    """Accept the client's first permessage-deflate offer, if it made one."""
+    for offer in offers:
+        if isinstance(offer, PerMessageDeflateOffer):
+            return PerMessageDeflateOfferAccept(offer)
+    return None
+
+
+class Server(DaphneServer):
+    # Server.run() creates the WebSocket factory and then blocks in the
+    # reactor, so compression is switched on as the factory is assigned.
+    @property
+    def ws_factory(self):
+        return self._ws_factory
+
+    @ws_factory.setter
+    def ws_factory(self, factory):
+        factory.setProtocolOptions(perMessageCompressionAccept=accept_deflate)
+        self._ws_factory = factory
+
+
+class CommandLineInterface(DaphneCommandLineInterface):
+    server_class = Server
+
+
+if __name__ == '__main__':
+    CommandLineInterface.entrypoint()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
 import json
+from importlib.util import find_spec
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
     'caselookup.apps.CaselookupConfig',
     'reports.apps.ReportsConfig',
     'evaluation.apps.EvaluationConfig',
+    'events.apps.EventsConfig',
     
     'rest_framework',
     'rest_framework.authtoken',
@@ -65,6 +67,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
 
     'corsheaders.middleware.CorsMiddleware',
 
@@ -97,12 +100,69 @@ TEMPLATES = [
 WSGI_APPLICATION = 'api.wsgi.application'
 ASGI_APPLICATION = 'api.asgi.application'
 
+# Response formats, picked by each request's Accept header (the first listed
+# wins for */*). orjson and msgpack are optional; see api.renderers.
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer' if find_spec('orjson') else 'rest_framework.renderers.JSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Responses at least this large are compressed with the first of these
+# encodings the client accepts (br and zstd need brotli / zstandard installed).
+# See api.middleware.
+RESPONSE_COMPRESSION_MIN_SIZE = 1024  # bytes
+RESPONSE_COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
     }
 }
 
+# Several Daphne processes on one host: link them over Unix sockets in this
+# directory so WebSocket events reach clients of every process (no Redis needed).
+if os.environ.get('CHANNEL_LAYER_SOCKET_DIR'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'api.layers.UnixSocketChannelLayer',
+            'CONFIG': {'path': os.environ['CHANNEL_LAYER_SOCKET_DIR']},
+        }
+    }
+
+# How long ws/caseflow/ consumers collect events before sending them as one frame (0 sends each immediately).
+CASEFLOW_BATCH_WINDOW = 0.05  # seconds
+
+# How many recent ws/caseflow/ events are kept for clients that reconnect with ?last_seq=N.
+# A client further behind than this is told to resync instead.
+CASEFLOW_REPLAY_BUFFER = 1000
+
+# How many claim changes are kept for ?since= on the active/complete claim lists.
+# Clients whose version has been trimmed get a full snapshot instead.
+CLAIM_CHANGELOG_SIZE = 10000
+
+# Per-process cache of each user's groups used by role_required/group_required.
+# Invalidated when group membership changes; the TTL bounds staleness in other processes.
+ROLE_CACHE_SIZE = 1024
+ROLE_CACHE_TTL = 60  # seconds
+
+# Per-process token -> user cache used by user.authentication.CachedTokenAuthentication.
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CACHE_TTL = 300  # seconds
+
+# How long reviewedclaim/list?count=cached reuses a computed total.
+REVIEWED_COUNT_CACHE_TTL = 60  # seconds
+
+# Worker processes used by evaluation/geneval to render Word documents (1 renders in the request thread).
+GENEVAL_WORKERS = int(os.environ.get('GENEVAL_WORKERS', os.cpu_count() or 1))
+
+# Background export jobs (evaluation.jobs): worker threads, where artifacts are written, and how long they are kept.
+EXPORT_JOB_WORKERS = 2
+EXPORT_JOB_DIR = os.environ.get('EXPORT_JOB_DIR', os.path.join(BASE_DIR, 'exports'))
+EXPORT_JOB_RETENTION_DAYS = 7
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -111,6 +171,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent claim
+            # transitions queue up (for up to `timeout` seconds) instead of
+            # failing with "database is locked" when a read upgrades to a write.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # A file rather than shared-cache memory, which raises "table is
+            # locked" instead of waiting when threads write concurrently
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -0,0 +1,665 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import AnonymousUser, User, Group
+from django.db import connection, connections
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from asgiref.sync import sync_to_async
+from autobahn.websocket.compress import PerMessageDeflateOffer, PerMessageDeflateOfferAccept
+from channels.testing import WebsocketCommunicator
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from activeclaim.models import ActiveClaim
+from completeclaim.models import CompleteClaim
+from reviewedclaim.models import ReviewedClaim
+from api import broadcast
+from api.broadcast import publish
+from api.consumers import Consumer
+from api.layers import UnixSocketChannelLayer
+from api.middleware import COMPRESSORS, CompressionMiddleware, choose_encoding
+from api.renderers import ORJSONRenderer, msgpack
+from api.server import accept_deflate
+from caselookup import caseindex
+from caselookup.models import CaseIndex
+from events.models import CaseflowEvent
+from reports import rollup
+from reports.models import DailyReviewStat
+from user.authentication import QueryTokenAuthMiddleware
+from user.decorators import _group_cache
+
+
+# Tables that grow with history (or are probed on every lookup) and must be
+# reached through an index
+WATCHED_TABLES = {
+    'activeclaim_activeclaim',
+    'completeclaim_completeclaim',
+    'reviewedclaim_reviewedclaim',
+    'reports_dailyreviewstat',
+    'caselookup_caseindex',
+    'events_claimchange',
+}
+
+FULL_SCAN = re.compile(r'\bSCAN (\w+)(?: AS \w+)?$')
+
+
+def full_scans(sql):
+    """Return the watched tables that EXPLAIN QUERY PLAN reports as plain table scans."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[-1] for row in cursor.fetchall()]
+    return {
+        match.group(1)
+        for line in plan
+        if (match := FULL_SCAN.search(line)) and match.group(1) in WATCHED_TABLES
+    }
+
+
+class QueryPlanTest(APITestCase):
+    """
+    Runs EXPLAIN QUERY PLAN on every query an endpoint issues and fails if a
+    watched table is read with a full scan, unless the endpoint is expected to
+    read the whole table (e.g. listing the live claim queues).
+    """
+
+    def setUp(self):
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Manager'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+        now = timezone.now()
+        ActiveClaim.objects.create(casenum='10000001', user_id=self.lead)
+        CompleteClaim.objects.create(casenum='10000002', user_id=self.lead, claim_time=now)
+        for i, status_value in enumerate(['checked', 'kudos', 'pingedlow', 'acknowledged']):
+            ReviewedClaim.objects.create(
+                casenum=f'1000001{i}', tech_id=self.lead, lead_id=self.lead,
+                claim_time=now, complete_time=now, status=status_value, comment='',
+            )
+        rollup.rebuild()
+        caseindex.rebuild()
+
+    def assertIndexed(self, url, params=None, allow=()):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertLess(response.status_code, 500, url)
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            scans = full_scans(sql) - set(allow)
+            self.assertFalse(scans, f'{url} full-scans {scans}:\n{sql}')
+
+    def test_harness_detects_scan(self):
+        unindexed = "SELECT id FROM reviewedclaim_reviewedclaim WHERE comment = 'x'"
+        indexed = "SELECT id FROM reviewedclaim_reviewedclaim WHERE casenum = '12345678'"
+        self.assertEqual(full_scans(unindexed), {'reviewedclaim_reviewedclaim'})
+        self.assertEqual(full_scans(indexed), set())
+
+    def test_caselookup(self):
+        for casenum in ('10000001', '10000002', '10000010', '99999999'):
+            self.assertIndexed(f'/api/caselookup/search/{casenum}/')
+            self.assertIndexed(f'/api/caselookup/history/{casenum}/')
+            self.assertIndexed(f'/api/caselookup/status/{casenum}/')
+
+    def test_reviewedclaim(self):
+        self.assertIndexed('/api/reviewedclaim/list/', {'days': 7, 'count': 'none'})
+        self.assertIndexed('/api/reviewedclaim/list/', {'cursor': ''})
+        self.assertIndexed('/api/reviewedclaim/list/', {'user_id': self.lead.id, 'days': 7})
+        self.assertIndexed(f'/api/reviewedclaim/getpings/{self.lead.id}/')
+
+    def test_claim_deltas(self):
+        self.client.post('/api/activeclaim/create/10000003/')
+        self.client.post(f'/api/completeclaim/begin-review/{CompleteClaim.objects.get().id}/')
+        for queue in ('activeclaim', 'completeclaim'):
+            # ?since= touches only the changed rows; a snapshot lists the queue
+            self.assertIndexed(f'/api/{queue}/list/', {'since': 1})
+            self.assertIndexed(f'/api/{queue}/list/', {'since': 0}, allow=(f'{queue}_{queue}',))
+
+    def test_reports(self):
+        today = timezone.now().date()
+        date_range = {
+            'start_date': (today - timedelta(days=7)).isoformat(),
+            'end_date': today.isoformat(),
+        }
+        queues = ('activeclaim_activeclaim', 'completeclaim_completeclaim')
+        # All-time totals read every row of the small live queues and the rollup
+        self.assertIndexed('/api/reports/summary/', allow=queues + ('reports_dailyreviewstat',))
+        self.assertIndexed('/api/reports/summary/', {'days': 7}, allow=queues)
+        self.assertIndexed('/api/reports/summary/', date_range, allow=queues)
+        self.assertIndexed('/api/reports/leaderboard/')
+        self.assertIndexed('/api/reports/leaderboard/', date_range)
+        self.assertIndexed('/api/reports/ping-stats/')
+        self.assertIndexed('/api/reports/date-range/', date_range)
+        self.assertIndexed(f'/api/reports/user/{self.lead.id}/')
+
+    def test_evaluation(self):
+        today = timezone.now().date()
+        self.assertIndexed(f'/api/evaluation/generate/{self.lead.id}/', {
+            'start_date': (today - timedelta(days=30)).isoformat(),
+            'end_date': today.isoformat(),
+        })
+
+
+# A stand-in Daphne worker: joins "caseflow", reports its channel, then prints
+# the arrival time of each message it receives
+LAYER_WORKER = """
+import asyncio, json, sys, time
+from api.layers import UnixSocketChannelLayer
+
+async def main():
+    layer = UnixSocketChannelLayer(path=sys.argv[1])
+    channel = await layer.new_channel()
+    await layer.group_add('caseflow', channel)
+    print(json.dumps({'channel': channel}), flush=True)
+    for _ in range(2):
+        message = await layer.receive(channel)
+        print(json.dumps({'message': message, 'received': time.time()}), flush=True)
+    await layer.close()
+
+asyncio.run(main())
+"""
+
+
+class UnixSocketChannelLayerTest(SimpleTestCase):
+    WORKERS = 3
+
+    def setUp(self):
+        socket_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(socket_dir.cleanup)
+        self.path = socket_dir.name
+
+    def _start_workers(self):
+        workers = []
+        for _ in range(self.WORKERS):
+            worker = subprocess.Popen(
+                [sys.executable, '-c', LAYER_WORKER, self.path],
+                cwd=settings.BASE_DIR, stdout=subprocess.PIPE, text=True,
+            )
+            self.addCleanup(worker.kill)
+            workers.append(worker)
+        channels = [json.loads(worker.stdout.readline())['channel'] for worker in workers]
+        return workers, channels
+
+    def test_cross_process_delivery(self):
+        workers, channels = self._start_workers()
+        layer = UnixSocketChannelLayer(path=self.path)
+
+        async def broadcast():
+            # a consumer in this process is a group member too
+            local = await layer.new_channel()
+            await layer.group_add('caseflow', local)
+            await layer.group_send('caseflow', {'type': 'activeclaim', 'sent': time.time()})
+            for channel in channels:
+                await layer.send(channel, {'type': 'direct', 'channel': channel})
+            message = await layer.receive(local)
+            await layer.close()
+            return message
+
+        self.assertEqual(asyncio.run(broadcast())['type'], 'activeclaim')
+
+        latencies = []
+        for worker, channel in zip(workers, channels):
+            group_event = json.loads(worker.stdout.readline())
+            direct = json.loads(worker.stdout.readline())
+            self.assertEqual(group_event['message']['type'], 'activeclaim')
+            self.assertEqual(direct['message'], {'type': 'direct', 'channel': channel})
+            latencies.append(group_event['received'] - group_event['message']['sent'])
+            worker.wait(timeout=10)
+
+        self.assertLess(max(latencies), 1.0)
+
+    def test_large_and_undecodable_datagrams(self):
+        receiver = UnixSocketChannelLayer(path=self.path)
+        sender = UnixSocketChannelLayer(path=self.path)
+        comment = 'x' * 150000
+
+        async def exchange():
+            local = await receiver.new_channel()
+            await receiver.group_add('caseflow', local)
+            socket_path = os.path.join(self.path, receiver.socket_name)
+            sender._sender.sendto(b'{"group": "caseflow", "mess', socket_path)
+            # Too large for any datagram: delivered locally only, not raised
+            await sender.group_send('caseflow', {'type': 'huge', 'comment': comment * 2})
+            await sender.group_send('caseflow', {'type': 'large', 'comment': comment})
+            message = await asyncio.wait_for(receiver.receive(local), timeout=5)
+            await receiver.close()
+            return message
+
+        with self.assertLogs('api.layers', 'WARNING') as logs:
+            message = asyncio.run(exchange())
+        self.assertEqual(message, {'type': 'large', 'comment': comment})
+        self.assertEqual(len(logs.records), 2)
+
+    def test_dead_process_socket_is_removed(self):
+        workers, channels = self._start_workers()
+        for worker in workers:
+            worker.kill()
+            worker.wait()
+        # the workers were killed before they could clean up their sockets
+        self.assertEqual(len(os.listdir(self.path)), self.WORKERS)
+
+        layer = UnixSocketChannelLayer(path=self.path)
+        asyncio.run(layer.group_send('caseflow', {'type': 'activeclaim'}))
+        self.assertEqual(os.listdir(self.path), [])
+
+
+def _strip_seq(frame):
+    if frame.get('type') == 'batch':
+        return {'type': 'batch', 'events': [_strip_seq(event) for event in frame['events']]}
+    return {key: value for key, value in frame.items() if key != 'seq'}
+
+
+class ConsumerTestCase(TransactionTestCase):
+    async def _connect(self, count, path='/ws/caseflow/', user=None, app=None):
+        clients = [WebsocketCommunicator(app or Consumer.as_asgi(), path) for _ in range(count)]
+        for client in clients:
+            if user is not None:
+                client.scope['user'] = user
+            connected, _ = await client.connect()
+            self.assertTrue(connected)
+        return clients
+
+    async def _publish(self, *events, topic=broadcast.CLAIMS, user_id=None):
+        return [await sync_to_async(publish)(event, topic, user_id) for event in events]
+
+    async def _receive(self, client):
+        return _strip_seq(await client.receive_json_from())
+
+
+class ConsumerBatchingTest(ConsumerTestCase):
+    @override_settings(CASEFLOW_BATCH_WINDOW=0.05)
+    async def test_burst_is_one_frame_per_client(self):
+        clients = await self._connect(2)
+        events = [{'type': 'activeclaim', 'event': 'claim', 'casenum': f'{i:08d}'} for i in range(3)]
+        await self._publish(*events)
+        for client in clients:
+            self.assertEqual(await self._receive(client), {'type': 'batch', 'events': events})
+            self.assertTrue(await client.receive_nothing())
+
+        # a lone event is sent as-is
+        await self._publish(events[0])
+        for client in clients:
+            self.assertEqual(await self._receive(client), events[0])
+            await client.disconnect()
+
+    @override_settings(CASEFLOW_BATCH_WINDOW=0)
+    async def test_batching_disabled(self):
+        client, = await self._connect(1)
+        events = [{'type': 'completeclaim', 'event': 'review', 'casenum': f'{i:08d}'} for i in range(2)]
+        await self._publish(*events)
+        self.assertEqual([await self._receive(client), await self._receive(client)], events)
+        await client.disconnect()
+
+
+@override_settings(CASEFLOW_BATCH_WINDOW=0)
+class ConsumerReplayTest(ConsumerTestCase):
+    # seq is the CaseflowEvent id; start at 1 so pruning happens at a known point
+    reset_sequences = True
+
+    def _events(self, count):
+        return [{'type': 'activeclaim', 'event': 'claim', 'casenum': f'{i:08d}'} for i in range(count)]
+
+    async def test_sequence_numbers_increase(self):
+        client, = await self._connect(1)
+        seqs = await self._publish(*self._events(3))
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(len(set(seqs)), 3)
+        for seq in seqs:
+            self.assertEqual((await client.receive_json_from())['seq'], seq)
+        await client.disconnect()
+
+    async def test_reconnect_replays_missed_events(self):
+        events = self._events(4)
+        seqs = await self._publish(*events)
+
+        client, = await self._connect(1, f'/ws/caseflow/?last_seq={seqs[1]}')
+        frame = await client.receive_json_from()
+        self.assertEqual([event['seq'] for event in frame['events']], seqs[2:])
+        self.assertEqual(_strip_seq(frame), {'type': 'batch', 'events': events[2:]})
+
+        # live events continue after the replay
+        seq, = await self._publish(events[0])
+        self.assertEqual((await client.receive_json_from())['seq'], seq)
+
+        # nothing missed: nothing sent
+        up_to_date, = await self._connect(1, f'/ws/caseflow/?last_seq={seq}')
+        self.assertTrue(await up_to_date.receive_nothing())
+        for c in (client, up_to_date):
+            await c.disconnect()
+
+    async def test_gap_larger_than_buffer_resyncs(self):
+        with override_settings(CASEFLOW_REPLAY_BUFFER=50):
+            seqs = await self._publish(*self._events(broadcast.PRUNE_INTERVAL))
+        self.assertEqual(await sync_to_async(CaseflowEvent.objects.count)(), 50)
+
+        for last_seq in (seqs[0], seqs[-1] + 1, 'junk'):
+            client, = await self._connect(1, f'/ws/caseflow/?last_seq={last_seq}')
+            self.assertEqual(await client.receive_json_from(), {'type': 'resync'})
+            await client.disconnect()
+
+        # still inside the buffer
+        client, = await self._connect(1, f'/ws/caseflow/?last_seq={seqs[-2]}')
+        self.assertEqual((await client.receive_json_from())['seq'], seqs[-1])
+        await client.disconnect()
+
+    async def test_events_published_during_replay_are_not_duplicated(self):
+        first, = await self._publish(*self._events(1))
+        consumer = Consumer()
+        consumer.replayed = {first + 1}
+        sent = []
+
+        async def send(text_data):
+            sent.append(text_data)
+        consumer.send = send
+        await consumer.caseflow_event({'seq': first + 1, 'text': 'a'})
+        await consumer.caseflow_event({'seq': first + 2, 'text': 'b'})
+        self.assertEqual(sent, ['b'])
+
+
+@override_settings(CASEFLOW_BATCH_WINDOW=0)
+class ConsumerGroupsTest(ConsumerTestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.tech = User.objects.create(username='tech')
+        self.tech.groups.add(Group.objects.get(name='Tech'))
+        self.other = User.objects.create(username='other')
+        self.other.groups.add(Group.objects.get(name='Tech'))
+        self.lead = User.objects.create(username='lead')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+
+    async def _received(self, clients):
+        received = []
+        for client in clients:
+            if await client.receive_nothing():
+                received.append(None)
+            else:
+                received.append((await client.receive_json_from())['type'])
+        return received
+
+    async def test_events_reach_only_permitted_clients(self):
+        anonymous, = await self._connect(1, user=AnonymousUser())
+        tech, = await self._connect(1, user=self.tech)
+        other, = await self._connect(1, user=self.other)
+        lead, = await self._connect(1, user=self.lead)
+        clients = [anonymous, tech, other, lead]
+
+        await self._publish({'type': 'activeclaim'})
+        self.assertEqual(await self._received(clients), ['activeclaim'] * 4)
+
+        await self._publish({'type': 'completeclaim'}, topic=broadcast.REVIEWS)
+        self.assertEqual(await self._received(clients), [None, None, None, 'completeclaim'])
+
+        await self._publish({'type': 'reviewedclaim'}, topic=broadcast.PINGS, user_id=self.tech.id)
+        self.assertEqual(await self._received(clients), [None, 'reviewedclaim', None, None])
+
+        await self._publish({'type': 'export'}, topic=broadcast.EXPORTS, user_id=self.lead.id)
+        self.assertEqual(await self._received(clients), [None, None, None, 'export'])
+        for client in clients:
+            await client.disconnect()
+
+    async def test_topics_narrow_subscriptions(self):
+        lead, = await self._connect(1, '/ws/caseflow/?topics=reviews,bogus', user=self.lead)
+        # a tech cannot subscribe to reviews
+        tech, = await self._connect(1, '/ws/caseflow/?topics=reviews,pings', user=self.tech)
+
+        await self._publish({'type': 'activeclaim'})
+        await self._publish({'type': 'completeclaim'}, topic=broadcast.REVIEWS)
+        self.assertEqual(await self._received([lead, tech]), ['completeclaim', None])
+        for client in (lead, tech):
+            await client.disconnect()
+
+    async def test_replay_only_includes_permitted_events(self):
+        first, = await self._publish({'type': 'activeclaim'})
+        await self._publish({'type': 'reviewedclaim', 'casenum': 'mine'}, topic=broadcast.PINGS, user_id=self.tech.id)
+        await self._publish({'type': 'reviewedclaim', 'casenum': 'theirs'}, topic=broadcast.PINGS, user_id=self.other.id)
+        await self._publish({'type': 'completeclaim'}, topic=broadcast.REVIEWS)
+
+        tech, = await self._connect(1, f'/ws/caseflow/?last_seq={first}', user=self.tech)
+        self.assertEqual(await self._receive(tech), {'type': 'reviewedclaim', 'casenum': 'mine'})
+        self.assertTrue(await tech.receive_nothing())
+        await tech.disconnect()
+
+    async def test_token_in_query_string_authenticates(self):
+        token = await sync_to_async(Token.objects.create)(user=self.tech)
+        app = QueryTokenAuthMiddleware(Consumer.as_asgi())
+        tech, = await self._connect(1, f'/ws/caseflow/?token={token.key}', user=AnonymousUser(), app=app)
+        stranger, = await self._connect(1, '/ws/caseflow/?token=nope', user=AnonymousUser(), app=app)
+
+        await self._publish({'type': 'reviewedclaim'}, topic=broadcast.PINGS, user_id=self.tech.id)
+        self.assertEqual(await self._received([tech, stranger]), ['reviewedclaim', None])
+        for client in (tech, stranger):
+            await client.disconnect()
+
+    async def test_pinging_review_reaches_the_tech(self):
+        tech, = await self._connect(1, user=self.tech)
+        lead, = await self._connect(1, user=self.lead)
+        claim = await sync_to_async(CompleteClaim.objects.create)(
+            casenum='12345678', user_id=self.tech, claim_time=timezone.now()
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.lead)
+        response = await sync_to_async(client.post)(
+            f'/api/completeclaim/review/{claim.id}/', {'status': 'pingedmed', 'comment': 'x'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await self._received([tech, lead]), ['reviewedclaim', 'completeclaim'])
+        self.assertEqual(await self._received([tech, lead]), [None, None])
+        for c in (tech, lead):
+            await c.disconnect()
+
+
+class ClaimTransitionStressTest(TransactionTestCase):
+    """
+    Many threads push the same cases through claim -> complete -> begin
+    review -> review at once. Each step must succeed exactly once per case,
+    with no duplicated or lost rows and no server errors.
+    """
+    THREADS = 8
+    CASES = 10
+
+    def setUp(self):
+        _group_cache.clear()
+        self.techs = [User.objects.create(username=f'tech{i}') for i in range(self.THREADS)]
+        self.leads = [User.objects.create(username=f'lead{i}') for i in range(self.THREADS)]
+        Group.objects.get(name='Tech').user_set.add(*self.techs)
+        Group.objects.get(name='Lead').user_set.add(*self.leads)
+        self.casenums = [f'{i:08d}' for i in range(self.CASES)]
+
+    def _race(self, users, method, paths, data=None):
+        """Every user requests every path, all threads starting together. Returns status codes per path."""
+        barrier = threading.Barrier(len(users))
+
+        def worker(user):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            barrier.wait()
+            try:
+                return [(path, getattr(client, method)(path, data).status_code) for path in paths]
+            finally:
+                connections.close_all()
+
+        codes = {path: Counter() for path in paths}
+        with ThreadPoolExecutor(len(users)) as pool:
+            for results in pool.map(worker, users):
+                for path, code in results:
+                    codes[path][code] += 1
+        return codes
+
+    def assertOneWinner(self, codes, success, losers):
+        for path, counter in codes.items():
+            self.assertEqual(counter[success], 1, f'{path}: {counter}')
+            self.assertEqual(sum(counter.values()) - 1, sum(counter[code] for code in losers), f'{path}: {counter}')
+
+    def test_concurrent_transitions(self):
+        codes = self._race(self.techs, 'post', [f'/api/activeclaim/create/{c}/' for c in self.casenums])
+        self.assertOneWinner(codes, 201, [400])
+        self.assertEqual(ActiveClaim.objects.count(), self.CASES)
+
+        codes = self._race(self.techs, 'delete', [f'/api/activeclaim/complete/{c}/' for c in self.casenums])
+        self.assertOneWinner(codes, 201, [404])
+        self.assertEqual(ActiveClaim.objects.count(), 0)
+        self.assertEqual(CompleteClaim.objects.count(), self.CASES)
+
+        ids = list(CompleteClaim.objects.values_list('id', flat=True))
+        codes = self._race(self.leads, 'post', [f'/api/completeclaim/begin-review/{pk}/' for pk in ids])
+        self.assertOneWinner(codes, 201, [409])
+        self.assertFalse(CompleteClaim.objects.filter(lead_id__isnull=True).exists())
+
+        # Every lead tries to review every case; only the one reviewing it may
+        reviewers = dict(CompleteClaim.objects.values_list('casenum', 'lead_id'))
+        codes = self._race(self.leads, 'post', [f'/api/completeclaim/review/{pk}/' for pk in ids], {'status': 'pingedlow'})
+        self.assertOneWinner(codes, 201, [404, 409])
+        self.assertEqual(CompleteClaim.objects.count(), 0)
+        self.assertEqual(dict(ReviewedClaim.objects.values_list('casenum', 'lead_id')), reviewers)
+
+        pings = list(ReviewedClaim.objects.values_list('id', 'tech_id'))
+        for pk, tech_id in pings:
+            # the owning tech, from several sessions at once
+            owner = User.objects.get(pk=tech_id)
+            codes = self._race([owner] * 4, 'post', [f'/api/reviewedclaim/acknowledge/{pk}/'])
+            self.assertOneWinner(codes, 200, [400, 409])
+        codes = self._race(self.leads, 'post', [f'/api/reviewedclaim/resolve/{pk}/' for pk, _ in pings])
+        self.assertOneWinner(codes, 200, [400, 409])
+
+        # derived tables agree with the claim tables
+        self.assertEqual(dict(DailyReviewStat.objects.values_list('status').annotate(total=Sum('count'))), {'resolved': self.CASES})
+        self.assertEqual(
+            Counter(CaseIndex.objects.values_list('stage', 'review_status', 'review_count')),
+            {('reviewed', 'resolved', 1): self.CASES},
+        )
+
+
+class RendererTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create(username='lead')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        tech = User.objects.create(username='tech')
+        for n in range(3):
+            ReviewedClaim.objects.create(
+                casenum=f'{n:08d}', tech_id=tech, lead_id=self.lead,
+                claim_time=timezone.now(), complete_time=timezone.now(),
+                status='checked', comment='line\u2028separator é',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+    def test_orjson_matches_json_renderer(self):
+        data = {
+            'when': timezone.now(),
+            'local': timezone.now().astimezone(timezone.get_fixed_timezone(-300)),
+            'day': timezone.now().date(),
+            'amount': Decimal('1.50'),
+            'label': gettext_lazy('Lead'),
+            'nested': [{1: 'int key'}, ('tuple',), None, 2.5, 'para\u2029graph'],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_list_endpoints_render_with_orjson(self):
+        for url in ('/api/reviewedclaim/list/', '/api/user/users/', '/api/completeclaim/list/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_by_accept_header(self):
+        response = self.client.get('/api/reviewedclaim/list/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(JSONRenderer().render(response.data)))
+
+
+class CompressionTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        lead = User.objects.create(username='lead')
+        lead.groups.add(Group.objects.get(name='Lead'))
+        for n in range(50):
+            ReviewedClaim.objects.create(
+                casenum=f'{n:08d}', tech_id=lead, lead_id=lead,
+                claim_time=timezone.now(), complete_time=timezone.now(), status='checked',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=lead)
+
+    def test_list_endpoint_gzipped(self):
+        plain = self.client.get('/api/reviewedclaim/list/', HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get('/api/reviewedclaim/list/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertLess(len(response.content), len(plain.content) // 4)
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_responses_left_alone(self):
+        response = self.client.get('/api/reviewedclaim/list/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['count'], 50)
+
+    def test_only_compressible_types(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompressionMiddleware(lambda request: None)
+        archive = middleware.process_response(request, HttpResponse(b'PK' * 1000, content_type='application/zip'))
+        self.assertFalse(archive.has_header('Content-Encoding'))
+        text = middleware.process_response(request, HttpResponse(b'a,b\n' * 1000, content_type='text/csv'))
+        self.assertEqual(text['Content-Encoding'], 'gzip')
+
+    def test_html_only_gzipped(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        middleware = CompressionMiddleware(lambda request: None)
+        # br without BREACH padding, even where brotli is not installed
+        with mock.patch.dict(COMPRESSORS, {'br': lambda data: b'br'}), \
+                override_settings(RESPONSE_COMPRESSION_ENCODINGS=['br', 'gzip']):
+            page = middleware.process_response(request, HttpResponse(b'<p>' * 1000, content_type='text/html'))
+            data = middleware.process_response(request, HttpResponse(b'[1]' * 1000, content_type='application/json'))
+        self.assertEqual(page['Content-Encoding'], 'gzip')
+        self.assertEqual(data['Content-Encoding'], 'br')
+
+    def test_choose_encoding(self):
+        preference = ['zstd', 'br', 'gzip']
+        self.assertEqual(choose_encoding('gzip, deflate, br, zstd', ['gzip', 'br']), 'gzip')
+        self.assertEqual(choose_encoding('GZIP;q=0.5', preference), 'gzip')
+        self.assertIn(choose_encoding('*', preference), preference)
+        self.assertIsNone(choose_encoding('', preference))
+        self.assertIsNone(choose_encoding('identity', preference))
+        self.assertIsNone(choose_encoding('gzip;q=0, *;q=0', preference))
+        # Codings without a compressor are never chosen
+        self.assertIsNone(choose_encoding('compress', ['compress']))
+
+    def test_websocket_deflate_accepted(self):
+        offer = PerMessageDeflateOffer()
+        accept = accept_deflate([offer])
+        self.assertIsInstance(accept, PerMessageDeflateOfferAccept)
+        self.assertIs(accept.offer, offer)
+        self.assertIsNone(accept_deflate([]))
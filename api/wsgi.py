@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
 application = get_wsgi_application()
+
+# Set up Django before importing the jobs module, which uses models
+from evaluation import jobs
+
+# Only server processes load this module; see api.asgi
+jobs.recover()
@@ -1,4 +1,3 @@
 from django.contrib import admin
 
-# No models to register - this app only queries other apps' models
-
+# CaseIndex is derived data maintained by caselookup.caseindex - not edited by hand
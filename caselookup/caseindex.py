@@ -0,0 +1,93 @@
+"""
+Maintenance of the CaseIndex table.
+
+Every view that moves a claim between ActiveClaim, CompleteClaim and
+ReviewedClaim (or changes a review's status) calls `sync_case()` inside the
+same transaction as the write, so the index always matches the claim tables.
+`rebuild()` recomputes everything (used after bulk imports).
+"""
+
+from django.apps import apps as global_apps
+from django.db import transaction
+
+from activeclaim.models import ActiveClaim
+from caselookup.models import CaseIndex
+from completeclaim.models import CompleteClaim
+from reviewedclaim.models import ReviewedClaim
+
+
+def _index_fields(active, complete, latest, review_count):
+    """
+    Describe a case the way the old table probes did: an active claim wins
+    over a complete one, which wins over any reviews. Returns None if the case
+    is in no table.
+    """
+    fields = {
+        'review_status': latest['status'] if latest else '',
+        'review_count': review_count,
+    }
+    if active:
+        fields.update(stage='active', user_id_id=active['user_id'], lead_id_id=None)
+    elif complete:
+        fields.update(stage='complete', user_id_id=complete['user_id'], lead_id_id=complete['lead_id'])
+    elif latest:
+        fields.update(stage='reviewed', user_id_id=latest['tech_id'], lead_id_id=latest['lead_id'])
+    else:
+        return None
+    return fields
+
+
+def sync_case(casenum):
+    """Recompute the index row for one case from the claim tables."""
+    active = ActiveClaim.objects.filter(casenum=casenum).values('user_id').first()
+    complete = (
+        CompleteClaim.objects.filter(casenum=casenum)
+        .order_by('-complete_time', '-id')
+        .values('user_id', 'lead_id')
+        .first()
+    )
+    reviews = ReviewedClaim.objects.filter(casenum=casenum)
+    latest = reviews.order_by('-review_time', '-id').values('tech_id', 'lead_id', 'status').first()
+    review_count = reviews.count() if latest else 0
+
+    fields = _index_fields(active, complete, latest, review_count)
+    if fields is None:
+        CaseIndex.objects.filter(casenum=casenum).delete()
+    else:
+        CaseIndex.objects.update_or_create(casenum=casenum, defaults=fields)
+
+
+def rebuild(batch_size=1000, apps=global_apps):
+    """
+    Recompute the whole index from the claim tables. Returns the number of cases.
+
+    Migrations pass their own apps so the historical models are used.
+    """
+    ActiveClaim = apps.get_model('activeclaim', 'ActiveClaim')
+    CompleteClaim = apps.get_model('completeclaim', 'CompleteClaim')
+    ReviewedClaim = apps.get_model('reviewedclaim', 'ReviewedClaim')
+    CaseIndex = apps.get_model('caselookup', 'CaseIndex')
+
+    active = {row['casenum']: row for row in ActiveClaim.objects.values('casenum', 'user_id')}
+    complete = {
+        row['casenum']: row
+        for row in CompleteClaim.objects.order_by('complete_time', 'id').values('casenum', 'user_id', 'lead_id')
+    }
+    latest = {}
+    review_counts = {}
+    reviews = ReviewedClaim.objects.order_by('review_time', 'id').values('casenum', 'tech_id', 'lead_id', 'status')
+    for row in reviews.iterator():
+        latest[row['casenum']] = row
+        review_counts[row['casenum']] = review_counts.get(row['casenum'], 0) + 1
+
+    rows = []
+    for casenum in active.keys() | complete.keys() | latest.keys():
+        fields = _index_fields(
+            active.get(casenum), complete.get(casenum), latest.get(casenum), review_counts.get(casenum, 0)
+        )
+        rows.append(CaseIndex(casenum=casenum, **fields))
+
+    with transaction.atomic():
+        CaseIndex.objects.all().delete()
+        CaseIndex.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
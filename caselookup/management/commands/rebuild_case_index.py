@@ -0,0 +1,31 @@
+"""
+Rebuild the CaseIndex table from the claim tables.
+
+The index is normally maintained incrementally by the claim views. Run this
+after bulk imports (e.g. migrate_case_data) or if the index is ever suspected
+to have drifted from the raw data.
+
+Usage:
+    python manage.py rebuild_case_index
+"""
+
+from django.core.management.base import BaseCommand
+
+from caselookup.caseindex import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the case index used by the caselookup endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of index rows to insert per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("Rebuilding case index..."))
+        count = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Case index rebuilt: {count} cases"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('casenum', models.CharField(max_length=8, unique=True)),
+                ('stage', models.CharField(choices=[('active', 'Active'), ('complete', 'Complete'), ('reviewed', 'Reviewed')], max_length=16)),
+                ('review_status', models.CharField(blank=True, default='', max_length=255)),
+                ('review_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lead_id', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='case_index_lead', to=settings.AUTH_USER_MODEL)),
+                ('user_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='case_index_user', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
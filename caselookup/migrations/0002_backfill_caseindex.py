@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    # 0001 created the table empty; index the cases already in the claim tables
+    from caselookup import caseindex
+    caseindex.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caselookup', '0001_initial'),
+        ('activeclaim', '0002_activeclaim_active_claim_time_idx'),
+        ('completeclaim', '0003_completeclaim_complete_casenum_idx'),
+        ('reviewedclaim', '0004_reviewedclaim_reviewed_casenum_time_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
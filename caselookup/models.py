@@ -1,4 +1,36 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# No models needed - this app queries ActiveClaim, CompleteClaim, and ReviewedClaim
 
+class CaseIndex(models.Model):
+    """
+    One row per casenum describing where the case currently is.
+
+    Denormalized from ActiveClaim, CompleteClaim and ReviewedClaim so a status
+    lookup is a single indexed read instead of a probe of every table. Kept up
+    to date by caselookup.caseindex whenever a claim changes stage, and rebuilt
+    from scratch by `manage.py rebuild_case_index`.
+    """
+    STAGES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+        ('reviewed', 'Reviewed'),
+    ]
+
+    casenum = models.CharField(max_length=8, unique=True)
+    stage = models.CharField(max_length=16, choices=STAGES)
+
+    # Tech that owns the case in its current stage (the reviewed tech once reviewed)
+    user_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name="case_index_user")
+
+    # Lead reviewing the complete claim, or the lead of the latest review
+    lead_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name="case_index_lead", null=True)
+
+    # Status of the most recent ReviewedClaim (empty if never reviewed)
+    review_status = models.CharField(max_length=255, blank=True, default='')
+    review_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Casenum: {self.casenum}, Stage: {self.stage}, User: {self.user_id_id}, Review Status: {self.review_status}, Reviews: {self.review_count}"
@@ -1,4 +1,192 @@
-from django.test import TestCase
+from django.contrib.auth.models import User, Group
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
 
-# Create your tests here.
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
 
+from activeclaim.models import ActiveClaim
+from caselookup import caseindex
+from caselookup.models import CaseIndex
+from completeclaim.models import CompleteClaim
+from reviewedclaim.models import ReviewedClaim
+from user.decorators import _group_cache
+
+
+class CaseIndexTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.tech = User.objects.create_user(username='tech', password='pw')
+        self.tech.groups.add(Group.objects.get(name='Tech'))
+        self.client = APIClient()
+
+    def _index(self):
+        return {
+            row['casenum']: row
+            for row in CaseIndex.objects.values('casenum', 'stage', 'user_id', 'lead_id', 'review_status', 'review_count')
+        }
+
+    def _assert_matches_rebuild(self):
+        incremental = self._index()
+        caseindex.rebuild()
+        self.assertEqual(incremental, self._index())
+
+    def test_views_maintain_index(self):
+        self.client.force_authenticate(user=self.tech)
+        self.client.post('/api/activeclaim/create/12345678/')
+        self.client.post('/api/activeclaim/create/87654321/')
+        self.assertEqual(self._index()['12345678']['stage'], 'active')
+
+        self.client.delete('/api/activeclaim/unclaim/87654321/')
+        self.assertNotIn('87654321', self._index())
+
+        self.client.delete('/api/activeclaim/complete/12345678/')
+        self.assertEqual(self._index()['12345678']['stage'], 'complete')
+        self._assert_matches_rebuild()
+
+        claim = CompleteClaim.objects.get(casenum='12345678')
+        self.client.force_authenticate(user=self.lead)
+        self.client.post(f'/api/completeclaim/begin-review/{claim.id}/')
+        self.assertEqual(self._index()['12345678']['lead_id'], self.lead.id)
+
+        self.client.post(f'/api/completeclaim/review/{claim.id}/', {'status': 'pingedhigh', 'comment': 'x'})
+        self.client.post('/api/reviewedclaim/create-ping/', {
+            'casenum': '12345678', 'tech_id': self.tech.id, 'severity': 'pingedlow', 'comment': 'y',
+        })
+        entry = self._index()['12345678']
+        self.assertEqual((entry['stage'], entry['review_status'], entry['review_count']), ('reviewed', 'pingedlow', 2))
+
+        ping = ReviewedClaim.objects.filter(casenum='12345678').latest('review_time', 'id')
+        self.client.force_authenticate(user=self.tech)
+        self.client.post(f'/api/reviewedclaim/acknowledge/{ping.id}/')
+        self.assertEqual(self._index()['12345678']['review_status'], 'acknowledged')
+        self._assert_matches_rebuild()
+
+    def test_status_is_one_point_read(self):
+        now = timezone.now()
+        ActiveClaim.objects.create(casenum='10000001', user_id=self.tech)
+        CompleteClaim.objects.create(casenum='10000002', user_id=self.tech, lead_id=self.lead, claim_time=now)
+        ReviewedClaim.objects.create(
+            casenum='10000003', tech_id=self.tech, lead_id=self.lead,
+            claim_time=now, complete_time=now, status='kudos', comment='',
+        )
+        caseindex.rebuild()
+        self.client.force_authenticate(user=self.lead)
+        self.client.get('/api/caselookup/status/10000001/')  # warm the role cache
+
+        expected = {
+            '10000001': ('active', 'Case is currently active, claimed by tech'),
+            '10000002': ('complete', 'Case is completed, awaiting review, being reviewed by lead'),
+            '10000003': ('reviewed', 'Case has been reviewed with status: kudos'),
+            '99999999': ('not_found', 'Case not found in any stage'),
+        }
+        for casenum, (stage, message) in expected.items():
+            with self.assertNumQueries(1):
+                response = self.client.get(f'/api/caselookup/status/{casenum}/')
+            self.assertEqual((response.data['status'], response.data['message']), (stage, message))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_reads_only_current_stage(self):
+        now = timezone.now()
+        for status_value in ('pingedlow', 'resolved'):
+            ReviewedClaim.objects.create(
+                casenum='10000003', tech_id=self.tech, lead_id=self.lead,
+                claim_time=now, complete_time=now, status=status_value, comment='',
+            )
+        caseindex.rebuild()
+        self.client.force_authenticate(user=self.lead)
+        self.client.get('/api/caselookup/status/10000003/')  # warm the role cache
+
+        # index read + latest review
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/caselookup/search/10000003/')
+        self.assertEqual(response.data['current_status'], 'reviewed')
+        self.assertEqual(response.data['data']['status'], 'resolved')
+        self.assertEqual(response.data['total_reviews'], 2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/caselookup/history/99999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BatchCaseStatusTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.tech = User.objects.create_user(username='tech', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+    def _add_cases(self, count):
+        now = timezone.now()
+        ReviewedClaim.objects.bulk_create(
+            ReviewedClaim(
+                casenum=f'{i:08d}', tech_id=self.tech, lead_id=self.lead,
+                claim_time=now, complete_time=now, status='checked', comment='',
+            )
+            for i in range(count)
+        )
+        return [f'{i:08d}' for i in range(count)]
+
+    def test_stages_and_latest_review(self):
+        now = timezone.now()
+        ActiveClaim.objects.create(casenum='10000001', user_id=self.tech)
+        CompleteClaim.objects.create(casenum='10000002', user_id=self.tech, lead_id=self.lead, claim_time=now)
+        for status_value in ('pingedmed', 'acknowledged'):
+            ReviewedClaim.objects.create(
+                casenum='10000003', tech_id=self.tech, lead_id=self.lead,
+                claim_time=now, complete_time=now, status=status_value, comment='',
+            )
+
+        response = self.client.post('/api/caselookup/batch/', {
+            'casenums': '10000001, 10000002\n10000003 99999999 10000001',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['found'], 3)
+        results = response.data['results']
+        self.assertEqual(list(results), ['10000001', '10000002', '10000003', '99999999'])
+        self.assertEqual(results['10000001']['status'], 'active')
+        self.assertEqual((results['10000002']['status'], results['10000002']['lead']), ('complete', 'lead'))
+        self.assertEqual(results['10000003']['latest_review']['status'], 'acknowledged')
+        self.assertEqual(results['10000003']['total_reviews'], 2)
+        self.assertEqual(results['99999999']['status'], 'not_found')
+
+    def test_query_count_independent_of_batch_size(self):
+        casenums = self._add_cases(300)
+        self.client.post('/api/caselookup/batch/', {'casenums': ['1']}, format='json')  # warm the role cache
+
+        for size in (1, 300):
+            # one casenum__in query per claim table
+            with self.assertNumQueries(3):
+                response = self.client.post('/api/caselookup/batch/', {'casenums': casenums[:size]}, format='json')
+            self.assertEqual(response.data['found'], size)
+
+    def test_rejects_oversized_batch(self):
+        response = self.client.post('/api/caselookup/batch/', {'casenums': [str(i) for i in range(501)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CaseIndexBackfillTest(TransactionTestCase):
+    def test_migration_indexes_existing_cases(self):
+        MigrationExecutor(connection).migrate([('caselookup', '0001_initial')])
+        tech = User.objects.create(username='tech')
+        lead = User.objects.create(username='lead')
+        ActiveClaim.objects.create(casenum='11111111', user_id=tech)
+        CompleteClaim.objects.create(casenum='22222222', user_id=tech, lead_id=lead, claim_time=timezone.now())
+        ReviewedClaim.objects.create(
+            casenum='33333333', tech_id=tech, lead_id=lead,
+            claim_time=timezone.now(), complete_time=timezone.now(), status='kudos', comment='',
+        )
+        self.assertFalse(CaseIndex.objects.exists())
+
+        MigrationExecutor(connection).migrate([('caselookup', '0002_backfill_caseindex')])
+        self.assertEqual(
+            dict(CaseIndex.objects.values_list('casenum', 'stage')),
+            {'11111111': 'active', '22222222': 'complete', '33333333': 'reviewed'},
+        )
@@ -6,5 +6,6 @@ urlpatterns = [
     path('search/<str:casenum>/', views.search_case),
     path('history/<str:casenum>/', views.get_case_history),
     path('status/<str:casenum>/', views.get_case_status),
+    path('batch/', views.batch_case_status),
 ]
 
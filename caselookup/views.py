@@ -1,13 +1,17 @@
+import re
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 
 from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from user.authentication import CachedTokenAuthentication
 from user.decorators import role_required
 
+from caselookup.models import CaseIndex
 from activeclaim.models import ActiveClaim
 from activeclaim.serializers import ActiveClaimSerializer
 from completeclaim.models import CompleteClaim
@@ -15,6 +19,9 @@ from completeclaim.serializers import CompleteClaimSerializer
 from reviewedclaim.models import ReviewedClaim
 from reviewedclaim.serializers import ReviewedClaimSerializer
 
+# Maximum number of case numbers accepted by one batch lookup
+BATCH_LIMIT = 500
+
 
 @api_view(['GET'])
 def get_routes(request):
@@ -37,12 +44,18 @@ def get_routes(request):
             'body': None,
             'description': 'Get a quick status check for a case (active/complete/reviewed/not found).'
         },
+        {
+            'Endpoint': '/batch/',
+            'method': 'POST',
+            'body': {'casenums': ['case number', '...']},
+            'description': f'Get the current stage and latest review for up to {BATCH_LIMIT} cases at once.'
+        },
     ]
     return Response(routes)
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def search_case(request, casenum):
@@ -61,42 +74,44 @@ def search_case(request, casenum):
         'data': None
     }
     
-    # Check ActiveClaim first (currently being worked on)
-    try:
-        active_claim = ActiveClaim.objects.get(casenum=casenum)
-        result['found'] = True
-        result['current_status'] = 'active'
-        result['data'] = ActiveClaimSerializer(active_claim).data
-        return Response(result, status=status.HTTP_200_OK)
-    except ActiveClaim.DoesNotExist:
-        pass
-    
-    # Check CompleteClaim (completed, awaiting review)
-    try:
-        complete_claim = CompleteClaim.objects.get(casenum=casenum)
-        result['found'] = True
-        result['current_status'] = 'complete'
-        result['data'] = CompleteClaimSerializer(complete_claim).data
-        return Response(result, status=status.HTTP_200_OK)
-    except CompleteClaim.DoesNotExist:
-        pass
-    
-    # Check ReviewedClaim (already reviewed - may have multiple entries)
-    reviewed_claims = ReviewedClaim.objects.filter(casenum=casenum).order_by('-review_time')
-    if reviewed_claims.exists():
-        result['found'] = True
-        result['current_status'] = 'reviewed'
-        # Return the most recent review, but include count of all reviews
-        result['data'] = ReviewedClaimSerializer(reviewed_claims.first()).data
-        result['total_reviews'] = reviewed_claims.count()
-        return Response(result, status=status.HTTP_200_OK)
-    
-    # Case not found in any table
-    return Response(result, status=status.HTTP_404_NOT_FOUND)
+    # The index says which table holds the case, so only that one is read
+    entry = CaseIndex.objects.filter(casenum=casenum).first()
+    stage = entry.stage if entry else None
+    
+    if stage == 'active':
+        # Currently being worked on
+        claim = ActiveClaim.objects.select_related('user_id').filter(casenum=casenum).first()
+        if claim:
+            result['data'] = ActiveClaimSerializer(claim).data
+    elif stage == 'complete':
+        # Completed, awaiting review
+        claim = CompleteClaim.objects.select_related('user_id', 'lead_id').filter(casenum=casenum).first()
+        if claim:
+            result['data'] = CompleteClaimSerializer(claim).data
+    elif stage == 'reviewed':
+        # Already reviewed - return the most recent review, but include count of all reviews
+        claim = (
+            ReviewedClaim.objects
+            .filter(casenum=casenum)
+            .select_related('tech_id', 'lead_id')
+            .order_by('-review_time', '-id')
+            .first()
+        )
+        if claim:
+            result['data'] = ReviewedClaimSerializer(claim).data
+            result['total_reviews'] = entry.review_count
+    
+    if result['data'] is None:
+        # Case not found in any table
+        return Response(result, status=status.HTTP_404_NOT_FOUND)
+    
+    result['found'] = True
+    result['current_status'] = stage
+    return Response(result, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_case_history(request, casenum):
@@ -110,9 +125,19 @@ def get_case_history(request, casenum):
         'timeline': []
     }
     
+    # The index tells us which stages can hold the case; an unindexed case is in none
+    entry = CaseIndex.objects.filter(casenum=casenum).first()
+    if entry is None:
+        return Response({
+            'casenum': casenum,
+            'error': 'Case not found in any stage'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
     # Check if currently active
-    try:
-        active_claim = ActiveClaim.objects.get(casenum=casenum)
+    active_claim = None
+    if entry.stage == 'active':
+        active_claim = ActiveClaim.objects.select_related('user_id').filter(casenum=casenum).first()
+    if active_claim:
         history['timeline'].append({
             'stage': 'active',
             'status': 'current',
@@ -120,12 +145,12 @@ def get_case_history(request, casenum):
             'claim_time': active_claim.claim_time,
             'data': ActiveClaimSerializer(active_claim).data
         })
-    except ActiveClaim.DoesNotExist:
-        pass
     
-    # Check if in complete stage
-    try:
-        complete_claim = CompleteClaim.objects.get(casenum=casenum)
+    # Check if in complete stage (a reviewed case has already left it)
+    complete_claim = None
+    if entry.stage != 'reviewed':
+        complete_claim = CompleteClaim.objects.select_related('user_id', 'lead_id').filter(casenum=casenum).first()
+    if complete_claim:
         history['timeline'].append({
             'stage': 'complete',
             'status': 'current',
@@ -135,11 +160,14 @@ def get_case_history(request, casenum):
             'reviewing_lead': complete_claim.lead_id.username if complete_claim.lead_id else None,
             'data': CompleteClaimSerializer(complete_claim).data
         })
-    except CompleteClaim.DoesNotExist:
-        pass
     
     # Get all reviewed entries (there may be multiple if case was pinged multiple times)
-    reviewed_claims = ReviewedClaim.objects.filter(casenum=casenum).order_by('review_time')
+    reviewed_claims = (
+        ReviewedClaim.objects
+        .filter(casenum=casenum)
+        .select_related('tech_id', 'lead_id')
+        .order_by('review_time')
+    ) if entry.review_count else []
     for review in reviewed_claims:
         history['timeline'].append({
             'stage': 'reviewed',
@@ -163,42 +191,38 @@ def get_case_history(request, casenum):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_case_status(request, casenum):
     """
     Quick status check for a case.
     
-    Returns just the current stage and basic info.
+    Returns just the current stage and basic info, read from the case index.
     """
-    # Check ActiveClaim
-    if ActiveClaim.objects.filter(casenum=casenum).exists():
-        claim = ActiveClaim.objects.get(casenum=casenum)
+    entry = CaseIndex.objects.select_related('user_id', 'lead_id').filter(casenum=casenum).first()
+    
+    if entry and entry.stage == 'active':
         return Response({
             'casenum': casenum,
             'status': 'active',
-            'message': f'Case is currently active, claimed by {claim.user_id.username if claim.user_id else "unknown"}'
+            'message': f'Case is currently active, claimed by {entry.user_id.username if entry.user_id else "unknown"}'
         }, status=status.HTTP_200_OK)
     
-    # Check CompleteClaim
-    if CompleteClaim.objects.filter(casenum=casenum).exists():
-        claim = CompleteClaim.objects.get(casenum=casenum)
-        reviewing = f', being reviewed by {claim.lead_id.username}' if claim.lead_id else ''
+    if entry and entry.stage == 'complete':
+        reviewing = f', being reviewed by {entry.lead_id.username}' if entry.lead_id else ''
         return Response({
             'casenum': casenum,
             'status': 'complete',
             'message': f'Case is completed, awaiting review{reviewing}'
         }, status=status.HTTP_200_OK)
     
-    # Check ReviewedClaim
-    reviewed = ReviewedClaim.objects.filter(casenum=casenum).order_by('-review_time').first()
-    if reviewed:
+    if entry and entry.stage == 'reviewed':
         return Response({
             'casenum': casenum,
             'status': 'reviewed',
-            'review_status': reviewed.status,
-            'message': f'Case has been reviewed with status: {reviewed.status}'
+            'review_status': entry.review_status,
+            'message': f'Case has been reviewed with status: {entry.review_status}'
         }, status=status.HTTP_200_OK)
     
     # Not found
@@ -208,3 +232,93 @@ def get_case_status(request, casenum):
         'message': 'Case not found in any stage'
     }, status=status.HTTP_404_NOT_FOUND)
 
+
+@api_view(['POST'])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@role_required('Lead')  # Lead and above only
+def batch_case_status(request):
+    """
+    Current stage and latest review for many cases at once.
+    
+    Body:
+      - casenums: list of case numbers, or one string separated by commas,
+        spaces or newlines (as pasted from ServiceNow)
+    
+    Each claim table is read once with casenum__in, so the number of queries
+    does not grow with the batch.
+    """
+    casenums = request.data.get('casenums')
+    if isinstance(casenums, str):
+        casenums = re.split(r'[\s,]+', casenums)
+    if not isinstance(casenums, list):
+        return Response({'error': 'casenums must be a list of case numbers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Drop blanks and duplicates but keep the order the cases were pasted in
+    casenums = list(dict.fromkeys(str(c).strip() for c in casenums if str(c).strip()))
+    if len(casenums) > BATCH_LIMIT:
+        return Response(
+            {'error': f'At most {BATCH_LIMIT} case numbers per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    active = {
+        row['casenum']: row
+        for row in ActiveClaim.objects.filter(casenum__in=casenums).values('casenum', 'user_id__username')
+    }
+    complete = {
+        row['casenum']: row
+        for row in (
+            CompleteClaim.objects
+            .filter(casenum__in=casenums)
+            .order_by('complete_time', 'id')
+            .values('casenum', 'user_id__username', 'lead_id__username')
+        )
+    }
+    
+    # Oldest first, so the last row seen for a case is its latest review
+    latest = {}
+    total_reviews = {}
+    reviews = (
+        ReviewedClaim.objects
+        .filter(casenum__in=casenums)
+        .order_by('review_time', 'id')
+        .values('casenum', 'status', 'review_time', 'tech_id__username', 'lead_id__username')
+    )
+    for row in reviews:
+        latest[row['casenum']] = row
+        total_reviews[row['casenum']] = total_reviews.get(row['casenum'], 0) + 1
+    
+    results = {}
+    for casenum in casenums:
+        review = latest.get(casenum)
+        entry = {
+            'status': 'not_found',
+            'user': None,
+            'lead': None,
+            'latest_review': {
+                'status': review['status'],
+                'tech': review['tech_id__username'],
+                'lead': review['lead_id__username'],
+                'review_time': review['review_time'],
+            } if review else None,
+            'total_reviews': total_reviews.get(casenum, 0),
+        }
+        # Same precedence as search_case: active, then complete, then reviewed
+        if casenum in active:
+            entry.update(status='active', user=active[casenum]['user_id__username'])
+        elif casenum in complete:
+            entry.update(
+                status='complete',
+                user=complete[casenum]['user_id__username'],
+                lead=complete[casenum]['lead_id__username'],
+            )
+        elif review:
+            entry.update(status='reviewed', user=review['tech_id__username'], lead=review['lead_id__username'])
+        results[casenum] = entry
+    
+    return Response({
+        'count': len(casenums),
+        'found': sum(1 for entry in results.values() if entry['status'] != 'not_found'),
+        'results': results
+    }, status=status.HTTP_200_OK)
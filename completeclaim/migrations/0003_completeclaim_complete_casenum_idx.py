@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('completeclaim', '0002_completeclaim_lead_id_alter_completeclaim_user_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='completeclaim',
+            index=models.Index(fields=['casenum'], name='complete_casenum_idx'),
+        ),
+    ]
@@ -12,6 +12,11 @@ class CompleteClaim(models.Model):
     claim_time = models.DateTimeField()
     complete_time = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['casenum'], name='complete_casenum_idx'),
+        ]
+
 
     def __str__(self):
         lead_email = self.lead_id.email if self.lead_id else 'No Lead'
@@ -17,3 +17,30 @@ class CompleteClaimSerializer(serializers.ModelSerializer):
         if obj.user_id:
             return f"{obj.user_id.first_name} {obj.user_id.last_name}".strip()
         return None
+
+    @staticmethod
+    def values_data(queryset):
+        """
+        Read-only fast path for list endpoints.
+
+        Produces the same dicts as CompleteClaimSerializer(queryset, many=True).data
+        from a single joined .values() query, without instantiating models.
+        """
+        to_datetime = serializers.DateTimeField().to_representation
+        rows = queryset.values(
+            'id', 'casenum', 'claim_time', 'complete_time', 'user_id', 'lead_id',
+            'user_id__username', 'user_id__first_name', 'user_id__last_name',
+        )
+        return [
+            {
+                'id': row['id'],
+                'user_name': row['user_id__username'],
+                'full_name': f"{row['user_id__first_name']} {row['user_id__last_name']}".strip(),
+                'casenum': row['casenum'],
+                'claim_time': to_datetime(row['claim_time']),
+                'complete_time': to_datetime(row['complete_time']),
+                'user_id': row['user_id'],
+                'lead_id': row['lead_id'],
+            }
+            for row in rows
+        ]
@@ -1,3 +1,111 @@
+from django.contrib.auth.models import User, Group
 from django.test import TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from completeclaim.models import CompleteClaim
+from completeclaim.serializers import CompleteClaimSerializer
+from user.decorators import _group_cache
+
+
+class CompleteClaimSerializerTest(TestCase):
+    def test_values_data_matches_model_serializer(self):
+        tech = User.objects.create_user(username='tech', password='pw', first_name='Grace')
+        lead = User.objects.create_user(username='lead', password='pw')
+        CompleteClaim.objects.create(casenum='11111111', user_id=tech, claim_time=timezone.now())
+        CompleteClaim.objects.create(casenum='22222222', user_id=tech, lead_id=lead, claim_time=timezone.now())
+
+        claims = CompleteClaim.objects.order_by('id')
+        expected = [dict(row) for row in CompleteClaimSerializer(claims, many=True).data]
+        self.assertEqual(CompleteClaimSerializer.values_data(claims), expected)
+
+
+class ListCompleteClaimsQueryCountTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+    def _add_claims(self, count):
+        start = CompleteClaim.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create(username=f'user{i}')
+            CompleteClaim.objects.create(casenum=f'{i:08d}', user_id=user, lead_id=self.lead, claim_time=timezone.now())
+
+    def test_query_count_independent_of_rows(self):
+        self.client.get('/api/completeclaim/list/')  # warm the role cache
+
+        self._add_claims(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/completeclaim/list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+        self._add_claims(30)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/completeclaim/list/')
+        self.assertEqual(len(response.data), 33)
+
+
+class CompleteClaimDeltaTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create(username='lead')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+    def _since(self, version):
+        response = self.client.get('/api/completeclaim/list/', {'since': version})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_transitions_appear_in_delta(self):
+        version = self._since(0)['version']
+        self.client.post('/api/activeclaim/create/11111111/')
+        self.client.post('/api/activeclaim/create/22222222/')
+        self.client.delete('/api/activeclaim/complete/11111111/')
+        self.client.delete('/api/activeclaim/complete/22222222/')
+        first, second = CompleteClaim.objects.order_by('id')
+
+        delta = self._since(version)
+        self.assertEqual([row['id'] for row in delta['changed']], [first.id, second.id])
+        version = delta['version']
+
+        self.client.post(f'/api/completeclaim/begin-review/{first.id}/')
+        self.client.post(f'/api/completeclaim/review/{second.id}/', {'status': 'kudos'})
+        delta = self._since(version)
+        self.assertEqual([(row['id'], row['lead_id']) for row in delta['changed']], [(first.id, self.lead.id)])
+        self.assertEqual(delta['deleted'], [second.id])
+
+        self.client.delete(f'/api/completeclaim/{first.id}/')
+        self.assertEqual(self._since(delta['version'])['deleted'], [first.id])
+
+
+class ReviewCompleteClaimTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.leads = [User.objects.create(username=f'lead{i}') for i in range(2)]
+        Group.objects.get(name='Lead').user_set.add(*self.leads)
+        tech = User.objects.create(username='tech')
+        self.claim = CompleteClaim.objects.create(casenum='11111111', user_id=tech, claim_time=timezone.now())
+        self.client = APIClient()
+
+    def test_only_the_reviewing_lead_can_review(self):
+        first, second = self.leads
+        self.client.force_authenticate(user=first)
+        self.client.post(f'/api/completeclaim/begin-review/{self.claim.id}/')
+
+        self.client.force_authenticate(user=second)
+        response = self.client.post(f'/api/completeclaim/review/{self.claim.id}/', {'status': 'kudos'})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertTrue(CompleteClaim.objects.filter(pk=self.claim.pk).exists())
+
+        self.client.force_authenticate(user=first)
+        response = self.client.post(f'/api/completeclaim/review/{self.claim.id}/', {'status': 'kudos'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['lead_id'], first.id)
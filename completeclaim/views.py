@@ -1,20 +1,29 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from django.db import transaction
+from django.db.models import Q
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from api.broadcast import PINGS, REVIEWS, publish
 
 from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from user.authentication import CachedTokenAuthentication
 from user.decorators import group_required, role_required
 
 from completeclaim.models import CompleteClaim
 from completeclaim.serializers import CompleteClaimSerializer
 from reviewedclaim.models import ReviewedClaim
 from reviewedclaim.serializers import ReviewedClaimSerializer
+from reports import rollup
+from caselookup import caseindex
+from events import changelog
+from events.models import ClaimChange
+
+
+PING_STATUSES = ('pingedlow', 'pingedmed', 'pingedhigh')
 
 
 @api_view(['GET'])
@@ -36,45 +45,56 @@ def get_routes(request):
             'Endpoint': '/list/',
             'method': 'GET',
             'body': None,
-            'description': 'Lists all complete claims.'
+            'query_params': {'since': 'version from the previous response (0 for a full snapshot)'},
+            'description': 'Lists all complete claims, or with since only those changed after that version.'
         },
     ]
     return Response(routes)
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (hierarchical)
 def begin_review(request, pk):
     try:
         claim = CompleteClaim.objects.get(pk=pk)
-        claim.lead_id = request.user
-        claim.save()
+        with transaction.atomic():
+            # Take the claim only if no other lead has it, in the same UPDATE
+            taken = CompleteClaim.objects.filter(
+                Q(lead_id__isnull=True) | Q(lead_id=request.user), pk=pk
+            ).update(lead_id=request.user)
+            if not taken:
+                if not CompleteClaim.objects.filter(pk=pk).exists():
+                    raise CompleteClaim.DoesNotExist
+                return Response(
+                    {'error': 'Another lead is already reviewing this claim.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            claim.lead_id = request.user
+            caseindex.sync_case(claim.casenum)
+            changelog.record(ClaimChange.COMPLETE, claim.pk)
 
         serializer = CompleteClaimSerializer(claim)
 
         # Notify WebSocket
-        async_to_sync(get_channel_layer().group_send)(
-            "caseflow",
-            {
-                "type": "completeclaim",
-                "event": "begin-review",
-                "casenum": claim.casenum,
-                "user": claim.lead_id.username
-            }
-        )
+        publish({
+            "type": "completeclaim",
+            "event": "begin-review",
+            "casenum": claim.casenum,
+            "user": claim.lead_id.username
+        }, REVIEWS)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     except CompleteClaim.DoesNotExist:
         return Response({'error': 'Claim not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (hierarchical)
 def review_complete_claim(request, pk):
     try:
-        claim = CompleteClaim.objects.get(pk=pk)
+        claim = CompleteClaim.objects.select_related('user_id').get(pk=pk)
         tech = claim.user_id
         lead = request.user
         status_value = request.data.get('status')
@@ -83,46 +103,72 @@ def review_complete_claim(request, pk):
         if not tech or not lead or not status_value:
             return Response({'error': 'Status are required fields'}, status=status.HTTP_400_BAD_REQUEST)
 
-        new_claim = ReviewedClaim.objects.create(
-            casenum=claim.casenum,
-            tech_id=tech,
-            lead_id=lead,
-            claim_time=claim.claim_time,
-            complete_time=claim.complete_time,
-            status=status_value,
-            comment=comment
-        )
-
-        claim.delete()
+        with transaction.atomic():
+            # Only the request that removes the complete claim records a review,
+            # and only if no other lead has begun reviewing it
+            removed = CompleteClaim.objects.filter(
+                Q(lead_id__isnull=True) | Q(lead_id=lead), pk=claim.pk
+            ).delete()[0]
+            if not removed:
+                if not CompleteClaim.objects.filter(pk=claim.pk).exists():
+                    raise CompleteClaim.DoesNotExist
+                return Response(
+                    {'error': 'Another lead is already reviewing this claim.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            new_claim = ReviewedClaim.objects.create(
+                casenum=claim.casenum,
+                tech_id=tech,
+                lead_id=lead,
+                claim_time=claim.claim_time,
+                complete_time=claim.complete_time,
+                status=status_value,
+                comment=comment
+            )
+            rollup.record_review(new_claim)
+            changelog.record(ClaimChange.COMPLETE, claim.pk)
+            caseindex.sync_case(new_claim.casenum)
 
         serializer = ReviewedClaimSerializer(new_claim)
 
         # Notify WebSocket
-        async_to_sync(get_channel_layer().group_send)(
-            "caseflow",
-            {
-                "type": "completeclaim",
-                "event": "review",
+        publish({
+            "type": "completeclaim",
+            "event": "review",
+            "casenum": new_claim.casenum,
+            "user": new_claim.lead_id.username
+        }, REVIEWS)
+        if new_claim.status in PING_STATUSES:
+            publish({
+                "type": "reviewedclaim",
+                "event": "ping",
                 "casenum": new_claim.casenum,
+                "status": new_claim.status,
                 "user": new_claim.lead_id.username
-            }
-        )
+            }, PINGS, new_claim.tech_id_id)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     except CompleteClaim.DoesNotExist:
         return Response({'error': 'Claim not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (hierarchical)
 def list_complete_claims(request):
     claims = CompleteClaim.objects.all()
-    serializer = CompleteClaimSerializer(claims, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    since = request.query_params.get('since')
+    if since is None:
+        return Response(CompleteClaimSerializer.values_data(claims), status=status.HTTP_200_OK)
+    
+    try:
+        data = changelog.delta(ClaimChange.COMPLETE, claims, since, CompleteClaimSerializer.values_data)
+    except ValueError:
+        return Response({'error': 'since must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data, status=status.HTTP_200_OK)
 
 @api_view(['DELETE'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (hierarchical)
 def delete_complete_claim(request, pk):
@@ -131,7 +177,11 @@ def delete_complete_claim(request, pk):
     """
     try:
         claim = CompleteClaim.objects.get(pk=pk)
-        claim.delete()
+        with transaction.atomic():
+            if not CompleteClaim.objects.filter(pk=claim.pk).delete()[0]:
+                raise CompleteClaim.DoesNotExist
+            changelog.record(ClaimChange.COMPLETE, claim.pk)
+            caseindex.sync_case(claim.casenum)
         return Response({'message': 'CompleteClaim deleted successfully'}, status=status.HTTP_200_OK)
     except CompleteClaim.DoesNotExist:
         return Response({'error': 'Claim not found'}, status=status.HTTP_404_NOT_FOUND)
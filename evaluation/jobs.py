@@ -0,0 +1,191 @@
+"""
+In-process background jobs for long-running exports.
+
+Exports such as geneval can outlast nginx's proxy_read_timeout, so instead of
+running inside the request they are recorded as ExportJob rows and run on a
+small thread pool in the web process. No broker is needed: the row holds the
+status for polling, the artifact is written to EXPORT_JOB_DIR, and an
+"export" event is pushed over ws/caseflow/ to the requesting user when a job
+finishes.
+
+Handlers are registered per job kind with @handler(kind). A handler receives
+the job's params and a binary file to write the artifact to, and returns the
+artifact's download filename; any exception it raises fails the job.
+
+While a job runs, its process holds an flock on `<id>.lock` in EXPORT_JOB_DIR.
+A job still marked running whose lock nobody holds was left by a process that
+died, and is failed by recover() when the server starts (see api.asgi).
+"""
+
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from api.broadcast import EXPORTS, publish
+from evaluation.models import ExportJob
+
+_handlers = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def handler(kind):
+    """Register the function that runs jobs of the given kind."""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def submit(kind, params, user):
+    """Record a new job and queue it once the surrounding transaction commits."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown export job kind: {kind}")
+    prune()
+    job = ExportJob.objects.create(kind=kind, params=params, requested_by=user)
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    return job
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_JOB_WORKERS,
+                thread_name_prefix='export-job',
+            )
+        return _executor
+
+
+def recover():
+    """
+    Run once as a server process starts: fail the jobs a dead process left
+    running and queue the ones it never started. run() claims each job
+    atomically, so several processes queuing the same job is harmless.
+    """
+    # Handlers register when their views are imported, which otherwise only
+    # happens on the first request
+    import evaluation.views
+
+    fail_interrupted()
+    queued = list(ExportJob.objects.filter(status=ExportJob.QUEUED).values_list('pk', flat=True))
+    for pk in queued:
+        _get_executor().submit(_run_in_thread, pk)
+
+
+def _run_in_thread(pk):
+    try:
+        run(pk)
+    finally:
+        # Pool threads open their own connections; don't leave them dangling
+        connections.close_all()
+
+
+@contextmanager
+def _job_lock(pk):
+    """Hold the job's lock file; yields False if another thread or process holds it."""
+    os.makedirs(settings.EXPORT_JOB_DIR, exist_ok=True)
+    with open(os.path.join(settings.EXPORT_JOB_DIR, f"{pk}.lock"), 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+        else:
+            # Closing the file releases the lock, also when the process dies
+            yield True
+
+
+def run(pk):
+    """
+    Run one queued job to completion and record the outcome.
+
+    Only the caller that moves the job from queued to running does the work,
+    so a job submitted twice still runs once. The job's lock is held from
+    before the claim until the outcome is saved.
+    """
+    with _job_lock(pk) as locked:
+        if not locked:
+            return
+        claimed = ExportJob.objects.filter(pk=pk, status=ExportJob.QUEUED).update(
+            status=ExportJob.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            _run_claimed(ExportJob.objects.select_related('requested_by').get(pk=pk))
+
+
+def _run_claimed(job):
+    partial_path = f"{job.artifact_path}.part"
+    try:
+        with open(partial_path, 'wb') as output:
+            filename = _handlers[job.kind](job.params, output)
+        os.replace(partial_path, job.artifact_path)
+    except Exception as e:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        job.status = ExportJob.FAILED
+        job.error = str(e) or e.__class__.__name__
+    else:
+        job.status = ExportJob.SUCCEEDED
+        job.filename = filename
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'filename', 'finished_at'])
+    _notify(job)
+
+
+def fail_interrupted():
+    """
+    Fail jobs left running by a process that died (nobody holds their lock),
+    so they stop answering 409 forever. Returns how many were failed.
+    """
+    failed = 0
+    for pk in ExportJob.objects.filter(status=ExportJob.RUNNING).values_list('pk', flat=True):
+        with _job_lock(pk) as locked:
+            if not locked:
+                continue  # still running in another process
+            interrupted = ExportJob.objects.filter(pk=pk, status=ExportJob.RUNNING).update(
+                status=ExportJob.FAILED,
+                error='Interrupted by a server restart',
+                finished_at=timezone.now(),
+            )
+            if not interrupted:
+                continue
+            job = ExportJob.objects.select_related('requested_by').get(pk=pk)
+            if os.path.exists(f"{job.artifact_path}.part"):
+                os.remove(f"{job.artifact_path}.part")
+            _notify(job)
+            failed += 1
+    return failed
+
+
+def _notify(job):
+    """Tell the requesting user a job has finished."""
+    publish({
+        "type": "export",
+        "event": "complete" if job.status == ExportJob.SUCCEEDED else "failed",
+        "job": str(job.pk),
+        "kind": job.kind,
+        "user": job.requested_by.username
+    }, EXPORTS, job.requested_by_id)
+
+
+def prune():
+    """Delete finished jobs (and their artifacts) older than EXPORT_JOB_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.EXPORT_JOB_RETENTION_DAYS)
+    expired = ExportJob.objects.filter(
+        status__in=[ExportJob.SUCCEEDED, ExportJob.FAILED],
+        finished_at__lt=cutoff,
+    )
+    for job in expired:
+        for path in (job.artifact_path, f"{job.artifact_path}.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+    expired.delete()
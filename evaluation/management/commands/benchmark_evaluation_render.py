@@ -0,0 +1,51 @@
+"""
+Micro-benchmark of per-document render time for each evaluation template,
+re-parsing the template every time versus rendering from the cached copy.
+
+Usage:
+    python manage.py benchmark_evaluation_render --iterations 50
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from evaluation.rendering import create_document, create_document_uncached
+
+TEMPLATES = [f'templates/template{rows}row.docx' for rows in range(1, 6)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-document render time with and without the template cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Documents rendered per template and mode (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        # Fill every slot any template has
+        fields = {i: f'Field {i}' for i in range(1, 100)}
+
+        self.stdout.write(f"{'template':<24}{'uncached':>12}{'cached':>12}{'speed-up':>10}")
+        for name in TEMPLATES:
+            template_path = os.path.join(settings.BASE_DIR, name)
+            create_document(template_path, fields)  # parse once, outside the timing
+
+            uncached = self.time_render(create_document_uncached, template_path, fields, iterations)
+            cached = self.time_render(create_document, template_path, fields, iterations)
+            self.stdout.write(
+                f"{os.path.basename(name):<24}{uncached * 1000:>10.2f}ms{cached * 1000:>10.2f}ms{uncached / cached:>9.2f}x"
+            )
+
+    def time_render(self, render, template_path, fields, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            render(template_path, fields)
+        return (time.perf_counter() - start) / iterations
@@ -0,0 +1,106 @@
+"""
+Time evaluation/geneval for a synthetic month, rendering serially and in the
+process pool.
+
+Creates N techs with a month of reviews inside a transaction that is rolled
+back at the end, so nothing is left in the database.
+
+Usage:
+    python manage.py benchmark_geneval --techs 50 --claims 40 --workers 4
+"""
+
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from evaluation.views import geneval
+from reviewedclaim.models import ReviewedClaim
+
+STATUS_CYCLE = ['checked', 'checked', 'kudos', 'pingedlow', 'pingedmed', 'resolved']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark evaluation/geneval serial vs parallel document rendering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--techs', type=int, default=50, help='Number of synthetic techs (default: 50)')
+        parser.add_argument('--claims', type=int, default=40, help='Reviews per tech (default: 40)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.GENEVAL_WORKERS,
+            help='Worker processes for the parallel run (default: GENEVAL_WORKERS)',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per mode; the best is reported (default: 3)')
+        parser.add_argument('--month', type=int, default=1, help='Synthetic month (default: 1)')
+        parser.add_argument('--year', type=int, default=2001, help='Synthetic year (default: 2001)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            lead = self.create_month(options)
+            request = APIRequestFactory().get('/api/evaluation/geneval/', {
+                'month': options['month'], 'year': options['year'],
+            })
+            force_authenticate(request, user=lead)
+
+            self.stdout.write(self.style.NOTICE(
+                f"{options['techs']} techs x {options['claims']} reviews, "
+                f"{options['workers']} workers, best of {options['repeat']}"
+            ))
+            serial = self.time_geneval(request, 1, options['repeat'])
+            self.stdout.write(f"  serial:   {serial:.3f}s")
+
+            # Start the pool before timing so worker start-up is not counted
+            self.time_geneval(request, options['workers'], 1)
+            parallel = self.time_geneval(request, options['workers'], options['repeat'])
+            self.stdout.write(f"  parallel: {parallel:.3f}s")
+            self.stdout.write(self.style.SUCCESS(f"  speed-up: {serial / parallel:.2f}x"))
+
+            transaction.set_rollback(True)
+
+    def create_month(self, options):
+        lead = User.objects.create(username='geneval-benchmark-lead')
+        lead.groups.add(Group.objects.get(name='Lead'))
+        review_time = timezone.make_aware(datetime(options['year'], options['month'], 15))
+
+        reviews = []
+        for t in range(options['techs']):
+            tech = User.objects.create(
+                username=f'geneval-benchmark-{t}', first_name='Bench', last_name=f'Tech{t}'
+            )
+            for c in range(options['claims']):
+                reviews.append(ReviewedClaim(
+                    casenum=f'{t:04d}{c:04d}',
+                    tech_id=tech,
+                    lead_id=lead,
+                    claim_time=review_time,
+                    complete_time=review_time,
+                    status=STATUS_CYCLE[(t + c) % len(STATUS_CYCLE)],
+                    comment='',
+                ))
+        ReviewedClaim.objects.bulk_create(reviews, batch_size=1000)
+        # review_time is auto_now_add, so move the rows into the synthetic month afterwards
+        ReviewedClaim.objects.filter(lead_id=lead).update(review_time=review_time)
+        return lead
+
+    def time_geneval(self, request, workers, repeat):
+        best = None
+        with override_settings(GENEVAL_WORKERS=workers):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = geneval(request)
+                if response.status_code != 200:
+                    raise RuntimeError(f"geneval returned {response.status_code}")
+                for _ in response.streaming_content:
+                    pass
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -1,3 +1,7 @@
+import os
+import uuid
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -54,3 +58,47 @@ class Evaluation(models.Model):
     def __str__(self):
         return f"Evaluation for {self.tech.username} by {self.evaluator.username} ({self.period_start} - {self.period_end})"
 
+
+
+class ExportJob(models.Model):
+    """
+    A long-running export (e.g. geneval) run in the background by evaluation.jobs.
+
+    The row records the job's progress so it can be polled from any request;
+    the finished artifact is written to EXPORT_JOB_DIR under the job's id.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=32)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    error = models.TextField(blank=True, default='')
+
+    # Download name of the artifact (set when the job succeeds)
+    filename = models.CharField(max_length=255, blank=True, default='')
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def artifact_path(self):
+        return os.path.join(settings.EXPORT_JOB_DIR, str(self.pk))
+
+    def __str__(self):
+        return f"Export {self.kind} {self.pk} ({self.status}) for {self.requested_by.username}"
@@ -0,0 +1,241 @@
+"""
+Word document rendering and ZIP streaming for geneval.
+
+Rendering a document is pure CPU work on python-docx objects, so geneval hands
+it to a process pool instead of blocking the request thread for every tech.
+This module deliberately avoids Django imports: pool workers only need
+python-docx and the arguments they are given. Each process parses a template
+once and renders every later document from that cached copy.
+"""
+
+import io
+import multiprocessing
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from copy import deepcopy
+from itertools import islice
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+from docx.shared import Pt
+from docx.text.paragraph import Paragraph
+from lxml import etree
+
+
+class _Template:
+    """
+    A template parsed once per process.
+
+    Holds the document XML tree, the bytes of every other package part (with
+    the Normal font already applied to styles.xml), and the position of each
+    numbered field slot among the document's paragraphs. Rendering copies the
+    tree, writes the fields straight into their paragraphs and zips the parts
+    back up, without reopening the template or walking the tables.
+    """
+
+    def __init__(self, template_path):
+        document = Document(template_path)
+        style = document.styles['Normal']
+        font = style.font
+        font.name = 'Times New Roman'
+        font.size = Pt(11)
+        # python-docx writes no style id for the default paragraph style
+        self.style_id = document.part.get_style_id(style, WD_STYLE_TYPE.PARAGRAPH)
+        
+        self.root = document.element
+        index = {p: n for n, p in enumerate(self.root.iter(qn('w:p')))}
+        
+        # Number paragraphs exactly as the original cell walk did (merged
+        # cells repeat in row.cells, so one paragraph can own several numbers)
+        self.slots = {}
+        i = 1
+        for table in document.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    for paragraph in cell.paragraphs:
+                        self.slots[i] = index[paragraph._p]
+                        i += 1
+        
+        package = io.BytesIO()
+        document.save(package)
+        with zipfile.ZipFile(package) as archive:
+            self.parts = [
+                (info, archive.read(info))
+                for info in archive.infolist()
+            ]
+    
+    def render(self, fields):
+        root = deepcopy(self.root)
+        paragraphs = list(root.iter(qn('w:p')))
+        
+        # Apply fields in number order so a paragraph with several numbers
+        # ends up with the last one, as before
+        for i in sorted(fields):
+            if i in self.slots:
+                paragraph = Paragraph(paragraphs[self.slots[i]], None)
+                paragraph.text = str(fields[i])
+                paragraph._p.style = self.style_id
+        
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for info, data in self.parts:
+                if info.filename == DOCUMENT_PART:
+                    data = etree.tostring(root, encoding='UTF-8', standalone=True)
+                archive.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+        return output.getvalue()
+
+
+DOCUMENT_PART = 'word/document.xml'
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def _get_template(template_path):
+    template = _templates.get(template_path)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(template_path)
+            if template is None:
+                template = _templates[template_path] = _Template(template_path)
+    return template
+
+
+def create_document(template_path: str, fields: dict) -> bytes:
+    """Create a Word document from a (cached) template with filled fields and return its bytes."""
+    return _get_template(template_path).render(fields)
+
+
+def create_document_uncached(template_path: str, fields: dict) -> bytes:
+    """
+    Reference implementation of create_document that reopens and walks the
+    template every time. Kept for the render benchmark and tests.
+    """
+    document = Document(template_path)
+    style = document.styles['Normal']
+    font = style.font
+    font.name = 'Times New Roman'
+    font.size = Pt(11)
+    
+    i = 1
+    for table in document.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for paragraph in cell.paragraphs:
+                    if i in fields:
+                        paragraph.text = str(fields[i])
+                        paragraph.style = document.styles['Normal']
+                    i += 1
+    
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+# One pool per process, created on first use and reused by later requests so
+# the worker start-up cost is only paid once.
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # spawn rather than fork: the server process is multi-threaded
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_workers = workers
+        return _executor
+
+
+def _discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def render_documents(jobs, workers=1):
+    """
+    Render (template_path, fields) jobs.
+
+    Yields (data, error) in job order, with error None on success, so one bad
+    document does not stop the rest. With workers <= 1 (or a single job) the
+    documents are rendered in the calling thread. At most two documents per
+    worker are in flight, so memory stays bounded however many jobs there are.
+    """
+    jobs = list(jobs)
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                yield create_document(*job), None
+            except Exception as e:
+                yield None, e
+        return
+    
+    executor = _get_executor(workers)
+    pending = deque()
+    remaining = iter(jobs)
+    try:
+        for job in islice(remaining, workers * 2):
+            pending.append(executor.submit(create_document, *job))
+        while pending:
+            future = pending.popleft()
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                raise error
+            for job in islice(remaining, 1):
+                pending.append(executor.submit(create_document, *job))
+            yield (None if error else future.result()), error
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next request
+        _discard_executor(executor)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class _ZipBuffer:
+    """Write-only file object that hands back whatever zipfile wrote since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    """
+    Yield a ZIP archive chunk by chunk for (filename, data) entries.
+
+    Each entry is compressed and yielded as soon as it arrives, so nothing is
+    written to disk and only the current document is held in memory.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in entries:
+            archive.writestr(filename, data)
+            yield buffer.drain()
+    yield buffer.drain()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Evaluation
+from .models import Evaluation, ExportJob
 
 
 class EvaluationSerializer(serializers.ModelSerializer):
@@ -39,3 +39,30 @@ class EvaluationSerializer(serializers.ModelSerializer):
     def get_evaluator_name(self, obj):
         return f"{obj.evaluator.first_name} {obj.evaluator.last_name}".strip() or obj.evaluator.username
 
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    requested_by_username = serializers.CharField(source='requested_by.username', read_only=True)
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id',
+            'kind',
+            'params',
+            'status',
+            'error',
+            'filename',
+            'requested_by',
+            'requested_by_username',
+            'created_at',
+            'started_at',
+            'finished_at',
+            'download_url',
+        ]
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.SUCCEEDED:
+            return None
+        return f"/api/evaluation/jobs/{obj.pk}/download/"
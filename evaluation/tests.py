@@ -1,4 +1,310 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import User, Group
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from api import broadcast
+from evaluation import jobs
+from evaluation.models import ExportJob
+from evaluation.rendering import create_document, create_document_uncached, render_documents, stream_zip
+from evaluation import views
+from evaluation.views import _get_eval_data
+from reviewedclaim.models import ReviewedClaim
+from user.decorators import _group_cache
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+TEMPLATE = os.path.join(TEMPLATE_DIR, 'template1row.docx')
+
+
+class RenderDocumentsTest(TestCase):
+    def test_cached_template_matches_uncached(self):
+        fields = {i: f'Field {i}' for i in range(1, 100)}
+        for rows in range(1, 6):
+            template_path = os.path.join(TEMPLATE_DIR, f'template{rows}row.docx')
+            for _ in range(2):  # the second render reuses the cached template
+                cached = zipfile.ZipFile(io.BytesIO(create_document(template_path, fields)))
+                uncached = zipfile.ZipFile(io.BytesIO(create_document_uncached(template_path, fields)))
+                self.assertEqual(cached.namelist(), uncached.namelist())
+                for name in cached.namelist():
+                    self.assertEqual(cached.read(name), uncached.read(name), f'{template_path}: {name}')
+
+    def test_errors_are_reported_per_job(self):
+        jobs = [(TEMPLATE, {18: 'Tech'}), ('missing.docx', {})]
+        (document, error), (missing, missing_error) = render_documents(jobs, workers=1)
+        self.assertIsNone(error)
+        self.assertTrue(zipfile.is_zipfile(io.BytesIO(document)))
+        self.assertIsNone(missing)
+        self.assertIsNotNone(missing_error)
+
+    def test_stream_zip(self):
+        entries = [('a.docx', b'first'), ('b.docx', b'second' * 1000)]
+        chunks = list(stream_zip(iter(entries)))
+        # one chunk per entry, then the central directory
+        self.assertEqual(len(chunks), 3)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertEqual({name: archive.read(name) for name in archive.namelist()}, dict(entries))
+
+
+class GenevalTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+        review_time = timezone.make_aware(datetime(2024, 3, 15))
+        for t, pings in enumerate([0, 3, 7]):
+            tech = User.objects.create(username=f'tech{t}', first_name='Tech', last_name=f'Number{t}')
+            statuses = ['checked', 'kudos'] + ['pingedlow'] * pings
+            for c, status_value in enumerate(statuses):
+                ReviewedClaim.objects.create(
+                    casenum=f'{t:04d}{c:04d}', tech_id=tech, lead_id=self.lead,
+                    claim_time=review_time, complete_time=review_time, status=status_value, comment='',
+                )
+        ReviewedClaim.objects.update(review_time=review_time)
+
+    def _archive_names(self):
+        response = self.client.get('/api/evaluation/geneval/', {'month': 3, 'year': 2024})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            return sorted(archive.namelist())
+
+    def test_serial_and_parallel_render_the_same_documents(self):
+        with override_settings(GENEVAL_WORKERS=1):
+            serial = self._archive_names()
+        with override_settings(GENEVAL_WORKERS=2):
+            parallel = self._archive_names()
+        self.assertEqual(serial, ['Number0 MARCH 2024.docx', 'Number1 MARCH 2024.docx', 'Number2 MARCH 2024.docx'])
+        self.assertEqual(serial, parallel)
+
+    @override_settings(GENEVAL_WORKERS=1)
+    def test_asgi_sends_first_chunk_before_rendering_everything(self):
+        token = Token.objects.create(user=self.lead)
+        rendered = []
+        render_documents = views.render_documents
+
+        def counting_render(jobs, workers):
+            for result in render_documents(jobs, workers):
+                rendered.append(result)
+                yield result
+
+        # (message, documents rendered when it was sent)
+        sent = []
+
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            sent.append((message, len(rendered)))
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/evaluation/geneval/',
+            'root_path': '', 'query_string': b'month=3&year=2024',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Token {token.key}'.encode())],
+        }
+        # Like the test client, keep the handler from closing the test transaction's connection
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            with mock.patch('evaluation.views.render_documents', counting_render):
+                async_to_sync(ASGIHandler())(scope, receive, send)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+        self.assertEqual(sent[0][0]['status'], status.HTTP_200_OK)
+        chunks = [(message['body'], count) for message, count in sent[1:] if message.get('body')]
+        first_chunk, rendered_before_first = chunks[0]
+        self.assertLess(rendered_before_first, len(rendered))
+        self.assertEqual(len(rendered), 3)
+        with zipfile.ZipFile(io.BytesIO(b''.join(body for body, _ in chunks))) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+
+
+class EvalDataQueryCountTest(TestCase):
+    def setUp(self):
+        self.lead = User.objects.create(username='lead')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.review_time = timezone.make_aware(datetime(2024, 3, 15))
+
+    def _add_month(self, techs, claims):
+        reviews = []
+        for t in range(techs):
+            tech = User.objects.create(username=f'tech{User.objects.count()}')
+            for c in range(claims):
+                reviews.append(ReviewedClaim(
+                    casenum=f'{t:04d}{c:04d}', tech_id=tech, lead_id=self.lead,
+                    claim_time=self.review_time, complete_time=self.review_time,
+                    status=['checked', 'kudos', 'pingedhigh', 'done'][c % 4], comment='',
+                ))
+        # a lead reviewed by another lead is not evaluated
+        reviews.append(ReviewedClaim(
+            casenum='99999999', tech_id=self.lead, lead_id=self.lead,
+            claim_time=self.review_time, complete_time=self.review_time, status='kudos', comment='',
+        ))
+        ReviewedClaim.objects.bulk_create(reviews)
+        ReviewedClaim.objects.update(review_time=self.review_time)
+
+    def test_fixed_query_budget(self):
+        for techs, claims in ((2, 4), (20, 40)):
+            ReviewedClaim.objects.all().delete()
+            self._add_month(techs, claims)
+            with self.assertNumQueries(1):
+                total, tech_data = _get_eval_data(3, 2024)
+            # 'done' reviews and the lead's own review are excluded
+            self.assertEqual(total, techs * claims * 3 // 4)
+            self.assertEqual(len(tech_data), techs)
+            self.assertNotIn(self.lead.id, tech_data)
+            data = next(iter(tech_data.values()))
+            self.assertEqual(data['checked_count'], claims // 4)
+            self.assertEqual(len(data['kudos_cases']), claims // 4)
+            self.assertEqual(len(data['pinged_cases']), claims // 4)
+            self.assertTrue(data['user'].username.startswith('tech'))
+
+
+class ExportJobTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+        review_time = timezone.make_aware(datetime(2024, 3, 15))
+        tech = User.objects.create(username='tech', first_name='Tech', last_name='Person')
+        ReviewedClaim.objects.create(
+            casenum='00000001', tech_id=tech, lead_id=self.lead,
+            claim_time=review_time, complete_time=review_time, status='kudos', comment='',
+        )
+        ReviewedClaim.objects.update(review_time=review_time)
+
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        settings_override = self.settings(EXPORT_JOB_DIR=export_dir.name, GENEVAL_WORKERS=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        layer = get_channel_layer()
+        self.channel = async_to_sync(layer.new_channel)()
+        group = broadcast.group_name(broadcast.EXPORTS, self.lead.id)
+        async_to_sync(layer.group_add)(group, self.channel)
+        self.addCleanup(async_to_sync(layer.group_discard), group, self.channel)
+
+    def _submit(self, month):
+        # Run the job here instead of on the pool so it sees the test transaction
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post('/api/evaluation/jobs/geneval/', {'month': month, 'year': 2024})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], ExportJob.QUEUED)
+        self.assertEqual(len(callbacks), 1)
+        jobs.run(response.data['id'])
+        jobs.run(response.data['id'])  # a second run of the same job is a no-op
+        return response.data['id']
+
+    def _event(self):
+        return json.loads(async_to_sync(get_channel_layer().receive)(self.channel)['text'])
+
+    def test_job_runs_and_artifact_downloads(self):
+        pk = self._submit(3)
+
+        job = self.client.get(f'/api/evaluation/jobs/{pk}/').data
+        self.assertEqual(job['status'], ExportJob.SUCCEEDED)
+        self.assertEqual(job['filename'], 'evaluations_3_2024.zip')
+
+        response = self.client.get(job['download_url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), ['Person MARCH 2024.docx'])
+
+        event = self._event()
+        self.assertEqual((event['type'], event['event'], event['job']), ('export', 'complete', str(pk)))
+
+    def test_failed_job_records_error(self):
+        pk = self._submit(4)
+
+        job = self.client.get(f'/api/evaluation/jobs/{pk}/').data
+        self.assertEqual(job['status'], ExportJob.FAILED)
+        self.assertEqual(job['error'], 'No cases found for April 2024')
+        self.assertIsNone(job['download_url'])
+        response = self.client.get(f'/api/evaluation/jobs/{pk}/download/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self._event()['event'], 'failed')
+
+    def test_interrupted_job_is_failed_at_startup(self):
+        stale = ExportJob.objects.create(
+            kind='geneval', params={'month': 3, 'year': 2024}, requested_by=self.lead,
+            status=ExportJob.RUNNING, started_at=timezone.now(),
+        )
+        live = ExportJob.objects.create(
+            kind='geneval', params={'month': 3, 'year': 2024}, requested_by=self.lead,
+            status=ExportJob.RUNNING, started_at=timezone.now(),
+        )
+        # live is still being run by another process, which holds its lock
+        with jobs._job_lock(live.pk) as locked:
+            self.assertTrue(locked)
+            self.assertEqual(jobs.fail_interrupted(), 1)
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ExportJob.FAILED)
+        self.assertEqual(stale.error, 'Interrupted by a server restart')
+        live.refresh_from_db()
+        self.assertEqual(live.status, ExportJob.RUNNING)
+        event = self._event()
+        self.assertEqual((event['event'], event['job']), ('failed', str(stale.pk)))
+
+    def test_recover_queues_jobs_left_queued(self):
+        job = ExportJob.objects.create(kind='geneval', params={'month': 3, 'year': 2024}, requested_by=self.lead)
+        with mock.patch.object(jobs, '_get_executor') as get_executor:
+            jobs.recover()
+        get_executor.return_value.submit.assert_called_once_with(jobs._run_in_thread, job.pk)
+
+    def test_job_visible_only_to_requester_and_managers(self):
+        pk = self._submit(3)
+        other_lead = User.objects.create_user(username='otherlead', password='pw')
+        other_lead.groups.add(Group.objects.get(name='Lead'))
+        self.client.force_authenticate(user=other_lead)
+        for url in (f'/api/evaluation/jobs/{pk}/', f'/api/evaluation/jobs/{pk}/download/'):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        manager = User.objects.create_user(username='manager', password='pw')
+        manager.groups.add(Group.objects.get(name='Manager'))
+        self.client.force_authenticate(user=manager)
+        for url in (f'/api/evaluation/jobs/{pk}/', f'/api/evaluation/jobs/{pk}/download/'):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_locked_job_is_not_run_twice(self):
+        job = ExportJob.objects.create(kind='geneval', params={'month': 3, 'year': 2024}, requested_by=self.lead)
+        with jobs._job_lock(job.pk):
+            jobs.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.QUEUED)
+
+    def test_invalid_period_is_rejected_up_front(self):
+        response = self.client.post('/api/evaluation/jobs/geneval/', {'month': 13, 'year': 2024})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ExportJob.objects.exists())
@@ -11,5 +11,8 @@ urlpatterns = [
     path('delete/<int:pk>/', views.delete_evaluation),
     path('generate/<int:user_id>/', views.generate_evaluation_data),
     path('geneval/', views.geneval),  # Auto-generate evaluations ZIP
+    path('jobs/geneval/', views.create_geneval_job),
+    path('jobs/<uuid:pk>/', views.get_export_job),
+    path('jobs/<uuid:pk>/download/', views.download_export_job),
 ]
 
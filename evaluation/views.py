@@ -3,28 +3,31 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view
 
 from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User, Group
 from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from datetime import datetime
+from itertools import chain
 import statistics
-import zipfile
 import os
-import tempfile
 
+from user.authentication import CachedTokenAuthentication
 from user.decorators import role_required
+from reports.aggregates import PING_STATUSES, count_by, review_breakdown, status_conditions
 
-from .models import Evaluation
-from .serializers import EvaluationSerializer
+from . import jobs
+from .models import Evaluation, ExportJob
+from .serializers import EvaluationSerializer, ExportJobSerializer
 from reviewedclaim.models import ReviewedClaim
 
 # Try to import python-docx for Word document generation
 try:
-    from docx import Document
-    from docx.shared import Pt
+    from .rendering import render_documents, stream_zip
     DOCX_AVAILABLE = True
 except ImportError:
     DOCX_AVAILABLE = False
@@ -83,12 +86,36 @@ def get_routes(request):
             'query_params': {'start_date': 'YYYY-MM-DD', 'end_date': 'YYYY-MM-DD'},
             'description': 'Generate evaluation data/metrics for a user (does not save, just calculates).'
         },
+        {
+            'Endpoint': '/geneval/',
+            'method': 'GET',
+            'query_params': {'month': '1-12', 'year': 'YYYY'},
+            'description': 'Generate evaluation documents for all techs and stream them as a ZIP.'
+        },
+        {
+            'Endpoint': '/jobs/geneval/',
+            'method': 'POST',
+            'body': {'month': '1-12', 'year': 'YYYY'},
+            'description': 'Queue geneval as a background export job.'
+        },
+        {
+            'Endpoint': '/jobs/<uuid:pk>/',
+            'method': 'GET',
+            'body': None,
+            'description': 'Poll the status of a background export job.'
+        },
+        {
+            'Endpoint': '/jobs/<uuid:pk>/download/',
+            'method': 'GET',
+            'body': None,
+            'description': 'Download the artifact of a finished export job.'
+        },
     ]
     return Response(routes)
 
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def create_evaluation(request):
@@ -108,7 +135,7 @@ def create_evaluation(request):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def list_evaluations(request):
@@ -135,7 +162,7 @@ def list_evaluations(request):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_user_evaluations(request, user_id):
@@ -162,7 +189,7 @@ def get_user_evaluations(request, user_id):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_evaluation_detail(request, pk):
@@ -179,7 +206,7 @@ def get_evaluation_detail(request, pk):
 
 
 @api_view(['PUT', 'PATCH'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def update_evaluation(request, pk):
@@ -213,7 +240,7 @@ def update_evaluation(request, pk):
 
 
 @api_view(['DELETE'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def delete_evaluation(request, pk):
@@ -241,7 +268,7 @@ def delete_evaluation(request, pk):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def generate_evaluation_data(request, user_id):
@@ -285,15 +312,19 @@ def generate_evaluation_data(request, user_id):
         review_time__lte=end_date
     )
     
-    total_cases = reviewed_claims.count()
+    counts = count_by(
+        reviewed_claims,
+        total=None,
+        ping_count=Q(status__in=PING_STATUSES),
+        **status_conditions(),
+    )
+    total_cases = counts['total']
     
     # Count by status
-    kudos_count = reviewed_claims.filter(status='kudos').count()
-    checked_count = reviewed_claims.filter(status='checked').count()
-    done_count = reviewed_claims.filter(status='done').count()
-    
-    ping_statuses = ['pingedlow', 'pingedmed', 'pingedhigh', 'acknowledged', 'resolved']
-    ping_count = reviewed_claims.filter(status__in=ping_statuses).count()
+    kudos_count = counts['kudos']
+    checked_count = counts['checked']
+    done_count = counts['done']
+    ping_count = counts['ping_count']
     
     # Calculate quality score (simple formula: (positive / total) * 100)
     positive_reviews = kudos_count + checked_count + done_count
@@ -319,16 +350,7 @@ def generate_evaluation_data(request, user_id):
             'ping_rate': ping_rate,
             'kudos_count': kudos_count,
         },
-        'breakdown': {
-            'kudos': kudos_count,
-            'checked': checked_count,
-            'done': done_count,
-            'pinged_low': reviewed_claims.filter(status='pingedlow').count(),
-            'pinged_med': reviewed_claims.filter(status='pingedmed').count(),
-            'pinged_high': reviewed_claims.filter(status='pingedhigh').count(),
-            'acknowledged': reviewed_claims.filter(status='acknowledged').count(),
-            'resolved': reviewed_claims.filter(status='resolved').count(),
-        },
+        'breakdown': review_breakdown(counts),
         'suggested_rating': _calculate_suggested_rating(quality_score, ping_rate),
     }
     
@@ -367,16 +389,18 @@ def _month_number_to_name(month: int) -> str:
     return months[month] if 1 <= month <= 12 else ''
 
 
-def _is_user_lead(user):
-    """Check if user has Lead or higher role."""
-    lead_groups = ['Lead', 'Phone Analyst', 'Manager']
-    return user.groups.filter(name__in=lead_groups).exists()
+# Groups whose members are leads (Lead or higher) and get no evaluation
+LEAD_GROUPS = ['Lead', 'Phone Analyst', 'Manager']
 
 
 def _get_eval_data(month: int, year: int):
     """
     Get all evaluation data for a given month/year.
     Returns data organized by tech.
+    
+    Runs a single query: the tech's name comes from a join and lead
+    membership is excluded with one subquery, so the cost does not grow with
+    the number of claims.
     """
     # Calculate date range
     start_date = datetime(year, month, 1)
@@ -385,40 +409,48 @@ def _get_eval_data(month: int, year: int):
     else:
         end_date = datetime(year, month + 1, 1)
     
-    # Get all reviewed claims for the month
-    all_claims = ReviewedClaim.objects.filter(
-        review_time__gte=start_date,
-        review_time__lt=end_date
-    ).exclude(status='done')  # Exclude 'done' status like the bot does
+    # Get all reviewed claims for the month, skipping techs that are leads
+    lead_ids = User.objects.filter(groups__name__in=LEAD_GROUPS).values('id')
+    all_claims = (
+        ReviewedClaim.objects
+        .filter(review_time__gte=start_date, review_time__lt=end_date)
+        .exclude(status='done')  # Exclude 'done' status like the bot does
+        .exclude(tech_id__in=lead_ids)
+        .order_by('tech_id', 'id')
+        .values(
+            'casenum', 'status', 'tech_id',
+            'tech_id__username', 'tech_id__first_name', 'tech_id__last_name',
+        )
+    )
     
     total_hd_cases = 0
     tech_data = {}
     
     for claim in all_claims:
-        tech = claim.tech_id
-        
-        # Skip if tech is a lead
-        if _is_user_lead(tech):
-            continue
-        
+        tech_id = claim['tech_id']
         total_hd_cases += 1
         
         # Initialize tech data if not exists
-        if tech.id not in tech_data:
-            tech_data[tech.id] = {
-                'user': tech,
+        if tech_id not in tech_data:
+            tech_data[tech_id] = {
+                'user': User(
+                    id=tech_id,
+                    username=claim['tech_id__username'],
+                    first_name=claim['tech_id__first_name'],
+                    last_name=claim['tech_id__last_name'],
+                ),
                 'checked_count': 0,
                 'pinged_cases': [],
                 'kudos_cases': [],
             }
         
         # Categorize by status
-        if claim.status == 'checked':
-            tech_data[tech.id]['checked_count'] += 1
-        elif claim.status in ['pingedlow', 'pingedmed', 'pingedhigh', 'acknowledged', 'resolved']:
-            tech_data[tech.id]['pinged_cases'].append(claim.casenum)
-        elif claim.status == 'kudos':
-            tech_data[tech.id]['kudos_cases'].append(claim.casenum)
+        if claim['status'] == 'checked':
+            tech_data[tech_id]['checked_count'] += 1
+        elif claim['status'] in PING_STATUSES:
+            tech_data[tech_id]['pinged_cases'].append(claim['casenum'])
+        elif claim['status'] == 'kudos':
+            tech_data[tech_id]['kudos_cases'].append(claim['casenum'])
     
     return total_hd_cases, tech_data
 
@@ -545,29 +577,138 @@ def _create_word_fields(username, date, hd_total_claims, median_claim, median_pi
     return fields, template_name
 
 
-def _create_document(template_path: str, save_path: str, fields: dict):
-    """Create a Word document from template with filled fields."""
-    document = Document(template_path)
-    style = document.styles['Normal']
-    font = style.font
-    font.name = 'Times New Roman'
-    font.size = Pt(11)
+def _evaluation_documents(month, year, hd_total_claims, median_claim, median_ping_percent, top_claim_percent, organized_data):
+    """
+    Yield (filename, docx bytes) for each tech's evaluation, in order.
+    
+    Documents are rendered in the process pool (GENEVAL_WORKERS); ones that
+    fail to render are logged and skipped.
+    """
+    now = datetime.now()
+    jobs = []
+    names = []
+    
+    # Get base directory for templates
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    
+    for tech_id, data in organized_data.items():
+        user = data['user']
+        full_name = f"{user.first_name} {user.last_name}".strip() or user.username
+        
+        fields, template_name = _create_word_fields(
+            full_name,
+            now,
+            hd_total_claims,
+            median_claim,
+            median_ping_percent,
+            top_claim_percent,
+            data
+        )
+        
+        template_path = os.path.join(base_dir, template_name)
+        last_name = full_name.split(' ')[-1] if ' ' in full_name else full_name
+        doc_filename = f"{last_name} {_month_number_to_name(month).upper()} {year}.docx"
+        
+        jobs.append((template_path, fields))
+        names.append((doc_filename, full_name))
+    
+    for (doc_filename, full_name), (document, error) in zip(names, render_documents(jobs, settings.GENEVAL_WORKERS)):
+        if error is not None:
+            print(f"Error creating document for {full_name}: {error}")
+            continue
+        yield doc_filename, document
+
+
+class _ChunkedStreamingHttpResponse(StreamingHttpResponse):
+    """
+    StreamingHttpResponse for a sync iterator that also streams under ASGI.
+    
+    Django reads a sync iterator to the end with sync_to_async(list) before
+    sending anything to an ASGI server, so here each chunk is pulled through
+    sync_to_async and sent as soon as it is ready. WSGI iterates as usual.
+    """
+    
+    async def __aiter__(self):
+        chunks = iter(self.streaming_content)
+        next_chunk = sync_to_async(next)
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+
+
+class GenevalError(Exception):
+    """A geneval request that cannot produce an archive; carries the HTTP status to answer with."""
+    
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _geneval_period(params):
+    """Read and validate month/year from query params or a request body."""
+    try:
+        month = int(params.get('month'))
+        year = int(params.get('year'))
+    except (TypeError, ValueError):
+        raise GenevalError(
+            'Both month (1-12) and year (YYYY) are required as query parameters',
+            status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not 1 <= month <= 12:
+        raise GenevalError('Month must be between 1 and 12', status.HTTP_400_BAD_REQUEST)
+    
+    if not 2000 <= year <= 2100:
+        raise GenevalError('Year must be between 2000 and 2100', status.HTTP_400_BAD_REQUEST)
+    
+    return month, year
+
+
+def _geneval_documents(month, year):
+    """
+    Yield (filename, docx bytes) for every tech evaluated in month/year.
+    
+    Raises GenevalError if there is nothing to render. The first good document
+    is rendered before returning, so callers can still report a total failure
+    before they start streaming.
+    """
+    # Get evaluation data
+    total_hd_cases, tech_data = _get_eval_data(month, year)
+    
+    if total_hd_cases == 0:
+        raise GenevalError(
+            f'No cases found for {_month_number_to_name(month)} {year}',
+            status.HTTP_404_NOT_FOUND
+        )
+    
+    # Organize data for Word documents
+    hd_total_claims, median_claim, median_ping_percent, top_claim_percent, organized_data = \
+        _organize_data_for_word(total_hd_cases, tech_data)
+    
+    if not organized_data:
+        raise GenevalError(
+            f'No tech data found for {_month_number_to_name(month)} {year}',
+            status.HTTP_404_NOT_FOUND
+        )
     
-    i = 1
-    for table in document.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    if i in fields:
-                        paragraph.text = str(fields[i])
-                        paragraph.style = document.styles['Normal']
-                    i += 1
+    documents = _evaluation_documents(
+        month,
+        year,
+        hd_total_claims,
+        median_claim,
+        median_ping_percent,
+        top_claim_percent,
+        organized_data
+    )
+    
+    first = next(documents, None)
+    if first is None:
+        raise GenevalError('Failed to generate any evaluation documents', status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    document.save(save_path)
+    return chain([first], documents)
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')
 def geneval(request):
@@ -585,90 +726,122 @@ def geneval(request):
             'error': 'python-docx library is not installed. Please install it with: pip install python-docx'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    # Get month and year from query params
     try:
-        month = int(request.query_params.get('month'))
-        year = int(request.query_params.get('year'))
-    except (TypeError, ValueError):
+        month, year = _geneval_period(request.query_params)
+        documents = _geneval_documents(month, year)
+    except GenevalError as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    
+    # Stream the ZIP: each document is compressed and sent as soon as it is rendered
+    zip_filename = f"evaluations_{month}_{year}.zip"
+    response = _ChunkedStreamingHttpResponse(stream_zip(documents), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
+    return response
+
+
+# =====================
+# Background export jobs
+# =====================
+
+@jobs.handler('geneval')
+def _geneval_job(params, output):
+    """Background geneval: write the ZIP to output and return its download filename."""
+    month, year = params['month'], params['year']
+    for chunk in stream_zip(_geneval_documents(month, year)):
+        output.write(chunk)
+    return f"evaluations_{month}_{year}.zip"
+
+
+@api_view(['POST'])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@role_required('Lead')
+def create_geneval_job(request):
+    """
+    Queue geneval as a background job instead of rendering inside the request.
+    
+    Body:
+        - month: 1-12
+        - year: YYYY
+    
+    Returns the queued job (202). Poll /jobs/<id>/ until it has succeeded, then
+    fetch the ZIP from /jobs/<id>/download/. An "export" event is also sent to
+    the requesting user over ws/caseflow/ when the job finishes.
+    """
+    if not DOCX_AVAILABLE:
         return Response({
-            'error': 'Both month (1-12) and year (YYYY) are required as query parameters'
-        }, status=status.HTTP_400_BAD_REQUEST)
+            'error': 'python-docx library is not installed. Please install it with: pip install python-docx'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    if not 1 <= month <= 12:
-        return Response({'error': 'Month must be between 1 and 12'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        month, year = _geneval_period(request.data)
+    except GenevalError as e:
+        return Response({'error': str(e)}, status=e.status_code)
     
-    if not 2000 <= year <= 2100:
-        return Response({'error': 'Year must be between 2000 and 2100'}, status=status.HTTP_400_BAD_REQUEST)
+    job = jobs.submit('geneval', {'month': month, 'year': year}, request.user)
+    return Response(ExportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def _check_export_job_owner(request, job):
+    """
+    Only the user who requested a job or a Manager may see it. Returns a 403
+    response for anyone else, None otherwise.
+    """
+    from user.decorators import get_user_highest_role_level, ROLE_HIERARCHY
+    if job.requested_by_id != request.user.pk and get_user_highest_role_level(request.user) < ROLE_HIERARCHY['Manager']:
+        return Response(
+            {'error': 'You can only access your own export jobs.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return None
+
+
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@role_required('Lead')
+def get_export_job(request, pk):
+    """
+    Poll the status of a background export job.
+    """
+    try:
+        job = ExportJob.objects.get(pk=pk)
+    except ExportJob.DoesNotExist:
+        return Response({'error': 'Export job not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Get evaluation data
-    total_hd_cases, tech_data = _get_eval_data(month, year)
+    denied = _check_export_job_owner(request, job)
+    if denied is not None:
+        return denied
     
-    if total_hd_cases == 0:
-        return Response({
-            'error': f'No cases found for {_month_number_to_name(month)} {year}'
-        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(ExportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@role_required('Lead')
+def download_export_job(request, pk):
+    """
+    Download the artifact of a finished export job.
+    """
+    try:
+        job = ExportJob.objects.get(pk=pk)
+    except ExportJob.DoesNotExist:
+        return Response({'error': 'Export job not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Organize data for Word documents
-    hd_total_claims, median_claim, median_ping_percent, top_claim_percent, organized_data = \
-        _organize_data_for_word(total_hd_cases, tech_data)
+    denied = _check_export_job_owner(request, job)
+    if denied is not None:
+        return denied
     
-    if not organized_data:
-        return Response({
-            'error': f'No tech data found for {_month_number_to_name(month)} {year}'
-        }, status=status.HTTP_404_NOT_FOUND)
+    if job.status != ExportJob.SUCCEEDED:
+        return Response(
+            {'error': f'Export job is {job.status}, not ready for download'},
+            status=status.HTTP_409_CONFLICT
+        )
     
-    # Create temp directory for files
-    with tempfile.TemporaryDirectory() as temp_dir:
-        now = datetime.now()
-        filenames = []
-        
-        # Get base directory for templates
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        
-        for tech_id, data in organized_data.items():
-            user = data['user']
-            full_name = f"{user.first_name} {user.last_name}".strip() or user.username
-            
-            fields, template_name = _create_word_fields(
-                full_name,
-                now,
-                hd_total_claims,
-                median_claim,
-                median_ping_percent,
-                top_claim_percent,
-                data
-            )
-            
-            # Create document
-            template_path = os.path.join(base_dir, template_name)
-            last_name = full_name.split(' ')[-1] if ' ' in full_name else full_name
-            doc_filename = f"{last_name} {_month_number_to_name(month).upper()} {year}.docx"
-            doc_path = os.path.join(temp_dir, doc_filename)
-            
-            try:
-                _create_document(template_path, doc_path, fields)
-                filenames.append((doc_path, doc_filename))
-            except Exception as e:
-                print(f"Error creating document for {full_name}: {e}")
-                continue
-        
-        if not filenames:
-            return Response({
-                'error': 'Failed to generate any evaluation documents'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Create ZIP file
-        zip_filename = f"evaluations_{month}_{year}.zip"
-        zip_path = os.path.join(temp_dir, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path, filename in filenames:
-                zipf.write(file_path, filename)
-        
-        # Read ZIP and return as response
-        with open(zip_path, 'rb') as f:
-            zip_data = f.read()
-        
-        response = HttpResponse(zip_data, content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-        return response
+    try:
+        artifact = open(job.artifact_path, 'rb')
+    except FileNotFoundError:
+        return Response({'error': 'Export artifact has expired'}, status=status.HTTP_410_GONE)
+    
+    return FileResponse(artifact, as_attachment=True, filename=job.filename, content_type='application/zip')
@@ -0,0 +1,71 @@
+"""
+Change log behind the ?since=<version> mode of the claim list endpoints.
+
+Every view that inserts, updates or deletes an ActiveClaim or CompleteClaim
+calls `record()` inside the same transaction as the write. A list request
+with ?since=N then only reads the rows touched after version N; a touched
+row that no longer exists has been deleted. Only the newest
+CLAIM_CHANGELOG_SIZE changes are kept, and `reset()` (after bulk imports)
+drops the whole log, so older versions get a full snapshot instead.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from events.models import ClaimChange
+
+# Trim the log on every Nth change rather than on each write
+PRUNE_INTERVAL = 100
+
+
+def record(queue, row_id):
+    """Note that a row of the given queue was inserted, updated or deleted."""
+    version = ClaimChange.objects.create(queue=queue, row_id=row_id).pk
+    if version % PRUNE_INTERVAL == 0:
+        ClaimChange.objects.filter(pk__lte=version - settings.CLAIM_CHANGELOG_SIZE).delete()
+
+
+def reset():
+    """Invalidate every version handed out so far (claims changed outside the views)."""
+    with transaction.atomic():
+        marker = ClaimChange.objects.create(queue=ClaimChange.RESET, row_id=0)
+        ClaimChange.objects.filter(pk__lt=marker.pk).delete()
+
+
+def delta(queue, queryset, since, serialize):
+    """
+    Build a ?since= list response for one queue.
+
+    Returns {'version', 'reset', 'changed', 'deleted'}: the rows of queryset
+    touched after since (serialized with serialize(queryset)) and the ids of
+    those deleted. With since=0, or a version the log no longer holds, every
+    current row is returned with reset=True and deleted is empty.
+    Raises ValueError if since is not a non-negative integer.
+    """
+    since = int(since)
+    if since < 0:
+        raise ValueError(since)
+
+    if since:
+        # The version itself is a change; if it is still logged, so is
+        # everything after it.
+        changes = list(
+            ClaimChange.objects
+            .filter(pk__gte=since)
+            .order_by('pk')
+            .values_list('pk', 'queue', 'row_id')
+        )
+        if changes and changes[0][0] == since:
+            row_ids = {row_id for _, changed_queue, row_id in changes[1:] if changed_queue == queue}
+            changed = serialize(queryset.filter(pk__in=row_ids)) if row_ids else []
+            present = {row['id'] for row in changed}
+            return {
+                'version': changes[-1][0],
+                'reset': False,
+                'changed': changed,
+                'deleted': sorted(row_ids - present),
+            }
+
+    version = ClaimChange.objects.aggregate(latest=Max('pk'))['latest'] or 0
+    return {'version': version, 'reset': True, 'changed': serialize(queryset), 'deleted': []}
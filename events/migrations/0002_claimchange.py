@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queue', models.CharField(choices=[('active', 'Active claims'), ('complete', 'Complete claims'), ('reset', 'Log reset')], max_length=8)),
+                ('row_id', models.BigIntegerField()),
+            ],
+        ),
+    ]
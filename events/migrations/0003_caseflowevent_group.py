@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_claimchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caseflowevent',
+            name='group',
+            field=models.CharField(default='caseflow.claims', max_length=100),
+        ),
+    ]
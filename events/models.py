@@ -0,0 +1,40 @@
+from django.db import models
+
+
+class CaseflowEvent(models.Model):
+    """
+    Recent events published to ws/caseflow/ (see api.broadcast).
+
+    The primary key is the event's sequence number, so it is shared by every
+    server process and never reused. Only the newest CASEFLOW_REPLAY_BUFFER
+    events are kept; they are replayed to clients that reconnect, if they
+    belong to one of the client's groups.
+    """
+    group = models.CharField(max_length=100, default='caseflow.claims')
+    payload = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.pk}: {self.payload}"
+
+
+class ClaimChange(models.Model):
+    """
+    One row per insert, update or delete of an ActiveClaim or CompleteClaim
+    (see events.changelog). The id is the change version clients pass back
+    as ?since= on the list endpoints.
+    """
+    ACTIVE = 'active'
+    COMPLETE = 'complete'
+    RESET = 'reset'
+    QUEUE_CHOICES = [
+        (ACTIVE, 'Active claims'),
+        (COMPLETE, 'Complete claims'),
+        (RESET, 'Log reset'),
+    ]
+
+    queue = models.CharField(max_length=8, choices=QUEUE_CHOICES)
+    row_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.pk}: {self.queue} {self.row_id}"
@@ -67,6 +67,6 @@ echo "  http://$(hostname -I | awk '{print $1}')"
 echo ""
 echo "Make sure Django/Daphne is running on port 8000:"
 echo "  cd ~/Desktop/CaseClaimAPI"
-echo "  pipenv run daphne -b 0.0.0.0 -p 8000 api.asgi:application"
+echo "  pipenv run python -m api.server -b 0.0.0.0 -p 8000 api.asgi:application"
 echo ""
 echo "Anyone on the campus network can now access CaseFlow in their browser!"
@@ -0,0 +1,93 @@
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+# Output key -> ReviewedClaim.status value, in the order the reports expose them
+REVIEW_STATUSES = {
+    'kudos': 'kudos',
+    'checked': 'checked',
+    'done': 'done',
+    'pinged_low': 'pingedlow',
+    'pinged_med': 'pingedmed',
+    'pinged_high': 'pingedhigh',
+    'acknowledged': 'acknowledged',
+    'resolved': 'resolved',
+}
+
+ACTIVE_PING_STATUSES = ['pingedlow', 'pingedmed', 'pingedhigh']
+PING_STATUSES = ACTIVE_PING_STATUSES + ['acknowledged', 'resolved']
+
+
+def scoped(condition, scope=None):
+    """Combine a condition with an optional scope. Empty Q objects count every row."""
+    if scope:
+        condition = condition & scope if condition else scope
+    return condition or None
+
+
+def tally(condition=None, field=None):
+    """
+    Count matching rows, or sum `field` when the rows are pre-aggregated
+    (e.g. DailyReviewStat.count).
+    """
+    if field is None:
+        return Count('id', filter=condition)
+    return Coalesce(Sum(field, filter=condition), 0)
+
+
+def count_by(queryset, **conditions):
+    """
+    Evaluate several conditional counts over a queryset in a single query.
+
+    Each keyword maps an output name to a Q object; None counts every row.
+
+    Example:
+        count_by(ReviewedClaim.objects.all(), total=None, kudos=Q(status='kudos'))
+        -> {'total': 12, 'kudos': 3}
+    """
+    return queryset.aggregate(**{
+        name: tally(condition)
+        for name, condition in conditions.items()
+    })
+
+
+def sum_by(queryset, field, **conditions):
+    """Same as count_by, but sums `field` over rollup rows instead of counting."""
+    return queryset.aggregate(**{
+        name: tally(condition, field)
+        for name, condition in conditions.items()
+    })
+
+
+def status_conditions(scope=None, statuses=REVIEW_STATUSES):
+    """Build one condition per review status, restricted to scope."""
+    return {
+        name: scoped(Q(status=value), scope)
+        for name, value in statuses.items()
+    }
+
+
+def window_conditions(time_field, windows, scope=None):
+    """Build one condition per named window start (rows at or after it)."""
+    return {
+        name: scoped(Q(**{f'{time_field}__gte': start}), scope)
+        for name, start in windows.items()
+    }
+
+
+def review_breakdown(counts):
+    """Pick the per-status counts out of a count_by() result."""
+    return {name: counts[name] for name in REVIEW_STATUSES}
+
+
+def pinged_total(breakdown):
+    """Total pings of any state in a review_breakdown() result."""
+    return sum(
+        breakdown[name] for name, value in REVIEW_STATUSES.items()
+        if value in PING_STATUSES
+    )
+
+
+def percent(part, whole):
+    """Percentage rounded the way every report shows it, 0 when whole is empty."""
+    return round((part / whole * 100), 2) if whole > 0 else 0
@@ -0,0 +1,31 @@
+"""
+Rebuild the DailyReviewStat rollup from the ReviewedClaim table.
+
+The rollup is normally maintained incrementally by the review views. Run this
+after bulk imports (e.g. migrate_case_data) or if the rollup is ever suspected
+to have drifted from the raw data.
+
+Usage:
+    python manage.py rebuild_review_rollup
+"""
+
+from django.core.management.base import BaseCommand
+
+from reports.rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily ReviewedClaim rollup used by the reports endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows to insert per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("Rebuilding daily review rollup..."))
+        count = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rollup rebuilt: {count} day/tech/lead/status rows"))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReviewStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('lead_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollup_lead', to=settings.AUTH_USER_MODEL)),
+                ('tech_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollup_tech', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'tech_id', 'lead_id', 'status'), name='unique_daily_review_stat')],
+            },
+        ),
+    ]
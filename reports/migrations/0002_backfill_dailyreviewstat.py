@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    # 0001 created the table empty; roll up the reviews already recorded
+    from reports import rollup
+    rollup.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('reviewedclaim', '0004_reviewedclaim_reviewed_casenum_time_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
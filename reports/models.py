@@ -1,4 +1,28 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# No models needed - this app aggregates data from ActiveClaim, CompleteClaim, ReviewedClaim
 
+class DailyReviewStat(models.Model):
+    """
+    Per-day rollup of ReviewedClaim rows, one row per (day, tech, lead, status).
+
+    Kept up to date by reports.rollup whenever a review is created or changes
+    status, and rebuilt from scratch by `manage.py rebuild_review_rollup`.
+    Field names mirror ReviewedClaim so the same filters apply to both tables.
+    """
+    day = models.DateField()
+    tech_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rollup_tech")
+    lead_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rollup_lead")
+    status = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'tech_id', 'lead_id', 'status'],
+                name='unique_daily_review_stat',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Day: {self.day}, Tech: {self.tech_id_id}, Lead: {self.lead_id_id}, Status: {self.status}, Count: {self.count}"
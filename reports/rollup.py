@@ -0,0 +1,83 @@
+"""
+Incremental maintenance of the DailyReviewStat rollup.
+
+Every view that creates a ReviewedClaim or changes its status calls into here
+inside the same transaction as the write, so the rollup always matches the
+raw table. `rebuild()` recomputes everything (used after bulk imports).
+"""
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from reports.models import DailyReviewStat
+
+
+def _bump(day, tech_id, lead_id, status_value, delta):
+    """Add delta to one rollup bucket, creating it if needed."""
+    bucket = DailyReviewStat.objects.filter(
+        day=day, tech_id=tech_id, lead_id=lead_id, status=status_value
+    )
+    if bucket.update(count=F('count') + delta):
+        if delta < 0:
+            bucket.filter(count__lte=0).delete()
+        return
+    try:
+        with transaction.atomic():
+            DailyReviewStat.objects.create(
+                day=day, tech_id_id=tech_id, lead_id_id=lead_id, status=status_value, count=delta
+            )
+    except IntegrityError:
+        # Another request created the bucket first
+        bucket.update(count=F('count') + delta)
+
+
+def record_review(claim):
+    """Count a newly created ReviewedClaim."""
+    day = timezone.localdate(claim.review_time)
+    _bump(day, claim.tech_id_id, claim.lead_id_id, claim.status, 1)
+
+
+def record_status_change(claim, old_status):
+    """Move a ReviewedClaim from its old status bucket to its current one."""
+    if old_status == claim.status:
+        return
+    day = timezone.localdate(claim.review_time)
+    with transaction.atomic():
+        _bump(day, claim.tech_id_id, claim.lead_id_id, old_status, -1)
+        _bump(day, claim.tech_id_id, claim.lead_id_id, claim.status, 1)
+
+
+def rebuild(batch_size=1000, apps=global_apps):
+    """
+    Recompute the whole rollup from ReviewedClaim. Returns the number of buckets.
+
+    Migrations pass their own apps so the historical models are used.
+    """
+    ReviewedClaim = apps.get_model('reviewedclaim', 'ReviewedClaim')
+    DailyReviewStat = apps.get_model('reports', 'DailyReviewStat')
+    buckets = (
+        ReviewedClaim.objects
+        .annotate(day=TruncDate('review_time'))
+        .values('day', 'tech_id', 'lead_id', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        DailyReviewStat.objects.all().delete()
+        stats = DailyReviewStat.objects.bulk_create(
+            (
+                DailyReviewStat(
+                    day=row['day'],
+                    tech_id_id=row['tech_id'],
+                    lead_id_id=row['lead_id'],
+                    status=row['status'],
+                    count=row['total'],
+                )
+                for row in buckets.iterator()
+            ),
+            batch_size=batch_size,
+        )
+    return len(stats)
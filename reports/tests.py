@@ -1,4 +1,193 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User, Group
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
 
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from activeclaim.models import ActiveClaim
+from completeclaim.models import CompleteClaim
+from reviewedclaim.models import ReviewedClaim
+from reports import rollup
+from reports.aggregates import count_by, review_breakdown, status_conditions
+from reports.models import DailyReviewStat
+
+
+def _make_reviews(tech, lead, statuses):
+    now = timezone.now()
+    for i, status_value in enumerate(statuses):
+        ReviewedClaim.objects.create(
+            casenum=f"{i:08d}",
+            tech_id=tech,
+            lead_id=lead,
+            claim_time=now,
+            complete_time=now,
+            status=status_value,
+            comment='',
+        )
+
+
+class AggregatesTest(TestCase):
+    def setUp(self):
+        self.tech = User.objects.create_user(username='tech', password='pw')
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        _make_reviews(self.tech, self.lead, ['kudos', 'kudos', 'checked', 'pingedlow', 'resolved'])
+
+    def test_count_by_single_query(self):
+        with self.assertNumQueries(1):
+            counts = count_by(ReviewedClaim.objects.all(), total=None, **status_conditions())
+        self.assertEqual(counts['total'], 5)
+        self.assertEqual(review_breakdown(counts), {
+            'kudos': 2,
+            'checked': 1,
+            'done': 0,
+            'pinged_low': 1,
+            'pinged_med': 0,
+            'pinged_high': 0,
+            'acknowledged': 0,
+            'resolved': 1,
+        })
+
+
+class ReportsQueryCountTest(APITestCase):
+    """Every report costs a fixed number of queries regardless of table size."""
+
+    def setUp(self):
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.tech = User.objects.create_user(username='tech', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+        _make_reviews(self.tech, self.lead, ['kudos', 'checked', 'done', 'pingedmed', 'acknowledged'] * 4)
+        ActiveClaim.objects.create(casenum='90000001', user_id=self.tech)
+        CompleteClaim.objects.create(casenum='90000002', user_id=self.tech, claim_time=timezone.now())
+        rollup.rebuild()
+
+    def test_summary(self):
+        # role lookup + one aggregate per table (reviews read from the rollup)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/reports/summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals'], {
+            'active_claims': 1,
+            'pending_review': 1,
+            'reviewed_claims': 20,
+        })
+        self.assertEqual(response.data['today']['reviewed'], 20)
+        self.assertEqual(response.data['this_week']['claimed'], 1)
+        self.assertEqual(response.data['review_status_breakdown']['pinged_med'], 4)
+        self.assertEqual(response.data['ping_rate'], 40.0)
+
+    def test_summary_scoped_to_user(self):
+        response = self.client.get('/api/reports/summary/', {'user_id': self.lead.id})
+        self.assertEqual(response.data['totals']['reviewed_claims'], 0)
+        # today/this_week are system-wide regardless of the user filter
+        self.assertEqual(response.data['today']['reviewed'], 20)
+
+    def test_date_range(self):
+        today = timezone.now().date()
+        params = {
+            'start_date': (today - timedelta(days=1)).isoformat(),
+            'end_date': (today + timedelta(days=1)).isoformat(),
+        }
+        # role lookup + rollup aggregate + top techs + top leads
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/reports/date-range/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals']['cases_reviewed'], 20)
+        self.assertEqual(response.data['by_status']['done'], 4)
+
+    def test_ping_stats(self):
+        # role lookup + ping aggregate + top pinged techs
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/reports/ping-stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals']['all_pings'], 8)
+        self.assertEqual(response.data['totals']['active'], 4)
+        self.assertEqual(response.data['by_severity']['medium'], 4)
+        self.assertEqual(response.data['this_week']['new_pings'], 8)
+        self.assertEqual(response.data['resolution_rate'], 0)
+
+    def test_generate_evaluation_data(self):
+        today = timezone.now().date()
+        params = {
+            'start_date': (today - timedelta(days=1)).isoformat(),
+            'end_date': (today + timedelta(days=1)).isoformat(),
+        }
+        # role lookup + user lookup + one aggregate
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/evaluation/generate/{self.tech.id}/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['metrics']['cases_reviewed'], 20)
+        self.assertEqual(response.data['metrics']['ping_count'], 8)
+        self.assertEqual(response.data['breakdown']['acknowledged'], 4)
+
+
+class DailyReviewStatTest(APITestCase):
+    def setUp(self):
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.tech = User.objects.create_user(username='tech', password='pw')
+        self.tech.groups.add(Group.objects.get(name='Tech'))
+        self.client = APIClient()
+
+    def _buckets(self):
+        return dict(DailyReviewStat.objects.values_list('status', 'count'))
+
+    def test_views_maintain_rollup(self):
+        self.client.force_authenticate(user=self.lead)
+        claim = CompleteClaim.objects.create(casenum='12345678', user_id=self.tech, claim_time=timezone.now())
+        self.client.post(f'/api/completeclaim/review/{claim.id}/', {'status': 'pingedhigh', 'comment': 'x'})
+        self.client.post('/api/reviewedclaim/create-ping/', {
+            'casenum': '87654321', 'tech_id': self.tech.id, 'severity': 'pingedlow', 'comment': 'y',
+        })
+        self.assertEqual(self._buckets(), {'pingedhigh': 1, 'pingedlow': 1})
+
+        ping = ReviewedClaim.objects.get(casenum='12345678')
+        self.client.force_authenticate(user=self.tech)
+        self.client.post(f'/api/reviewedclaim/acknowledge/{ping.id}/')
+        self.assertEqual(self._buckets(), {'acknowledged': 1, 'pingedlow': 1})
+
+        self.client.force_authenticate(user=self.lead)
+        self.client.post(f'/api/reviewedclaim/resolve/{ping.id}/')
+        self.assertEqual(self._buckets(), {'resolved': 1, 'pingedlow': 1})
+
+        incremental = set(DailyReviewStat.objects.values_list('day', 'tech_id', 'lead_id', 'status', 'count'))
+        rollup.rebuild()
+        rebuilt = set(DailyReviewStat.objects.values_list('day', 'tech_id', 'lead_id', 'status', 'count'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_leaderboard_whole_days_matches_raw(self):
+        _make_reviews(self.tech, self.lead, ['kudos', 'checked', 'checked', 'pingedlow'])
+        rollup.rebuild()
+        self.client.force_authenticate(user=self.lead)
+        today = timezone.now().date()
+
+        by_days = self.client.get('/api/reports/leaderboard/', {'days': 1}).data
+        by_range = self.client.get('/api/reports/leaderboard/', {
+            'start_date': today.isoformat(), 'end_date': today.isoformat(),
+        }).data
+        self.assertEqual(by_days['tech_leaderboard'], by_range['tech_leaderboard'])
+        self.assertEqual(by_days['lead_leaderboard'], by_range['lead_leaderboard'])
+        self.assertEqual(by_range['tech_leaderboard'][0]['count'], 3)
+        self.assertEqual(by_range['lead_leaderboard'][0]['pingsCount'], 1)
+
+
+class DailyReviewStatBackfillTest(TransactionTestCase):
+    def test_migration_fills_rollup_from_existing_reviews(self):
+        MigrationExecutor(connection).migrate([('reports', '0001_initial')])
+        tech = User.objects.create(username='tech')
+        lead = User.objects.create(username='lead')
+        _make_reviews(tech, lead, ['checked', 'checked', 'kudos'])
+        self.assertFalse(DailyReviewStat.objects.exists())
+
+        MigrationExecutor(connection).migrate([('reports', '0002_backfill_dailyreviewstat')])
+        self.assertEqual(
+            dict(DailyReviewStat.objects.values_list('status', 'count')),
+            {'checked': 2, 'kudos': 1},
+        )
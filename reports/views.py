@@ -3,7 +3,7 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view
 
 from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from django.contrib.auth.models import User
@@ -11,8 +11,15 @@ from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 
+from user.authentication import CachedTokenAuthentication
 from user.decorators import role_required
 
+from reports.aggregates import (
+    ACTIVE_PING_STATUSES, PING_STATUSES, count_by, percent, pinged_total,
+    review_breakdown, scoped, status_conditions, sum_by, tally, window_conditions,
+)
+from reports.models import DailyReviewStat
+
 from activeclaim.models import ActiveClaim
 from completeclaim.models import CompleteClaim
 from reviewedclaim.models import ReviewedClaim
@@ -56,7 +63,7 @@ def get_routes(request):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_summary(request):
@@ -81,11 +88,14 @@ def get_summary(request):
     days_param = request.query_params.get('days')
     user_id = request.query_params.get('user_id')
     
-    reviewed_qs = ReviewedClaim.objects.all()
-    active_qs = ActiveClaim.objects.all()
-    complete_qs = CompleteClaim.objects.all()
+    reviewed_scope = Q()
+    active_scope = Q()
+    complete_scope = Q()
+    rollup_scope = Q()
     
     period_label = 'All Time'
+    whole_days = True
+    range_start = None
     
     if start_date_str and end_date_str:
         try:
@@ -93,71 +103,95 @@ def get_summary(request):
             range_end = timezone.make_aware(
                 dt.strptime(end_date_str, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
             )
-            reviewed_qs = reviewed_qs.filter(review_time__gte=range_start, review_time__lte=range_end)
-            active_qs = active_qs.filter(claim_time__gte=range_start, claim_time__lte=range_end)
-            complete_qs = complete_qs.filter(complete_time__gte=range_start, complete_time__lte=range_end)
+            reviewed_scope &= Q(review_time__gte=range_start, review_time__lte=range_end)
+            active_scope &= Q(claim_time__gte=range_start, claim_time__lte=range_end)
+            complete_scope &= Q(complete_time__gte=range_start, complete_time__lte=range_end)
+            rollup_scope &= Q(day__gte=range_start.date(), day__lte=range_end.date())
             period_label = f'{start_date_str} to {end_date_str}'
         except ValueError:
-            pass
+            range_start = None
     elif days_param:
         days = int(days_param)
         range_start = now - timedelta(days=days)
-        reviewed_qs = reviewed_qs.filter(review_time__gte=range_start)
-        active_qs = active_qs.filter(claim_time__gte=range_start)
-        complete_qs = complete_qs.filter(complete_time__gte=range_start)
+        reviewed_scope &= Q(review_time__gte=range_start)
+        active_scope &= Q(claim_time__gte=range_start)
+        complete_scope &= Q(complete_time__gte=range_start)
         period_label = f'Last {days} days'
+        whole_days = False
     
     if user_id:
-        reviewed_qs = reviewed_qs.filter(tech_id=int(user_id))
-        active_qs = active_qs.filter(user_id=int(user_id))
-        complete_qs = complete_qs.filter(user_id=int(user_id))
-    
-    total_reviewed = reviewed_qs.count()
-    
-    review_breakdown = {
-        'kudos': reviewed_qs.filter(status='kudos').count(),
-        'checked': reviewed_qs.filter(status='checked').count(),
-        'done': reviewed_qs.filter(status='done').count(),
-        'pinged_low': reviewed_qs.filter(status='pingedlow').count(),
-        'pinged_med': reviewed_qs.filter(status='pingedmed').count(),
-        'pinged_high': reviewed_qs.filter(status='pingedhigh').count(),
-        'acknowledged': reviewed_qs.filter(status='acknowledged').count(),
-        'resolved': reviewed_qs.filter(status='resolved').count(),
-    }
+        reviewed_scope &= Q(tech_id=int(user_id))
+        rollup_scope &= Q(tech_id=int(user_id))
+        active_scope &= Q(user_id=int(user_id))
+        complete_scope &= Q(user_id=int(user_id))
+    
+    # One conditional-aggregate query per table: the scoped total plus the
+    # unscoped today/this_week windows (and the status breakdown for reviews)
+    windows = {'today': today_start, 'this_week': week_start}
+    active_counts = count_by(
+        ActiveClaim.objects.all(),
+        total=scoped(active_scope),
+        **window_conditions('claim_time', windows),
+    )
+    complete_counts = count_by(
+        CompleteClaim.objects.all(),
+        total=scoped(complete_scope),
+        **window_conditions('complete_time', windows),
+    )
+    # Unless all-time totals are requested, every condition is bounded below by
+    # the earliest window, which lets the date index narrow the scan
+    earliest = min(range_start, week_start) if range_start else None
+    if whole_days:
+        # Every reviewed window starts on a day boundary, so the rollup answers it
+        day_windows = {name: start.date() for name, start in windows.items()}
+        rollup_qs = DailyReviewStat.objects.all()
+        if earliest:
+            rollup_qs = rollup_qs.filter(day__gte=earliest.date())
+        reviewed_counts = sum_by(
+            rollup_qs,
+            'count',
+            total=scoped(rollup_scope),
+            **window_conditions('day', day_windows),
+            **status_conditions(rollup_scope),
+        )
+    else:
+        reviewed_counts = count_by(
+            ReviewedClaim.objects.filter(review_time__gte=earliest),
+            total=scoped(reviewed_scope),
+            **window_conditions('review_time', windows),
+            **status_conditions(reviewed_scope),
+        )
     
-    total_pinged = (review_breakdown['pinged_low'] + 
-                    review_breakdown['pinged_med'] + 
-                    review_breakdown['pinged_high'] +
-                    review_breakdown['acknowledged'] +
-                    review_breakdown['resolved'])
+    total_reviewed = reviewed_counts['total']
+    breakdown = review_breakdown(reviewed_counts)
     
     summary = {
         'generated_at': now,
         'period': period_label,
         'totals': {
-            'active_claims': active_qs.count(),
-            'pending_review': complete_qs.count(),
+            'active_claims': active_counts['total'],
+            'pending_review': complete_counts['total'],
             'reviewed_claims': total_reviewed,
         },
         'today': {
-            'claimed': ActiveClaim.objects.filter(claim_time__gte=today_start).count(),
-            'completed': CompleteClaim.objects.filter(complete_time__gte=today_start).count(),
-            'reviewed': ReviewedClaim.objects.filter(review_time__gte=today_start).count(),
+            'claimed': active_counts['today'],
+            'completed': complete_counts['today'],
+            'reviewed': reviewed_counts['today'],
         },
         'this_week': {
-            'claimed': ActiveClaim.objects.filter(claim_time__gte=week_start).count(),
-            'completed': CompleteClaim.objects.filter(complete_time__gte=week_start).count(),
-            'reviewed': ReviewedClaim.objects.filter(review_time__gte=week_start).count(),
+            'claimed': active_counts['this_week'],
+            'completed': complete_counts['this_week'],
+            'reviewed': reviewed_counts['this_week'],
         },
-        'review_status_breakdown': review_breakdown,
-        'ping_rate': round((total_pinged / total_reviewed * 100), 2) if total_reviewed > 0 else 0,
+        'review_status_breakdown': breakdown,
+        'ping_rate': percent(pinged_total(breakdown), total_reviewed),
     }
     
     return Response(summary, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_user_stats(request, user_id):
@@ -223,7 +257,7 @@ def get_user_stats(request, user_id):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_leaderboard(request):
@@ -254,16 +288,22 @@ def get_leaderboard(request):
                 {'error': 'Invalid date format. Use YYYY-MM-DD'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        # Whole days: read the pre-aggregated rollup instead of raw reviews
+        base_qs = DailyReviewStat.objects.filter(
+            day__gte=start_date.date(),
+            day__lte=end_date.date()
+        )
+        field = 'count'
     else:
         days = int(request.query_params.get('days', 7))
         end_date = timezone.now()
         start_date = end_date - timedelta(days=days)
         period_label = f'Last {days} days'
-    
-    base_qs = ReviewedClaim.objects.filter(
-        review_time__gte=start_date,
-        review_time__lte=end_date
-    )
+        base_qs = ReviewedClaim.objects.filter(
+            review_time__gte=start_date,
+            review_time__lte=end_date
+        )
+        field = None
     
     # Tech leaderboard: cases where tech got checked or kudos
     tech_stats = (
@@ -271,8 +311,8 @@ def get_leaderboard(request):
         .filter(status__in=['checked', 'kudos'])
         .values('tech_id', 'tech_id__username', 'tech_id__first_name', 'tech_id__last_name')
         .annotate(
-            total_cases=Count('id'),
-            kudos_count=Count('id', filter=Q(status='kudos')),
+            total_cases=tally(field=field),
+            kudos_count=tally(Q(status='kudos'), field),
         )
         .order_by('-total_cases')[:limit]
     )
@@ -282,11 +322,11 @@ def get_leaderboard(request):
         base_qs
         .values('lead_id', 'lead_id__username', 'lead_id__first_name', 'lead_id__last_name')
         .annotate(
-            total_reviews=Count('id'),
-            kudos_count=Count('id', filter=Q(status='kudos')),
-            checks_count=Count('id', filter=Q(status='checked')),
-            pings_count=Count('id', filter=Q(status__in=['pingedlow', 'pingedmed', 'pingedhigh'])),
-            done_count=Count('id', filter=Q(status='done')),
+            total_reviews=tally(field=field),
+            kudos_count=tally(Q(status='kudos'), field),
+            checks_count=tally(Q(status='checked'), field),
+            pings_count=tally(Q(status__in=ACTIVE_PING_STATUSES), field),
+            done_count=tally(Q(status='done'), field),
         )
         .order_by('-total_reviews')[:limit]
     )
@@ -323,7 +363,7 @@ def get_leaderboard(request):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_ping_stats(request):
@@ -336,41 +376,50 @@ def get_ping_stats(request):
     week_start = now - timedelta(days=7)
     month_start = now - timedelta(days=30)
     
-    ping_statuses = ['pingedlow', 'pingedmed', 'pingedhigh', 'acknowledged', 'resolved']
-    
-    all_pings = ReviewedClaim.objects.filter(status__in=ping_statuses)
-    active_pings = all_pings.filter(status__in=['pingedlow', 'pingedmed', 'pingedhigh'])
-    acknowledged_pings = all_pings.filter(status='acknowledged')
-    resolved_pings = all_pings.filter(status='resolved')
+    all_pings = Q(status__in=PING_STATUSES)
+    resolved = Q(status='resolved')
+    
+    counts = count_by(
+        ReviewedClaim.objects.filter(all_pings),
+        all_pings=None,
+        active=Q(status__in=ACTIVE_PING_STATUSES),
+        acknowledged=Q(status='acknowledged'),
+        resolved=resolved,
+        low=Q(status='pingedlow'),
+        medium=Q(status='pingedmed'),
+        high=Q(status='pingedhigh'),
+        week_new=Q(review_time__gte=week_start),
+        week_resolved=resolved & Q(review_time__gte=week_start),
+        month_new=Q(review_time__gte=month_start),
+        month_resolved=resolved & Q(review_time__gte=month_start),
+    )
     
     stats = {
         'generated_at': now,
         'totals': {
-            'all_pings': all_pings.count(),
-            'active': active_pings.count(),
-            'acknowledged': acknowledged_pings.count(),
-            'resolved': resolved_pings.count(),
+            'all_pings': counts['all_pings'],
+            'active': counts['active'],
+            'acknowledged': counts['acknowledged'],
+            'resolved': counts['resolved'],
         },
         'by_severity': {
-            'low': ReviewedClaim.objects.filter(status='pingedlow').count(),
-            'medium': ReviewedClaim.objects.filter(status='pingedmed').count(),
-            'high': ReviewedClaim.objects.filter(status='pingedhigh').count(),
+            'low': counts['low'],
+            'medium': counts['medium'],
+            'high': counts['high'],
         },
         'this_week': {
-            'new_pings': all_pings.filter(review_time__gte=week_start).count(),
-            'resolved': resolved_pings.filter(review_time__gte=week_start).count(),
+            'new_pings': counts['week_new'],
+            'resolved': counts['week_resolved'],
         },
         'this_month': {
-            'new_pings': all_pings.filter(review_time__gte=month_start).count(),
-            'resolved': resolved_pings.filter(review_time__gte=month_start).count(),
+            'new_pings': counts['month_new'],
+            'resolved': counts['month_resolved'],
         },
-        'resolution_rate': round(
-            (resolved_pings.count() / all_pings.count() * 100), 2
-        ) if all_pings.count() > 0 else 0,
+        'resolution_rate': percent(counts['resolved'], counts['all_pings']),
         
         # Top pinged techs
         'top_pinged_techs': list(
-            all_pings
+            ReviewedClaim.objects.filter(all_pings)
             .values('tech_id', 'tech_id__username')
             .annotate(ping_count=Count('id'))
             .order_by('-ping_count')[:5]
@@ -381,7 +430,7 @@ def get_ping_stats(request):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above only
 def get_date_range_stats(request):
@@ -412,11 +461,12 @@ def get_date_range_stats(request):
             'error': 'Invalid date format. Use YYYY-MM-DD'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Get stats for the date range
-    reviewed_in_range = ReviewedClaim.objects.filter(
-        review_time__gte=start_date,
-        review_time__lte=end_date
+    # Get stats for the date range (always whole days, so served from the rollup)
+    reviewed_in_range = DailyReviewStat.objects.filter(
+        day__gte=start_date.date(),
+        day__lte=end_date.date()
     )
+    counts = sum_by(reviewed_in_range, 'count', total=None, **status_conditions())
     
     stats = {
         'date_range': {
@@ -424,26 +474,22 @@ def get_date_range_stats(request):
             'end': end_date_str,
         },
         'totals': {
-            'cases_reviewed': reviewed_in_range.count(),
+            'cases_reviewed': counts['total'],
         },
         'by_status': {
-            'kudos': reviewed_in_range.filter(status='kudos').count(),
-            'checked': reviewed_in_range.filter(status='checked').count(),
-            'done': reviewed_in_range.filter(status='done').count(),
-            'pinged_low': reviewed_in_range.filter(status='pingedlow').count(),
-            'pinged_med': reviewed_in_range.filter(status='pingedmed').count(),
-            'pinged_high': reviewed_in_range.filter(status='pingedhigh').count(),
+            name: counts[name]
+            for name in ('kudos', 'checked', 'done', 'pinged_low', 'pinged_med', 'pinged_high')
         },
         'top_techs': list(
             reviewed_in_range
             .values('tech_id', 'tech_id__username')
-            .annotate(case_count=Count('id'))
+            .annotate(case_count=tally(field='count'))
             .order_by('-case_count')[:10]
         ),
         'top_leads': list(
             reviewed_in_range
             .values('lead_id', 'lead_id__username')
-            .annotate(review_count=Count('id'))
+            .annotate(review_count=tally(field='count'))
             .order_by('-review_count')[:10]
         )
     }
@@ -0,0 +1,152 @@
+"""
+Measure response compression: bytes on the wire and CPU time for the list
+endpoints, and for a stream of ws/caseflow/ event frames.
+
+Creates N reviews (plus complete and active claims) inside a transaction
+that is rolled back at the end, so nothing is left in the database. Each
+list endpoint is fetched uncompressed, then its body is compressed with
+every encoding api.middleware has installed. The WebSocket part sends one
+claim event per frame through permessage-deflate as api.server negotiates
+it, and without context takeover for comparison.
+
+Usage:
+    python manage.py benchmark_compression --rows 10000 --events 1000 --repeat 5
+"""
+
+import json
+import time
+
+from autobahn.websocket.compress import PerMessageDeflate, PerMessageDeflateOffer
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from activeclaim.models import ActiveClaim
+from api.broadcast import _with_seq
+from api.middleware import COMPRESSORS
+from api.server import accept_deflate
+from completeclaim.models import CompleteClaim
+from reviewedclaim.models import ReviewedClaim
+
+ENDPOINTS = [
+    '/api/activeclaim/list/',
+    '/api/completeclaim/list/',
+    '/api/reviewedclaim/list/',
+    '/api/reviewedclaim/list/?limit=1000',
+    '/api/user/users/',
+]
+STATUS_CYCLE = ['checked', 'checked', 'kudos', 'pingedlow', 'pingedmed', 'resolved']
+EVENT_CYCLE = ['claim', 'complete', 'unclaimed']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark gzip/br/zstd on the list endpoints and permessage-deflate on ws/caseflow/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Reviewed claims (default: 10000)')
+        parser.add_argument('--techs', type=int, default=50, help='Number of synthetic techs (default: 50)')
+        parser.add_argument('--events', type=int, default=1000, help='WebSocket frames (default: 1000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best is reported (default: 5)')
+
+    def handle(self, *args, **options):
+        # APIClient requests come from 'testserver'
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            lead = self.create_claims(options['rows'], options['techs'])
+            client = APIClient()
+            client.force_authenticate(user=lead)
+            self.stdout.write(self.style.NOTICE(
+                f"{options['rows']} reviewed claims, {options['techs']} techs, best of {options['repeat']}"
+            ))
+            for url in ENDPOINTS:
+                self.measure_endpoint(client, url, options['repeat'])
+            transaction.set_rollback(True)
+
+        self.measure_websocket(options['events'], options['techs'], options['repeat'])
+
+    def best(self, repeat, fn):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def measure_endpoint(self, client, url, repeat):
+        request_time, response = self.best(repeat, lambda: client.get(url, HTTP_ACCEPT_ENCODING='identity'))
+        if response.status_code != 200:
+            raise CommandError(f"{url} returned {response.status_code}")
+        body = response.content
+        self.stdout.write(f"  {url}  {len(body) / 1024:.0f} KiB in {request_time * 1000:.1f} ms")
+        for coding, compress in COMPRESSORS.items():
+            elapsed, compressed = self.best(repeat, lambda: compress(body))
+            self.stdout.write(
+                f"    {coding:5} {len(compressed) / 1024:8.1f} KiB ({len(compressed) / len(body):4.0%})"
+                f"  {elapsed * 1000:6.2f} ms ({elapsed / request_time:4.0%} of the request)"
+            )
+
+    def measure_websocket(self, events, techs, repeat):
+        frames = [
+            _with_seq(json.dumps({
+                'type': 'activeclaim',
+                'event': EVENT_CYCLE[n % len(EVENT_CYCLE)],
+                'casenum': f'{n:08d}',
+                'user': f'compression-benchmark-{n % techs}',
+            }, separators=(',', ':')), n + 1).encode()
+            for n in range(events)
+        ]
+        raw = sum(len(frame) for frame in frames)
+        self.stdout.write(f"  ws/caseflow/  {events} frames, {raw / events:.0f} bytes each")
+
+        offers = [
+            ('deflate', PerMessageDeflateOffer()),
+            ('deflate, no context takeover', PerMessageDeflateOffer(request_no_context_takeover=True)),
+        ]
+        for label, offer in offers:
+            def send_all():
+                # A fresh connection's compressor, as api.server negotiates it
+                pmce = PerMessageDeflate.create_from_offer_accept(True, accept_deflate([offer]))
+                sent = 0
+                for frame in frames:
+                    pmce.start_compress_message()
+                    sent += len(pmce.compress_message_data(frame) + pmce.end_compress_message())
+                return sent
+
+            elapsed, sent = self.best(repeat, send_all)
+            self.stdout.write(
+                f"    {label:29} {sent / events:6.1f} bytes/frame ({sent / raw:4.0%})"
+                f"  {elapsed / events * 1e6:6.1f} us/frame"
+            )
+
+    def create_claims(self, rows, techs):
+        lead = User.objects.create(username='compression-benchmark-lead', first_name='Bench', last_name='Lead')
+        lead.groups.add(Group.objects.get(name='Lead'))
+        users = User.objects.bulk_create([
+            User(username=f'compression-benchmark-{t}', first_name='Bench', last_name=f'Tech {t}')
+            for t in range(techs)
+        ])
+        now = timezone.now()
+        ReviewedClaim.objects.bulk_create([
+            ReviewedClaim(
+                casenum=f'{n:08d}',
+                tech_id=users[n % techs],
+                lead_id=lead,
+                claim_time=now,
+                complete_time=now,
+                status=STATUS_CYCLE[n % len(STATUS_CYCLE)],
+                comment='Missing notes on the second call' if n % 3 else '',
+            )
+            for n in range(rows)
+        ], batch_size=1000)
+        CompleteClaim.objects.bulk_create([
+            CompleteClaim(casenum=f'C{n:07d}', user_id=users[n % techs], claim_time=now)
+            for n in range(rows // 10)
+        ], batch_size=1000)
+        ActiveClaim.objects.bulk_create([
+            ActiveClaim(casenum=f'A{n:07d}', user_id=users[n % techs])
+            for n in range(rows // 100)
+        ], batch_size=1000)
+        return lead
@@ -0,0 +1,79 @@
+"""
+Time each response renderer on a reviewedclaim/list/ payload.
+
+Creates N reviews inside a transaction that is rolled back at the end, so
+nothing is left in the database, serializes them once as list_reviewed_claims
+does, and renders that data with DRF's JSONRenderer and with every renderer
+in api.renderers whose library is installed.
+
+Usage:
+    python manage.py benchmark_renderers --rows 10000 --repeat 5
+"""
+
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from reviewedclaim.models import ReviewedClaim
+from reviewedclaim.serializers import ReviewedClaimSerializer
+
+STATUS_CYCLE = ['checked', 'checked', 'kudos', 'pingedlow', 'pingedmed', 'resolved']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON, orjson and MessagePack rendering of a large reviewed claim list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Reviewed claims in the payload (default: 10000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Renders per renderer; the best is reported (default: 5)')
+
+    def handle(self, *args, **options):
+        renderers = [('json', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', ORJSONRenderer()))
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+
+        with transaction.atomic():
+            self.create_reviews(options['rows'])
+            claims = ReviewedClaim.objects.order_by('-review_time', '-id')
+            data = {'count': options['rows'], 'results': ReviewedClaimSerializer(claims, many=True).data}
+
+            self.stdout.write(self.style.NOTICE(f"{options['rows']} reviewed claims, best of {options['repeat']}"))
+            baseline = None
+            for name, renderer in renderers:
+                best = None
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    body = renderer.render(data)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                baseline = baseline or best
+                self.stdout.write(
+                    f"  {name:8} {best * 1000:8.1f} ms  {len(body) / 1024:8.0f} KiB  {baseline / best:5.1f}x"
+                )
+
+            transaction.set_rollback(True)
+
+    def create_reviews(self, rows):
+        tech = User.objects.create(username='renderer-benchmark-tech', first_name='Bench', last_name='Tech')
+        lead = User.objects.create(username='renderer-benchmark-lead', first_name='Bench', last_name='Lead')
+        now = timezone.now()
+        ReviewedClaim.objects.bulk_create([
+            ReviewedClaim(
+                casenum=f'{n:08d}',
+                tech_id=tech,
+                lead_id=lead,
+                claim_time=now,
+                complete_time=now,
+                status=STATUS_CYCLE[n % len(STATUS_CYCLE)],
+                comment='Missing notes on the second call' if n % 3 else '',
+            )
+            for n in range(rows)
+        ], batch_size=1000)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviewedclaim', '0002_alter_reviewedclaim_lead_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewedclaim',
+            name='acknowledge_comment',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AlterField(
+            model_name='reviewedclaim',
+            name='status',
+            field=models.CharField(choices=[('checked', 'Checked'), ('done', 'Done'), ('pingedlow', 'Pinged - Low'), ('pingedmed', 'Pinged - Medium'), ('pingedhigh', 'Pinged - High'), ('acknowledged', 'Acknowledged'), ('resolved', 'Resolved'), ('kudos', 'Kudos')], max_length=255),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviewedclaim', '0003_reviewedclaim_acknowledge_comment_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reviewedclaim',
+            index=models.Index(fields=['casenum', 'review_time'], name='reviewed_casenum_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewedclaim',
+            index=models.Index(fields=['tech_id', 'status'], name='reviewed_tech_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewedclaim',
+            index=models.Index(fields=['review_time'], name='reviewed_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewedclaim',
+            index=models.Index(fields=['lead_id', 'review_time'], name='reviewed_lead_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewedclaim',
+            index=models.Index(fields=['status', 'review_time'], name='reviewed_status_time_idx'),
+        ),
+    ]
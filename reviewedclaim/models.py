@@ -27,6 +27,19 @@ class ReviewedClaim(models.Model):
     # Acknowledgment field (for ping workflow - optional comment when acknowledging)
     acknowledge_comment = models.TextField(blank=True, default='')
 
+    class Meta:
+        indexes = [
+            # caselookup: every probe by casenum, newest review first
+            models.Index(fields=['casenum', 'review_time'], name='reviewed_casenum_time_idx'),
+            # getpings / user stats: a tech's claims by status
+            models.Index(fields=['tech_id', 'status'], name='reviewed_tech_status_idx'),
+            # date windows, list ordering and keyset pagination on (review_time, id)
+            models.Index(fields=['review_time'], name='reviewed_time_idx'),
+            # lead stats: reviews given by a lead within a window
+            models.Index(fields=['lead_id', 'review_time'], name='reviewed_lead_time_idx'),
+            # ping stats: ping statuses within a window
+            models.Index(fields=['status', 'review_time'], name='reviewed_status_time_idx'),
+        ]
 
     def __str__(self):
         return f"ID: {self.pk}, Casenum: {self.casenum}, Tech: {self.tech_id.email}, Lead: {self.lead_id.email}, Claim Time: {self.claim_time}, Complete Time: {self.complete_time}, Review Time: {self.review_time}, Status: {self.status}, Comment: {self.comment}"
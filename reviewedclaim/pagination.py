@@ -0,0 +1,68 @@
+"""
+Keyset (cursor) pagination for ReviewedClaim listings.
+
+Pages are ordered newest first on (review_time, id). The continuation token
+is an opaque, URL-safe encoding of the last row's sort key, so fetching the
+next page is an indexed range scan instead of an ever-growing OFFSET.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+
+ORDERING = ('-review_time', '-id')
+
+# Largest limit a listing accepts
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(claim):
+    payload = json.dumps([claim.review_time.isoformat(), claim.pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Turn a continuation token back into (review_time, id)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        review_time, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(review_time), int(pk)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def keyset_page(queryset, cursor, limit):
+    """
+    Return (rows, next_cursor) for the page after cursor ('' for the first page).
+    next_cursor is None on the last page. limit must be at least 1.
+    """
+    queryset = queryset.order_by(*ORDERING)
+    if cursor:
+        review_time, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(review_time__lt=review_time) | Q(review_time=review_time, id__lt=pk)
+        )
+    # One extra row tells us whether another page exists without a COUNT
+    rows = list(queryset[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def cached_count(queryset, key):
+    """Exact count of queryset, reused for REVIEWED_COUNT_CACHE_TTL seconds."""
+    key = f'reviewedclaim:count:{key}'
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, getattr(settings, 'REVIEWED_COUNT_CACHE_TTL', 60))
+    return total
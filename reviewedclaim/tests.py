@@ -1,3 +1,91 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from reviewedclaim.models import ReviewedClaim
+from reviewedclaim.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+class CursorTest(TestCase):
+    def test_round_trip(self):
+        claim = ReviewedClaim(pk=42, review_time=timezone.now())
+        self.assertEqual(decode_cursor(encode_cursor(claim)), (claim.review_time, 42))
+
+    def test_garbage_rejected(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor')
+
+
+class ListReviewedClaimsPaginationTest(APITestCase):
+    def setUp(self):
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.lead)
+
+        now = timezone.now()
+        for i in range(25):
+            ReviewedClaim.objects.create(
+                casenum=f'{i:08d}', tech_id=self.lead, lead_id=self.lead,
+                claim_time=now, complete_time=now, status='checked', comment='',
+            )
+        # Force ties on review_time so the id tiebreak is exercised
+        ReviewedClaim.objects.filter(id__lte=ReviewedClaim.objects.order_by('id')[9].id).update(review_time=now)
+
+    def test_cursor_pages_match_offset_order(self):
+        expected = [c['id'] for c in self.client.get('/api/reviewedclaim/list/', {'limit': 100}).data['results']]
+
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get('/api/reviewedclaim/list/', {'cursor': cursor, 'limit': 7})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(c['id'] for c in response.data['results'])
+            cursor = response.data['next_cursor']
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 25)
+
+    def test_offset_still_supported(self):
+        response = self.client.get('/api/reviewedclaim/list/', {'limit': 10, 'offset': 20})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_cached_count(self):
+        cache.clear()
+        response = self.client.get('/api/reviewedclaim/list/', {'cursor': '', 'count': 'cached', 'user_id': self.lead.id})
+        self.assertEqual(response.data['count'], 25)
+        ReviewedClaim.objects.first().delete()
+        response = self.client.get('/api/reviewedclaim/list/', {'cursor': '', 'count': 'cached', 'user_id': self.lead.id})
+        self.assertEqual(response.data['count'], 25)
+
+    def test_cached_count_follows_sliding_days_window(self):
+        cache.clear()
+        params = {'cursor': '', 'count': 'cached', 'days': 7}
+        self.assertEqual(self.client.get('/api/reviewedclaim/list/', params).data['count'], 25)
+        ReviewedClaim.objects.first().delete()
+        later = timezone.now() + timedelta(minutes=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(self.client.get('/api/reviewedclaim/list/', params).data['count'], 24)
+
+    def test_invalid_limit_and_offset(self):
+        for params in ({'limit': 0}, {'limit': -1}, {'limit': 'ten'}, {'limit': 1001},
+                       {'offset': -1}, {'offset': 'ten'}, {'cursor': '', 'limit': 0}):
+            response = self.client.get('/api/reviewedclaim/list/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
 
-# Create your tests here.
+    def test_invalid_cursor(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/reviewedclaim/list/', {'cursor': 'bogus', 'count': 'exact'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
@@ -3,16 +3,23 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view
 
 from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from user.authentication import CachedTokenAuthentication
 from user.decorators import group_required, role_required, get_user_highest_role_level, ROLE_HIERARCHY
 
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Q
 
+from api.broadcast import PINGS, publish
+
 from reviewedclaim.models import ReviewedClaim
 from reviewedclaim.serializers import ReviewedClaimSerializer
+from reviewedclaim.pagination import MAX_PAGE_SIZE, ORDERING, InvalidCursor, cached_count, keyset_page
+from reports import rollup
+from caselookup import caseindex
 
 
 @api_view(['GET'])
@@ -22,6 +29,7 @@ def get_routes(request):
             'Endpoint': '/list/',
             'method': 'GET',
             'body': None,
+            'query_params': {'limit': 'N', 'offset': 'N', 'cursor': 'next_cursor from the previous page', 'count': 'exact | cached | none'},
             'description': 'Lists all reviewed claims.'
         },
         {
@@ -57,7 +65,7 @@ def get_routes(request):
     return Response(routes)
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def get_pings_for_user(request, pk):
     user =  User.objects.get(pk=pk)
@@ -83,7 +91,7 @@ def get_pings_for_user(request, pk):
 
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (hierarchical)
 def list_reviewed_claims(request):
@@ -94,8 +102,12 @@ def list_reviewed_claims(request):
       - days=N (last N days)
       - start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
       - user_id=N (filter by tech)
-      - limit=N (max results, default 100)
+      - limit=N (max results, 1 to MAX_PAGE_SIZE, default 100)
       - offset=N (for pagination)
+      - cursor=TOKEN (keyset pagination; pass an empty cursor for the first
+        page, then the returned next_cursor. Takes precedence over offset)
+      - count=exact|cached|none (total count mode; default exact with offset,
+        none with cursor)
     """
     from datetime import datetime as dt
     from django.utils import timezone as tz
@@ -106,9 +118,28 @@ def list_reviewed_claims(request):
     end_date_str = request.query_params.get('end_date')
     days_param = request.query_params.get('days')
     user_id = request.query_params.get('user_id')
-    limit = int(request.query_params.get('limit', 100))
-    offset = int(request.query_params.get('offset', 0))
+    cursor = request.query_params.get('cursor')
+    count_mode = request.query_params.get('count', 'exact' if cursor is None else 'none')
+    
+    try:
+        limit = int(request.query_params.get('limit', 100))
+        offset = int(request.query_params.get('offset', 0))
+    except ValueError:
+        limit = offset = None
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+        return Response(
+            {'error': f'limit must be an integer from 1 to {MAX_PAGE_SIZE} and offset an integer of at least 0'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if count_mode not in ('exact', 'cached', 'none'):
+        return Response(
+            {'error': 'count must be one of: exact, cached, none'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
+    # Part of the cached count key; days=N is a window that slides with now()
+    window = ''
     if start_date_str and end_date_str:
         try:
             range_start = tz.make_aware(dt.strptime(start_date_str, '%Y-%m-%d'))
@@ -121,21 +152,33 @@ def list_reviewed_claims(request):
     elif days_param:
         range_start = tz.now() - __import__('datetime').timedelta(days=int(days_param))
         claims = claims.filter(review_time__gte=range_start)
+        window = range_start.strftime('%Y-%m-%dT%H:%M')
     
     if user_id:
         claims = claims.filter(Q(tech_id=int(user_id)) | Q(lead_id=int(user_id)))
     
-    total_count = claims.count()
-    claims = claims.order_by('-review_time')[offset:offset + limit]
+    # Fetch the page first so a bad cursor is rejected before paying for a COUNT
+    if cursor is not None:
+        try:
+            page, next_cursor = keyset_page(claims, cursor, limit)
+        except InvalidCursor:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        page = claims.order_by(*ORDERING)[offset:offset + limit]
+    
+    data = {}
+    if count_mode == 'exact':
+        data['count'] = claims.count()
+    elif count_mode == 'cached':
+        data['count'] = cached_count(claims, f'{start_date_str}:{end_date_str}:{window}:{user_id}')
     
-    serializer = ReviewedClaimSerializer(claims, many=True)
-    return Response({
-        'count': total_count,
-        'results': serializer.data,
-    }, status=status.HTTP_200_OK)
+    if cursor is not None:
+        data['next_cursor'] = next_cursor
+    data['results'] = ReviewedClaimSerializer(page, many=True).data
+    return Response(data, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Tech')  # Tech and above (hierarchical)
 def acknowledge_ping(request, pk):
@@ -160,10 +203,29 @@ def acknowledge_ping(request, pk):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Update the claim
+        # Update the claim, unless its status changed since it was read
+        old_status = claim.status
         claim.status = 'acknowledged'
         claim.acknowledge_comment = request.data.get('acknowledge_comment', '')
-        claim.save()
+        with transaction.atomic():
+            updated = ReviewedClaim.objects.filter(pk=pk, status=old_status).update(
+                status=claim.status, acknowledge_comment=claim.acknowledge_comment
+            )
+            if not updated:
+                return Response(
+                    {'error': 'This ping was changed by another request.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            rollup.record_status_change(claim, old_status)
+            caseindex.sync_case(claim.casenum)
+        
+        # Notify the lead who raised the ping
+        publish({
+            "type": "reviewedclaim",
+            "event": "acknowledged",
+            "casenum": claim.casenum,
+            "user": request.user.username
+        }, PINGS, claim.lead_id_id)
         
         serializer = ReviewedClaimSerializer(claim)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -172,7 +234,7 @@ def acknowledge_ping(request, pk):
         return Response({'error': 'Ping not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (hierarchical)
 def resolve_ping(request, pk):
@@ -190,9 +252,25 @@ def resolve_ping(request, pk):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update the status to resolved
+        # Update the status to resolved, unless another request already did
         claim.status = 'resolved'
-        claim.save()
+        with transaction.atomic():
+            updated = ReviewedClaim.objects.filter(pk=pk, status='acknowledged').update(status=claim.status)
+            if not updated:
+                return Response(
+                    {'error': 'This ping was changed by another request.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            rollup.record_status_change(claim, 'acknowledged')
+            caseindex.sync_case(claim.casenum)
+        
+        # Notify the pinged tech
+        publish({
+            "type": "reviewedclaim",
+            "event": "resolved",
+            "casenum": claim.casenum,
+            "user": request.user.username
+        }, PINGS, claim.tech_id_id)
         
         serializer = ReviewedClaimSerializer(claim)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -202,7 +280,7 @@ def resolve_ping(request, pk):
 
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (hierarchical)
 def create_manual_ping(request):
@@ -257,16 +335,28 @@ def create_manual_ping(request):
     # Create the ping (as a ReviewedClaim)
     now = timezone.now()
     
-    ping = ReviewedClaim.objects.create(
-        casenum=casenum,
-        tech_id=tech,
-        lead_id=request.user,  # The lead creating the ping
-        claim_time=now,  # For manual pings, we use current time
-        complete_time=now,
-        review_time=now,  # Set review_time so it shows up with correct timestamp
-        status=severity,
-        comment=comment
-    )
+    with transaction.atomic():
+        ping = ReviewedClaim.objects.create(
+            casenum=casenum,
+            tech_id=tech,
+            lead_id=request.user,  # The lead creating the ping
+            claim_time=now,  # For manual pings, we use current time
+            complete_time=now,
+            review_time=now,  # Set review_time so it shows up with correct timestamp
+            status=severity,
+            comment=comment
+        )
+        rollup.record_review(ping)
+        caseindex.sync_case(ping.casenum)
+    
+    # Notify the pinged tech
+    publish({
+        "type": "reviewedclaim",
+        "event": "ping",
+        "casenum": ping.casenum,
+        "status": ping.status,
+        "user": request.user.username
+    }, PINGS, tech.id)
     
     serializer = ReviewedClaimSerializer(ping)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
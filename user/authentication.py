@@ -0,0 +1,93 @@
+import copy
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from user.cache import LRUCache
+
+
+# token key -> (user, token), shared by every request in this process.
+# Entries are evicted when the token is deleted or its user is saved
+# (see user.signals) and expire after TOKEN_CACHE_TTL regardless. Those
+# signals only reach this process, so a hit is still checked against the
+# database (see CachedTokenAuthentication).
+_token_cache = LRUCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 300),
+)
+
+
+def evict_token(key):
+    """Forget a cached token (call after deleting it)."""
+    _token_cache.delete(key)
+
+
+def evict_user_tokens(user_id):
+    """Forget every cached token belonging to a user."""
+    _token_cache.delete_where(lambda entry: entry[0].pk == user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers token -> user lookups in memory
+    instead of loading Token and User on every request.
+
+    A cached token is only trusted after an indexed check that it still
+    exists and its user is still active, so a token deleted (reset_password)
+    or a user deactivated by another server process stops working at once.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = _token_cache.get(key)
+        roles_version = None
+        if entry is not None:
+            # The same query fetches the RoleVersion get_user_group_names needs
+            versions = list(Token.objects.filter(key=key, user__is_active=True).values_list(
+                'user__role_version__version', flat=True,
+            )[:1])
+            if versions:
+                roles_version = versions[0] or 0
+            else:
+                evict_token(key)
+                entry = None
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            _token_cache.set(key, entry)
+        user, token = entry
+        # Hand each request its own instance so per-request state
+        # (e.g. memoized roles) never leaks into the cached one
+        user = copy.copy(user)
+        if roles_version is not None:
+            user._roles_version = roles_version
+        return user, token
+
+
+class QueryTokenAuthMiddleware(BaseMiddleware):
+    """
+    Sets scope['user'] for WebSocket connections opened with ?token=<key>,
+    since browsers cannot send an Authorization header on a WebSocket.
+    Connections without a valid token keep the session user (if any).
+
+    A token in the URL can end up in proxy access logs and browser history,
+    and it stays valid until the user resets their password. nginx logs /ws/
+    without the query string (nginx/caseflow.conf); browser clients that
+    already have a session cookie should connect without ?token= at all.
+    """
+
+    async def __call__(self, scope, receive, send):
+        keys = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        if keys:
+            try:
+                user, _ = await database_sync_to_async(
+                    CachedTokenAuthentication().authenticate_credentials
+                )(keys[-1])
+            except AuthenticationFailed:
+                pass
+            else:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
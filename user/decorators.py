@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.db.models import F
 from django.http import HttpResponseForbidden
 from django.contrib.auth.decorators import user_passes_test
 
+from user.cache import LRUCache
+from user.models import RoleVersion
+
 
 # Role hierarchy - higher number = higher permissions
 ROLE_HIERARCHY = {
@@ -10,10 +15,60 @@ ROLE_HIERARCHY = {
     'Manager': 4
 }
 
+# (user id, RoleVersion) -> frozenset of group names, shared by every request
+# in this process. A change to a user's groups bumps their RoleVersion in the
+# same transaction (see user.signals), so no process reuses the old entry
+# once it commits; ROLE_CACHE_TTL only bounds how long dead entries linger.
+_group_cache = LRUCache(
+    maxsize=getattr(settings, 'ROLE_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'ROLE_CACHE_TTL', 60),
+)
+
+
+def get_user_group_names(user):
+    """
+    Get the set of group names for a user.
+
+    Resolved at most once per request (memoized on the user object) and
+    backed by the process-wide role cache. A cache lookup costs one primary
+    key query for the user's RoleVersion, unless token authentication has
+    already fetched it.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    names = getattr(user, '_group_names', None)
+    if names is None:
+        version = getattr(user, '_roles_version', None)
+        if version is None:
+            version = get_roles_version(user.pk)
+        key = (user.pk, version)
+        names = _group_cache.get(key)
+        if names is None:
+            names = frozenset(user.groups.values_list('name', flat=True))
+            _group_cache.set(key, names)
+        user._group_names = names
+    return names
+
+
+def get_roles_version(user_id):
+    """The user's current RoleVersion (0 if their roles were never changed)."""
+    return RoleVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+
+
+def invalidate_user_roles(user_id):
+    """
+    Bump a user's RoleVersion (call after changing their groups, in the same
+    transaction), which invalidates their cached roles in every process.
+    """
+    _, created = RoleVersion.objects.get_or_create(user_id=user_id, defaults={'version': 1})
+    if not created:
+        RoleVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
+
 
 def get_user_highest_role_level(user):
     """Get the highest role level for a user based on hierarchy."""
-    user_groups = user.groups.values_list('name', flat=True)
+    user_groups = get_user_group_names(user)
     max_level = 0
     
     for group_name in user_groups:
@@ -33,7 +88,7 @@ def group_required(group_names):
             else:
                 groups = group_names
 
-            if not any(request.user.groups.filter(name=group).exists() for group in groups):
+            if get_user_group_names(request.user).isdisjoint(groups):
                 return HttpResponseForbidden("You do not have permission to access this page.")
             return view_func(request, *args, **kwargs)
         return _wrapped_view
@@ -0,0 +1,113 @@
+"""
+Time migrate_case_data on a synthetic dump: parsing alone (with the
+reference and the fast tokenizer), then the full import.
+
+Writes a dump with N CheckedClaims rows (plus Feedback for the pinged ones)
+to a temporary file and imports it inside a transaction that is rolled back
+at the end, so nothing is left in the database.
+
+Usage:
+    python manage.py benchmark_migrate_case_data --rows 1000000 --batch-size 2000 --workers 4
+"""
+
+import io
+import os
+import tempfile
+import time
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from user.models import UserProfile
+from user.sqldump import iter_rows, iter_rows_fast
+from reviewedclaim.models import ReviewedClaim
+
+STATUS_CYCLE = ['Checked', 'Checked', 'Done', 'Kudos', 'Pinged', 'Resolved']
+SEVERITY_CYCLE = ['low', 'moderate', 'severe']
+DISCORD_ID_BASE = 900000000000000000
+ROWS_PER_INSERT = 1000  # mysqldump's extended inserts hold many rows per statement
+
+
+class Command(BaseCommand):
+    help = 'Benchmark migrate_case_data on a synthetic SQL dump'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='CheckedClaims rows (default: 1000000)')
+        parser.add_argument('--techs', type=int, default=50, help='Number of synthetic techs (default: 50)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Import batch size (default: 2000)')
+        parser.add_argument('--workers', type=int, default=1, help='Fast parser processes (default: 1)')
+
+    def handle(self, *args, **options):
+        fd, path = tempfile.mkstemp(suffix='.sql')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                self.write_dump(f, options['rows'], options['techs'])
+            size = os.path.getsize(path)
+            self.stdout.write(self.style.NOTICE(
+                f"{options['rows']} CheckedClaims rows, {size / 1e6:.1f} MB dump, "
+                f"batch size {options['batch_size']}"
+            ))
+
+            workers = options['workers']
+            readers = [('reference', iter_rows), ('fast', iter_rows_fast)]
+            if workers > 1:
+                readers.append((f'fast, {workers} workers', partial(iter_rows_fast, workers=workers)))
+            for label, read_rows in readers:
+                start = time.perf_counter()
+                with open(path, 'rb') as f:
+                    parsed = sum(1 for _ in read_rows(f, ['CheckedClaims']))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"  parse ({label}): {elapsed:.1f}s ({parsed / elapsed:,.0f} rows/s)")
+
+            with transaction.atomic():
+                self.create_users(options['techs'])
+                output = io.StringIO()
+                start = time.perf_counter()
+                call_command(
+                    'migrate_case_data', path,
+                    batch_size=options['batch_size'], workers=workers, stdout=output, no_color=True,
+                )
+                elapsed = time.perf_counter() - start
+                imported = ReviewedClaim.objects.filter(casenum__startswith='B').count()
+                # The command's own rows/s covers the claim tables; elapsed adds
+                # the Feedback pass and the rollup/case index rebuilds.
+                self.stdout.write(f"  import: {elapsed:.1f}s in total, {imported} created")
+                for line in output.getvalue().splitlines():
+                    if line.startswith('  ReviewedClaim:') or line.startswith('  Total:'):
+                        self.stdout.write(self.style.SUCCESS(f"  {line.strip()}"))
+                transaction.set_rollback(True)
+        finally:
+            os.unlink(path)
+
+    def create_users(self, techs):
+        for t in range(techs):
+            user = User.objects.create(username=f'migrate-benchmark-{t}')
+            UserProfile.objects.create(user=user, discord_id=DISCORD_ID_BASE + t)
+
+    def write_dump(self, f, rows, techs):
+        f.write("-- Synthetic CaseClaim dump for benchmark_migrate_case_data\n\n")
+        feedback = []
+        for first in range(0, rows, ROWS_PER_INSERT):
+            values = []
+            for n in range(first, min(first + ROWS_PER_INSERT, rows)):
+                status = STATUS_CYCLE[n % len(STATUS_CYCLE)]
+                thread = 'NULL'
+                if status in ('Pinged', 'Resolved'):
+                    thread = str(n)
+                    feedback.append(
+                        f"({n},{n},'{SEVERITY_CYCLE[n % len(SEVERITY_CYCLE)]}',"
+                        f"'Case B{n:07d}: missing \\'notes\\', see thread')"
+                    )
+                day = f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}"
+                values.append(
+                    f"({n},'B{n:07d}',{DISCORD_ID_BASE + n % techs},{DISCORD_ID_BASE + (n + 1) % techs},"
+                    f"'{day} 09:00:00','{day} 10:00:00','{day} 11:00:00','{status}',{thread})"
+                )
+            f.write("INSERT INTO `CheckedClaims` VALUES\n" + ",\n".join(values) + ";\n")
+
+        # mysqldump writes tables alphabetically, so Feedback comes after CheckedClaims
+        for first in range(0, len(feedback), ROWS_PER_INSERT):
+            f.write("INSERT INTO `Feedback` VALUES\n" + ",\n".join(feedback[first:first + ROWS_PER_INSERT]) + ";\n")
@@ -7,159 +7,153 @@ Migrates:
   - ActiveClaims    -> ActiveClaim
   - Feedback        -> Used for ReviewedClaim comments
 
+The dump is streamed (see user.sqldump) rather than read into memory: one
+pass collects Feedback, a second imports the claim tables. Rows already in
+the database (or earlier in the dump) are skipped using key sets loaded up
+front, and new rows are written with bulk_create, --batch-size at a time,
+each batch in its own transaction.
+
+Each batch also records a CaseImportCheckpoint for its table (the byte
+offset just past its last row, and the rows read so far), committed with
+the batch. If an import dies, --resume seeks straight to the last
+checkpoint instead of reading and de-duplicating the rows already imported.
+A run without --resume starts over from the top and replaces the dump's
+checkpoints.
+
+Rows are read with sqldump.iter_rows_fast(), in --workers processes;
+--parser reference switches back to the character-by-character parser.
+
 Usage:
   python manage.py migrate_case_data path/to/dump.sql
   python manage.py migrate_case_data path/to/dump.sql --dry-run
+  python manage.py migrate_case_data path/to/dump.sql --batch-size 5000
+  python manage.py migrate_case_data path/to/dump.sql --resume
+  python manage.py migrate_case_data path/to/dump.sql --workers 4
 """
 
-import re
-from datetime import datetime
-from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
-from django.utils import timezone
-from user.models import UserProfile
+import os
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from user.models import CaseImportCheckpoint, UserProfile
+from user.sqldump import iter_rows, iter_rows_fast, parse_timestamp
 from reviewedclaim.models import ReviewedClaim
 from completeclaim.models import CompleteClaim
 from activeclaim.models import ActiveClaim
+from caselookup.caseindex import rebuild as rebuild_case_index
+from reports.rollup import rebuild as rebuild_review_rollup
+from events import changelog
 
 
-def parse_sql_values(sql_text, table_name):
-    """
-    Extract all INSERT rows for a given table from the SQL dump text.
-    Returns a list of tuples, where each tuple is one row of raw string values.
-    """
-    pattern = rf"INSERT INTO `{table_name}` VALUES\n"
-    rows = []
-
-    chunks = sql_text.split(f"INSERT INTO `{table_name}` VALUES\n")
-    if len(chunks) < 2:
-        return rows
+@contextmanager
+def historical_timestamps(*fields):
+    """Temporarily disable auto_now_add so imported rows keep their original times."""
+    originals = [(field, field.auto_now_add) for field in fields]
+    for field, _ in originals:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in originals:
+            field.auto_now_add = auto_now_add
 
-    for chunk in chunks[1:]:
-        # Everything up to the terminating semicolon
-        data_block = chunk.split(';\n')[0]
-        rows.extend(parse_value_rows(data_block))
 
-    return rows
-
-
-def parse_value_rows(data_block):
+class TableImport:
     """
-    Parse a block of SQL VALUES into a list of tuples.
-    Handles quoted strings with escaped characters, NULLs, and integers.
-    """
-    rows = []
-    i = 0
-    length = len(data_block)
-
-    while i < length:
-        # Find the start of a row
-        if data_block[i] == '(':
-            values, end_pos = parse_single_row(data_block, i + 1)
-            if values is not None:
-                rows.append(tuple(values))
-            i = end_pos + 1
-        else:
-            i += 1
+    Collects the new rows for one model and writes them in batches.
 
-    return rows
+    key(obj) identifies a duplicate: objects whose key is already in the
+    table (loaded once up front) or was seen earlier in the dump are skipped.
 
+    offset and rows track the position of the last row handed to add() (or
+    skipped before it); every flush stores them as the table's checkpoint,
+    unless dump (the checkpoint's dump identity fields) is None.
+    """
 
-def parse_single_row(text, start):
-    """Parse a single parenthesized row starting after the opening '('."""
-    values = []
-    i = start
-    length = len(text)
-
-    while i < length:
-        # Skip whitespace
-        while i < length and text[i] in (' ', '\t', '\n', '\r'):
-            i += 1
-
-        if i >= length:
-            break
-
-        if text[i] == ')':
-            return values, i
-
-        if text[i] == ',':
-            i += 1
-            continue
-
-        if text[i] == "'":
-            val, i = parse_quoted_string(text, i)
-            values.append(val)
-        elif text[i:i+4].upper() == 'NULL':
-            values.append(None)
-            i += 4
-        else:
-            # Numeric value
-            end = i
-            while end < length and text[end] not in (',', ')'):
-                end += 1
-            values.append(text[i:end].strip())
-            i = end
-
-    return values, i
-
-
-def parse_quoted_string(text, start):
-    """Parse a SQL quoted string starting at the opening quote."""
-    i = start + 1
-    length = len(text)
-    chars = []
-
-    while i < length:
-        ch = text[i]
-        if ch == '\\' and i + 1 < length:
-            next_ch = text[i + 1]
-            if next_ch == "'":
-                chars.append("'")
-            elif next_ch == '"':
-                chars.append('"')
-            elif next_ch == '\\':
-                chars.append('\\')
-            elif next_ch == 'n':
-                chars.append('\n')
-            elif next_ch == 'r':
-                chars.append('\r')
-            elif next_ch == 't':
-                chars.append('\t')
-            elif next_ch == '0':
-                chars.append('\0')
-            else:
-                chars.append(next_ch)
-            i += 2
-        elif ch == "'" and i + 1 < length and text[i + 1] == "'":
-            chars.append("'")
-            i += 2
-        elif ch == "'":
-            return ''.join(chars), i + 1
-        else:
-            chars.append(ch)
-            i += 1
-
-    return ''.join(chars), i
+    def __init__(self, command, model, table, key, existing_keys, batch_size, dump, resume_from=None):
+        self.command = command
+        self.model = model
+        self.table = table
+        self.key = key
+        self.keys = set(existing_keys)
+        self.batch_size = batch_size
+        self.dump = dump
+        self.dry_run = dump is None
+        self.pending = []
+        self.read = self.created = self.skipped = self.errors = 0
+        self.elapsed = 0.0
+        self.offset, self.rows = (resume_from.offset, resume_from.rows) if resume_from else (0, 0)
+        self.saved_offset = self.offset
+
+    def add(self, obj):
+        """Queue obj unless it is a duplicate. Returns whether it was queued."""
+        key = self.key(obj)
+        if key in self.keys:
+            self.skipped += 1
+            return False
+        self.keys.add(key)
+        if self.dry_run:
+            self.created += 1
+            return True
+        self.pending.append(obj)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write the queued rows and the checkpoint after them in one transaction."""
+        batch, self.pending = self.pending, []
+        if self.dry_run or (not batch and self.offset == self.saved_offset):
+            return
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(batch)
+                self.save_checkpoint()
+            self.created += len(batch)
+        except DatabaseError:
+            # Retry row by row so one bad row does not lose the whole batch
+            for obj in batch:
+                try:
+                    with transaction.atomic():
+                        self.model.objects.bulk_create([obj])
+                    self.created += 1
+                except DatabaseError as e:
+                    self.errors += 1
+                    if self.errors <= 10:
+                        self.command.stdout.write(self.command.style.ERROR(
+                            f"    Error on case {obj.casenum}: {str(e)}"
+                        ))
+            self.save_checkpoint()
 
+    def save_checkpoint(self):
+        CaseImportCheckpoint.objects.update_or_create(
+            dump=self.dump['dump'],
+            table=self.table,
+            defaults={**self.dump, 'offset': self.offset, 'rows': self.rows},
+        )
+        self.saved_offset = self.offset
 
-def parse_timestamp(ts_str):
-    """Parse a SQL timestamp string into a timezone-aware datetime."""
-    if ts_str is None:
-        return None
-    ts_str = ts_str.strip()
-    from datetime import timezone as dt_timezone
-    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f'):
-        try:
-            dt = datetime.strptime(ts_str, fmt)
-            return dt.replace(tzinfo=dt_timezone.utc)
-        except ValueError:
-            continue
-    return None
+    def summary(self, label):
+        rate = self.read / self.elapsed if self.elapsed else 0
+        return (
+            f"  {label}: {self.created} created, {self.skipped} skipped, {self.errors} errors "
+            f"({self.read} rows in {self.elapsed:.1f}s, {rate:,.0f} rows/s)"
+        )
 
 
 class Command(BaseCommand):
     help = 'Migrate case data from old CaseClaim Discord bot SQL dump to CaseClaimAPI'
 
+    # dump table -> (model, section heading)
+    TABLES = {
+        'CheckedClaims': (ReviewedClaim, 'CheckedClaims -> ReviewedClaim'),
+        'CompletedClaims': (CompleteClaim, 'CompletedClaims -> CompleteClaim'),
+        'ActiveClaims': (ActiveClaim, 'ActiveClaims -> ActiveClaim'),
+    }
+
     def add_arguments(self, parser):
         parser.add_argument('sql_file', type=str, help='Path to the SQL dump file')
         parser.add_argument(
@@ -167,38 +161,113 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be migrated without creating records',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows written per bulk insert and transaction (default: 2000)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue an interrupted import of this dump from its last checkpoint',
+        )
+        parser.add_argument(
+            '--parser',
+            choices=['fast', 'reference'],
+            default='fast',
+            help='Dump tokenizer: regex-based (default) or the original character-by-character one',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes the fast parser spreads each block of the dump over (default: 1)',
+        )
 
     def handle(self, *args, **options):
         sql_file = options['sql_file']
         dry_run = options['dry_run']
 
         self.stdout.write(self.style.NOTICE(
-            f"{'DRY RUN - ' if dry_run else ''}Loading SQL dump from: {sql_file}"
+            f"{'DRY RUN - ' if dry_run else ''}Streaming SQL dump from: {sql_file}"
         ))
 
-        with open(sql_file, 'r', encoding='utf-8') as f:
-            sql_text = f.read()
-
-        self.stdout.write("Parsing SQL dump...")
+        if options['parser'] == 'fast':
+            self.read_rows = partial(iter_rows_fast, workers=options['workers'])
+        else:
+            self.read_rows = iter_rows
+
+        # Checkpoints belong to this exact file; a changed dump starts over
+        stat = os.stat(sql_file)
+        dump = {
+            'dump': os.path.abspath(sql_file),
+            'dump_size': stat.st_size,
+            'dump_mtime': stat.st_mtime,
+        }
+        checkpoints = {}
+        if options['resume']:
+            checkpoints = self.load_checkpoints(dump)
+        elif not dry_run:
+            CaseImportCheckpoint.objects.filter(dump=dump['dump']).delete()
 
         # Build discord_id -> Django User mapping
         discord_to_user = self.build_user_mapping()
 
-        # Parse Feedback table for comments/severity
-        feedback_map = self.parse_feedback(sql_text)
-        self.stdout.write(f"  Parsed {len(feedback_map)} Feedback records")
+        with open(sql_file, 'rb') as f:
+            # Parse Feedback table for comments/severity
+            feedback_map = self.parse_feedback(f)
+            self.stdout.write(f"  Parsed {len(feedback_map)} Feedback records")
+
+            f.seek(0)
+            imports = self.migrate_claims(
+                f, discord_to_user, feedback_map, options['batch_size'],
+                None if dry_run else dump, checkpoints,
+            )
+
+        for table, (model, label) in self.TABLES.items():
+            self.stdout.write(self.style.SUCCESS(imports[table].summary(model.__name__)))
+
+        read = sum(table_import.read for table_import in imports.values())
+        elapsed = sum(table_import.elapsed for table_import in imports.values())
+        if elapsed:
+            self.stdout.write(self.style.SUCCESS(
+                f"  Total: {read} rows in {elapsed:.1f}s ({read / elapsed:,.0f} rows/s)"
+            ))
 
-        # Migrate CheckedClaims -> ReviewedClaim
-        self.migrate_reviewed_claims(sql_text, discord_to_user, feedback_map, dry_run)
+        # Imported claims bypass the views, so recompute the derived tables
+        if not dry_run:
+            self.stdout.write(self.style.NOTICE("\n--- Rebuilding daily review rollup ---"))
+            buckets = rebuild_review_rollup()
+            self.stdout.write(self.style.SUCCESS(f"  Rollup: {buckets} rows"))
 
-        # Migrate CompletedClaims -> CompleteClaim
-        self.migrate_complete_claims(sql_text, discord_to_user, dry_run)
+            self.stdout.write(self.style.NOTICE("\n--- Rebuilding case index ---"))
+            cases = rebuild_case_index()
+            self.stdout.write(self.style.SUCCESS(f"  Case index: {cases} cases"))
 
-        # Migrate ActiveClaims -> ActiveClaim
-        self.migrate_active_claims(sql_text, discord_to_user, dry_run)
+            # Versions handed out before the import no longer describe the queues
+            changelog.reset()
 
         self.stdout.write(self.style.SUCCESS("\nMigration complete!"))
 
+    def load_checkpoints(self, dump):
+        """The dump's checkpoints by table, checking they were taken from this file."""
+        checkpoints = {
+            checkpoint.table: checkpoint
+            for checkpoint in CaseImportCheckpoint.objects.filter(dump=dump['dump'])
+        }
+        for checkpoint in checkpoints.values():
+            if (checkpoint.dump_size, checkpoint.dump_mtime) != (dump['dump_size'], dump['dump_mtime']):
+                raise CommandError(
+                    f"{dump['dump']} has changed since it was checkpointed; "
+                    "run without --resume to import it from the start."
+                )
+        if not checkpoints:
+            self.stdout.write(self.style.WARNING("  No checkpoint for this dump; starting from the beginning."))
+        for table, checkpoint in checkpoints.items():
+            self.stdout.write(f"  Checkpoint: {table} row {checkpoint.rows} (byte {checkpoint.offset})")
+        return checkpoints
+
     def build_user_mapping(self):
         """Build a mapping from discord_id to Django User object."""
         mapping = {}
@@ -209,12 +278,11 @@ class Command(BaseCommand):
         self.stdout.write(f"  Built user mapping: {len(mapping)} discord_id -> User entries")
         return mapping
 
-    def parse_feedback(self, sql_text):
+    def parse_feedback(self, f):
         """Parse Feedback table into a dict: thread_id -> {severity, description}."""
         feedback_map = {}
-        rows = parse_sql_values(sql_text, 'Feedback')
 
-        for row in rows:
+        for _, row, _ in self.read_rows(f, ['Feedback']):
             # Feedback: (thread_id, message_id, severity, description)
             if len(row) < 4:
                 continue
@@ -273,244 +341,165 @@ class Command(BaseCommand):
             return feedback_map[ping_thread_id]['description']
         return ''
 
-    def migrate_reviewed_claims(self, sql_text, discord_to_user, feedback_map, dry_run):
-        """Migrate CheckedClaims -> ReviewedClaim."""
-        self.stdout.write(self.style.NOTICE("\n--- Migrating CheckedClaims -> ReviewedClaim ---"))
-
-        rows = parse_sql_values(sql_text, 'CheckedClaims')
-        self.stdout.write(f"  Parsed {len(rows)} CheckedClaims rows")
+    def migrate_claims(self, f, discord_to_user, feedback_map, batch_size, dump, checkpoints):
+        """
+        Stream the claim tables into their models, checkpointing into dump
+        (None for a dry run). Returns {table: TableImport}.
+        """
+        dry_run = dump is None
+        if not dry_run and ReviewedClaim.objects.exists():
+            self.stdout.write(self.style.WARNING(
+                "  WARNING: ReviewedClaim records already exist. "
+                "Skipping duplicates by casenum + tech + lead + claim_time."
+            ))
 
-        if not dry_run:
-            existing_count = ReviewedClaim.objects.count()
-            if existing_count > 0:
-                self.stdout.write(self.style.WARNING(
-                    f"  WARNING: {existing_count} ReviewedClaim records already exist. "
-                    "Skipping duplicates by casenum + tech + lead + claim_time."
-                ))
-
-        created = 0
-        skipped = 0
-        errors = 0
+        imports = {
+            'CheckedClaims': TableImport(
+                self, ReviewedClaim, 'CheckedClaims',
+                lambda rc: (rc.casenum, rc.tech_id_id, rc.lead_id_id, rc.claim_time),
+                ReviewedClaim.objects.values_list('casenum', 'tech_id', 'lead_id', 'claim_time').iterator(),
+                batch_size, dump, checkpoints.get('CheckedClaims'),
+            ),
+            'CompletedClaims': TableImport(
+                self, CompleteClaim, 'CompletedClaims',
+                lambda cc: (cc.casenum, cc.user_id_id),
+                CompleteClaim.objects.values_list('casenum', 'user_id').iterator(),
+                batch_size, dump, checkpoints.get('CompletedClaims'),
+            ),
+            'ActiveClaims': TableImport(
+                self, ActiveClaim, 'ActiveClaims',
+                lambda ac: ac.casenum,
+                ActiveClaim.objects.values_list('casenum', flat=True).iterator(),
+                batch_size, dump, checkpoints.get('ActiveClaims'),
+            ),
+        }
+        convert = {
+            'CheckedClaims': lambda row: self.reviewed_claim(row, discord_to_user, feedback_map),
+            'CompletedClaims': lambda row: self.complete_claim(row, discord_to_user),
+            'ActiveClaims': lambda row: self.active_claim(row, discord_to_user),
+        }
         unmapped_users = set()
-
-        # Temporarily disable auto_now_add on review_time so we can set historical values
-        review_time_field = ReviewedClaim._meta.get_field('review_time')
-        original_auto_now_add = review_time_field.auto_now_add
-        if not dry_run:
-            review_time_field.auto_now_add = False
-
-        try:
-            for row in rows:
-                # CheckedClaims: (checker_message_id, case_num, tech_id, lead_id,
-                #                  claim_time, complete_time, check_time, status, ping_thread_id)
-                if len(row) < 8:
-                    errors += 1
-                    continue
-
-                case_num = row[1]
-                tech_discord_id = int(row[2])
-                lead_discord_id = int(row[3])
-                claim_time = parse_timestamp(row[4])
-                complete_time = parse_timestamp(row[5])
-                check_time = parse_timestamp(row[6])
-                old_status = row[7]
-                ping_thread_id = int(row[8]) if row[8] is not None else None
-
-                # Map discord IDs to Django users
-                tech_user = discord_to_user.get(tech_discord_id)
-                lead_user = discord_to_user.get(lead_discord_id)
-
-                if not tech_user:
-                    unmapped_users.add(tech_discord_id)
-                    skipped += 1
-                    continue
-                if not lead_user:
-                    unmapped_users.add(lead_discord_id)
-                    skipped += 1
-                    continue
-
-                new_status = self.map_status(old_status, ping_thread_id, feedback_map)
-                comment = self.get_comment(ping_thread_id, feedback_map)
-
-                if dry_run:
-                    created += 1
-                    continue
-
-                # Check for duplicates
-                if ReviewedClaim.objects.filter(
-                    casenum=case_num,
-                    tech_id=tech_user,
-                    lead_id=lead_user,
-                    claim_time=claim_time,
-                ).exists():
-                    skipped += 1
-                    continue
-
+        current = None
+        started = time.perf_counter()
+
+        # Tables are dumped one after another, so everything before the
+        # furthest checkpoint has been imported; continue inside its statement.
+        within = None
+        if checkpoints:
+            latest = max(checkpoints.values(), key=lambda checkpoint: checkpoint.offset)
+            f.seek(latest.offset)
+            within = latest.table
+
+        with historical_timestamps(
+            ReviewedClaim._meta.get_field('review_time'),
+            CompleteClaim._meta.get_field('complete_time'),
+            ActiveClaim._meta.get_field('claim_time'),
+        ):
+            for table, row, end in self.read_rows(f, imports, within):
+                if table != current:
+                    self.finish_table(imports.get(current), started)
+                    current, started = table, time.perf_counter()
+                    self.stdout.write(self.style.NOTICE(f"\n--- Migrating {self.TABLES[table][1]} ---"))
+
+                table_import = imports[table]
+                table_import.read += 1
+                table_import.offset, table_import.rows = end, table_import.rows + 1
                 try:
-                    rc = ReviewedClaim(
-                        casenum=case_num,
-                        tech_id=tech_user,
-                        lead_id=lead_user,
-                        claim_time=claim_time,
-                        complete_time=complete_time,
-                        review_time=check_time,
-                        status=new_status,
-                        comment=comment,
-                        acknowledge_comment='',
-                    )
-                    rc.save()
-                    created += 1
-                except Exception as e:
-                    errors += 1
-                    if errors <= 10:
-                        self.stdout.write(self.style.ERROR(
-                            f"    Error on case {case_num}: {str(e)}"
-                        ))
-
-                if created % 1000 == 0 and created > 0:
-                    self.stdout.write(f"    ...created {created} records so far")
+                    obj = convert[table](row)
+                except (IndexError, TypeError, ValueError) as e:
+                    obj = None
+                    table_import.errors += 1
+                    if table_import.errors <= 10:
+                        self.stdout.write(self.style.ERROR(f"    Malformed {table} row {row[:2]}: {e}"))
+                if isinstance(obj, int):
+                    # An unmapped discord id
+                    unmapped_users.add(obj)
+                    table_import.skipped += 1
+                elif obj is not None and table_import.add(obj):
+                    if dry_run and table != 'CheckedClaims':
+                        self.stdout.write(
+                            f"    WOULD CREATE: {obj.__class__.__name__} {obj.casenum} (tech: {obj.user_id.username})"
+                        )
+                    if table == 'CheckedClaims' and table_import.created and table_import.created % 100000 == 0:
+                        self.stdout.write(f"    ...created {table_import.created} records so far")
+            self.finish_table(imports.get(current), started)
 
-        finally:
-            # Restore auto_now_add
-            review_time_field.auto_now_add = original_auto_now_add
-
-        self.stdout.write(self.style.SUCCESS(f"  ReviewedClaim: {created} created, {skipped} skipped, {errors} errors"))
         if unmapped_users:
             self.stdout.write(self.style.WARNING(
                 f"  Unmapped discord IDs (no Django user found): {unmapped_users}"
             ))
+        return imports
+
+    def finish_table(self, table_import, started):
+        if table_import is not None:
+            table_import.flush()
+            table_import.elapsed += time.perf_counter() - started
+
+    def reviewed_claim(self, row, discord_to_user, feedback_map):
+        """Build a ReviewedClaim from a CheckedClaims row (or return the unmapped discord id)."""
+        # CheckedClaims: (checker_message_id, case_num, tech_id, lead_id,
+        #                  claim_time, complete_time, check_time, status, ping_thread_id)
+        case_num = row[1]
+        tech_discord_id = int(row[2])
+        lead_discord_id = int(row[3])
+        ping_thread_id = int(row[8]) if row[8] is not None else None
+
+        # Map discord IDs to Django users
+        tech_user = discord_to_user.get(tech_discord_id)
+        if not tech_user:
+            return tech_discord_id
+        lead_user = discord_to_user.get(lead_discord_id)
+        if not lead_user:
+            return lead_discord_id
+
+        return ReviewedClaim(
+            casenum=case_num,
+            tech_id=tech_user,
+            lead_id=lead_user,
+            claim_time=parse_timestamp(row[4]),
+            complete_time=parse_timestamp(row[5]),
+            review_time=parse_timestamp(row[6]),
+            status=self.map_status(row[7], ping_thread_id, feedback_map),
+            comment=self.get_comment(ping_thread_id, feedback_map),
+            acknowledge_comment='',
+        )
 
-    def migrate_complete_claims(self, sql_text, discord_to_user, dry_run):
-        """Migrate CompletedClaims -> CompleteClaim."""
-        self.stdout.write(self.style.NOTICE("\n--- Migrating CompletedClaims -> CompleteClaim ---"))
-
-        rows = parse_sql_values(sql_text, 'CompletedClaims')
-        self.stdout.write(f"  Parsed {len(rows)} CompletedClaims rows")
-
-        created = 0
-        skipped = 0
-        errors = 0
+    def complete_claim(self, row, discord_to_user):
+        """Build a CompleteClaim from a CompletedClaims row."""
+        # CompletedClaims: (checker_message_id, case_num, tech_id, claim_time, complete_time)
+        case_num = row[1]
+        tech_discord_id = int(row[2])
 
-        # Temporarily disable auto_now_add on complete_time
-        complete_time_field = CompleteClaim._meta.get_field('complete_time')
-        original_auto_now_add = complete_time_field.auto_now_add
-        if not dry_run:
-            complete_time_field.auto_now_add = False
-
-        try:
-            for row in rows:
-                # CompletedClaims: (checker_message_id, case_num, tech_id, claim_time, complete_time)
-                if len(row) < 5:
-                    errors += 1
-                    continue
-
-                case_num = row[1]
-                tech_discord_id = int(row[2])
-                claim_time = parse_timestamp(row[3])
-                complete_time = parse_timestamp(row[4])
-
-                tech_user = discord_to_user.get(tech_discord_id)
-                if not tech_user:
-                    self.stdout.write(self.style.WARNING(
-                        f"    Skipping CompleteClaim {case_num}: tech discord_id {tech_discord_id} not found"
-                    ))
-                    skipped += 1
-                    continue
-
-                if dry_run:
-                    self.stdout.write(f"    WOULD CREATE: CompleteClaim {case_num} (tech: {tech_user.username})")
-                    created += 1
-                    continue
-
-                if CompleteClaim.objects.filter(casenum=case_num, user_id=tech_user).exists():
-                    self.stdout.write(f"    Skipping duplicate: {case_num}")
-                    skipped += 1
-                    continue
+        tech_user = discord_to_user.get(tech_discord_id)
+        if not tech_user:
+            self.stdout.write(self.style.WARNING(
+                f"    Skipping CompleteClaim {case_num}: tech discord_id {tech_discord_id} not found"
+            ))
+            return tech_discord_id
+
+        return CompleteClaim(
+            casenum=case_num,
+            user_id=tech_user,
+            lead_id=None,
+            claim_time=parse_timestamp(row[3]),
+            complete_time=parse_timestamp(row[4]),
+        )
 
-                try:
-                    cc = CompleteClaim(
-                        casenum=case_num,
-                        user_id=tech_user,
-                        lead_id=None,
-                        claim_time=claim_time,
-                        complete_time=complete_time,
-                    )
-                    cc.save()
-                    created += 1
-                    self.stdout.write(self.style.SUCCESS(
-                        f"    CREATED: CompleteClaim {case_num} (tech: {tech_user.username})"
-                    ))
-                except Exception as e:
-                    errors += 1
-                    self.stdout.write(self.style.ERROR(f"    Error on case {case_num}: {str(e)}"))
-
-        finally:
-            complete_time_field.auto_now_add = original_auto_now_add
-
-        self.stdout.write(self.style.SUCCESS(f"  CompleteClaim: {created} created, {skipped} skipped, {errors} errors"))
-
-    def migrate_active_claims(self, sql_text, discord_to_user, dry_run):
-        """Migrate ActiveClaims -> ActiveClaim."""
-        self.stdout.write(self.style.NOTICE("\n--- Migrating ActiveClaims -> ActiveClaim ---"))
-
-        rows = parse_sql_values(sql_text, 'ActiveClaims')
-        self.stdout.write(f"  Parsed {len(rows)} ActiveClaims rows")
-
-        created = 0
-        skipped = 0
-        errors = 0
-
-        # Temporarily disable auto_now_add on claim_time
-        claim_time_field = ActiveClaim._meta.get_field('claim_time')
-        original_auto_now_add = claim_time_field.auto_now_add
-        if not dry_run:
-            claim_time_field.auto_now_add = False
+    def active_claim(self, row, discord_to_user):
+        """Build an ActiveClaim from an ActiveClaims row."""
+        # ActiveClaims: (claim_message_id, case_num, tech_id, claim_time)
+        case_num = row[1]
+        tech_discord_id = int(row[2])
 
-        try:
-            for row in rows:
-                # ActiveClaims: (claim_message_id, case_num, tech_id, claim_time)
-                if len(row) < 4:
-                    errors += 1
-                    continue
-
-                case_num = row[1]
-                tech_discord_id = int(row[2])
-                claim_time = parse_timestamp(row[3])
-
-                tech_user = discord_to_user.get(tech_discord_id)
-                if not tech_user:
-                    self.stdout.write(self.style.WARNING(
-                        f"    Skipping ActiveClaim {case_num}: tech discord_id {tech_discord_id} not found"
-                    ))
-                    skipped += 1
-                    continue
-
-                if dry_run:
-                    self.stdout.write(f"    WOULD CREATE: ActiveClaim {case_num} (tech: {tech_user.username})")
-                    created += 1
-                    continue
-
-                if ActiveClaim.objects.filter(casenum=case_num).exists():
-                    self.stdout.write(f"    Skipping duplicate: {case_num}")
-                    skipped += 1
-                    continue
+        tech_user = discord_to_user.get(tech_discord_id)
+        if not tech_user:
+            self.stdout.write(self.style.WARNING(
+                f"    Skipping ActiveClaim {case_num}: tech discord_id {tech_discord_id} not found"
+            ))
+            return tech_discord_id
 
-                try:
-                    ac = ActiveClaim(
-                        casenum=case_num,
-                        user_id=tech_user,
-                        claim_time=claim_time,
-                    )
-                    ac.save()
-                    created += 1
-                    self.stdout.write(self.style.SUCCESS(
-                        f"    CREATED: ActiveClaim {case_num} (tech: {tech_user.username})"
-                    ))
-                except Exception as e:
-                    errors += 1
-                    self.stdout.write(self.style.ERROR(f"    Error on case {case_num}: {str(e)}"))
-
-        finally:
-            claim_time_field.auto_now_add = original_auto_now_add
-
-        self.stdout.write(self.style.SUCCESS(f"  ActiveClaim: {created} created, {skipped} skipped, {errors} errors"))
+        return ActiveClaim(
+            casenum=case_num,
+            user_id=tech_user,
+            claim_time=parse_timestamp(row[3]),
+        )
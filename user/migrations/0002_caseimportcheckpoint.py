@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dump', models.CharField(max_length=500)),
+                ('dump_size', models.BigIntegerField()),
+                ('dump_mtime', models.FloatField()),
+                ('table', models.CharField(max_length=64)),
+                ('offset', models.BigIntegerField()),
+                ('rows', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dump', 'table'), name='case_import_checkpoint_unique')],
+            },
+        ),
+    ]
@@ -19,3 +19,41 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f"Profile for {self.user.username} (Discord: {self.discord_id})"
+
+
+class RoleVersion(models.Model):
+    """
+    Counter bumped whenever a user's groups change. Every server process keys
+    its cached copy of the user's roles on it (see user.decorators), so a
+    change made through one process is seen by all of them at once. A user
+    without a row is at version 0.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='role_version')
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Roles of {self.user_id}: version {self.version}"
+
+
+class CaseImportCheckpoint(models.Model):
+    """
+    How far migrate_case_data got through one table of a dump: the byte
+    offset just past the last row of the last committed batch, and the
+    number of that table's rows read up to there. Written in the same
+    transaction as the batch, so --resume never skips an uncommitted row.
+    """
+    dump = models.CharField(max_length=500)
+    dump_size = models.BigIntegerField()
+    dump_mtime = models.FloatField()
+    table = models.CharField(max_length=64)
+    offset = models.BigIntegerField()
+    rows = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dump', 'table'], name='case_import_checkpoint_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.dump} {self.table}: {self.rows} rows, byte {self.offset}"
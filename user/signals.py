@@ -1,6 +1,10 @@
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, User
+from rest_framework.authtoken.models import Token
+
+from user.authentication import evict_token, evict_user_tokens
+from user.decorators import invalidate_user_roles
 
 
 @receiver(post_migrate)
@@ -10,3 +14,39 @@ def create_default_groups(sender, **kwargs):
         group, created = Group.objects.get_or_create(name=name)
         if created:
             print(f"Created group: {name}")
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_cached_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump RoleVersion whenever group membership changes (edit_user_roles, admin)."""
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_user_roles(instance.pk)
+    elif action == 'pre_clear':
+        # group.user_set.clear(): pk_set is not provided, so collect members first
+        for user_id in instance.user_set.values_list('pk', flat=True):
+            invalidate_user_roles(user_id)
+    else:
+        for user_id in pk_set or ():
+            invalidate_user_roles(user_id)
+
+
+@receiver(post_save, sender=User)
+def reset_cached_roles_for_new_user(sender, instance, created, **kwargs):
+    """A new user has no groups yet; never let a recycled id inherit cached roles."""
+    if created:
+        invalidate_user_roles(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def evict_cached_tokens_for_user(sender, instance, created, **kwargs):
+    """Password resets and deactivations must not be masked by the token cache."""
+    if not created:
+        evict_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """reset_password deletes and reissues tokens; the old key must stop working at once."""
+    evict_token(instance.key)
@@ -0,0 +1,429 @@
+"""
+Reading the old CaseClaim Discord bot's MySQL dump (see migrate_case_data).
+
+`iter_rows()` streams the INSERT rows of the requested tables from a file
+handle, one line at a time, so the dump never has to fit in memory and each
+row comes with the byte offset just past it. The parse_* functions below are
+the original whole-text parser; iter_rows() uses parse_single_row() and must
+produce the same rows as parse_sql_values().
+
+`iter_rows_fast()` yields exactly what iter_rows() does, but matches whole
+rows with byte regexes instead of walking them a character at a time, and
+can spread the work over a process pool. iter_rows() stays the reference it
+is tested against. Like evaluation.rendering, this module must not import
+Django: pool workers import it on their own.
+"""
+
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+INSERT_PREFIX = b'INSERT INTO `'
+VALUES_MARKER = b'` VALUES'
+
+# Bytes read at a time by iter_rows_fast(), per worker
+CHUNK_SIZE = 1 << 20
+
+
+def iter_rows(f, tables, within=None):
+    """
+    Yield (table, row, end) for every row of the INSERT statements of the
+    given tables, reading a dump opened in binary mode from its current
+    position. row is a tuple of raw values as parse_single_row() returns
+    them; end is the byte offset in the file just after the row.
+
+    Statements for other tables are skipped line by line without parsing.
+    To pick up in the middle of a statement, seek to a previously yielded
+    end and pass that row's table as within.
+    """
+    tables = set(tables)
+    offset = f.tell()
+    table = within    # table whose VALUES are being read
+    buf = ''          # text of that statement not yet parsed into rows
+    buf_start = offset  # byte offset of buf[0]
+
+    for line in f:
+        offset += len(line)
+        if table is None:
+            if not line.startswith(INSERT_PREFIX):
+                continue
+            name, found, rest = line[len(INSERT_PREFIX):].partition(VALUES_MARKER)
+            name = name.decode('utf-8')
+            if not found or name not in tables:
+                continue
+            table = name
+            buf = rest.decode('utf-8')
+            buf_start = offset - len(rest)
+        else:
+            buf += line.decode('utf-8')
+
+        # Parse every complete row in buf; a row cut off by the end of the
+        # line stays in buf until the next line arrives.
+        i = 0
+        n = len(buf)
+        consumed_bytes = 0  # bytes of buf[:consumed_chars]
+        consumed_chars = 0
+        while True:
+            while i < n and buf[i] != '(' and buf[i] != ';':
+                i += 1
+            if i >= n:
+                buf, buf_start = '', offset
+                break
+            if buf[i] == ';':
+                table, buf = None, ''
+                break
+            values, end = parse_single_row(buf, i + 1)
+            if end >= n:
+                consumed_bytes += len(buf[consumed_chars:i].encode('utf-8'))
+                buf, buf_start = buf[i:], buf_start + consumed_bytes
+                break
+            i = end + 1
+            consumed_bytes += len(buf[consumed_chars:i].encode('utf-8'))
+            consumed_chars = i
+            yield table, tuple(values), buf_start + consumed_bytes
+
+
+# A row exactly as mysqldump writes it: quoted strings, NULL and plain
+# numbers separated by bare commas. Strings are written as an unrolled loop,
+# so one that never closes fails in linear time. Rows in any other shape
+# (spaces, lower-case null, ...) go through parse_single_row().
+_STRING_BODY = r"[^'\\]*(?:(?:\\.|'')[^'\\]*)*"
+_NUMBER = r"-?[0-9]+(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?"
+_VALUE = rf"(?:'{_STRING_BODY}'|NULL|{_NUMBER})"
+_ROW_RE = re.compile(rf"\((?:{_VALUE}(?:,{_VALUE})*)?\)", re.S)
+# One (string, other) pair per value: other is '' for strings
+_VALUE_RE = re.compile(rf"'({_STRING_BODY})'|(NULL|{_NUMBER})", re.S)
+_ESCAPE_RE = re.compile(r"\\(.)|''", re.S)
+_ESCAPES = {"'": "'", '"': '"', '\\': '\\', 'n': '\n', 'r': '\r', 't': '\t', '0': '\0'}
+_GAP_RE = re.compile(r"[^(;]*")
+# Where a row probably starts; only trusted once the chunk before it parses
+# cleanly up to that point (see _parse_chunks).
+_SPLIT_RE = re.compile(rb"\),\s*\(")
+
+
+def _unescape(match):
+    char = match.group(1)
+    return "'" if char is None else _ESCAPES.get(char, char)
+
+
+def _row_values(text, start, end):
+    """The values of the row matched by _ROW_RE at text[start:end], as parse_single_row() returns them."""
+    values = _VALUE_RE.findall(text, start + 1, end - 1)
+    if text.find('\\', start, end) == -1 and text.find("''", start, end) == -1:
+        return tuple([(None if other == 'NULL' else other) if other else string for string, other in values])
+    return tuple([
+        (None if other == 'NULL' else other) if other else _ESCAPE_RE.sub(_unescape, string)
+        for string, other in values
+    ])
+
+
+def _decode(data, pos):
+    """
+    data[pos:] as text, leaving out a character cut off by the end of data
+    (any other invalid UTF-8 raises, as it does in iter_rows()).
+    """
+    try:
+        return data[pos:].decode('utf-8')
+    except UnicodeDecodeError as e:
+        if e.reason != 'unexpected end of data':
+            raise
+        return data[pos:pos + e.start].decode('utf-8')
+
+
+def _parse_rows(data, pos=0):
+    """
+    Parse the rows of a VALUES list in data (bytes) from pos, which must be
+    at a row boundary. Returns (rows, stop, closed): rows is a list of
+    (row, end) with byte offsets into data, and parsing stopped at stop,
+    either at the statement's ';' (closed) or at a row that is cut off by
+    the end of data.
+    """
+    text = _decode(data, pos)
+    n = len(text)
+    ascii = text.isascii()
+    # Byte offset of text[char_mark], for converting offsets in non-ASCII text
+    char_mark, byte_mark = 0, pos
+
+    def offset(i):
+        nonlocal char_mark, byte_mark
+        if ascii:
+            return pos + i
+        byte_mark += len(text[char_mark:i].encode('utf-8'))
+        char_mark = i
+        return byte_mark
+
+    rows = []
+    i = 0
+    while True:
+        i = _GAP_RE.match(text, i).end()
+        if i >= n:
+            return rows, offset(n), False
+        if text[i] == ';':
+            return rows, offset(i), True
+        match = _ROW_RE.match(text, i)
+        if match is not None:
+            end = match.end()
+            row = _row_values(text, i, end)
+        else:
+            values, end = parse_single_row(text, i + 1)
+            if end >= n:
+                return rows, offset(i), False
+            row = tuple(values)
+            end += 1
+        rows.append((row, offset(end)))
+        i = end
+
+
+def _parse_chunks(executor, data, pos, workers):
+    """
+    _parse_rows(data, pos), with data split into one chunk per worker.
+
+    Chunks are cut where a row looks like it starts. A chunk's rows are used
+    only if every chunk before it parsed up to its very end, which proves the
+    cut was a real row boundary and not, say, a "),(" inside a string;
+    otherwise the rest of data is parsed here, in this process.
+    """
+    size = (len(data) - pos) // workers
+    cuts = [pos]
+    for i in range(1, workers):
+        match = _SPLIT_RE.search(data, max(pos + i * size, cuts[-1] + 1))
+        if match is None:
+            break
+        cuts.append(match.end() - 1)
+    spans = list(zip(cuts, cuts[1:] + [len(data)]))
+
+    rows = []
+    results = executor.map(_parse_rows, [data[start:end] for start, end in spans])
+    for (start, end), (chunk_rows, stop, closed) in zip(spans, results):
+        rows.extend((row, start + row_end) for row, row_end in chunk_rows)
+        if closed:
+            return rows, start + stop, True
+        if start + stop < end:
+            rest, stop, closed = _parse_rows(data, start + stop)
+            return rows + rest, stop, closed
+    return rows, len(data), False
+
+
+def iter_rows_fast(f, tables, within=None, workers=1):
+    """
+    Same rows and offsets as iter_rows(f, tables, within), found faster.
+
+    Reads CHUNK_SIZE * workers bytes at a time. With workers > 1 each block
+    is parsed in a pool of that many processes.
+    """
+    tables = set(tables)
+    table = within
+    buf = b''
+    base = f.tell()     # file offset of buf[0]
+    pos = 0
+    skip_line = False   # discard the rest of the current line first
+    eof = False
+    executor = None
+    if workers > 1:
+        # spawn rather than fork, as evaluation.rendering does
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    try:
+        while True:
+            need_more = False
+            if table is None:
+                # Find the next line that starts a wanted INSERT statement
+                if skip_line:
+                    newline = buf.find(b'\n', pos)
+                    if newline == -1:
+                        pos = len(buf)
+                        need_more = True
+                    else:
+                        pos, skip_line = newline + 1, False
+                elif len(buf) - pos < len(INSERT_PREFIX) and not eof:
+                    need_more = True
+                elif buf.startswith(INSERT_PREFIX, pos):
+                    line_end = buf.find(b'\n', pos)
+                    marker = buf.find(VALUES_MARKER, pos + len(INSERT_PREFIX), len(buf) if line_end == -1 else line_end)
+                    if marker == -1 and line_end == -1 and not eof:
+                        need_more = True
+                    elif marker == -1:
+                        skip_line = True
+                    else:
+                        name = buf[pos + len(INSERT_PREFIX):marker].decode('utf-8')
+                        if name in tables:
+                            table, pos = name, marker + len(VALUES_MARKER)
+                        else:
+                            skip_line = True
+                else:
+                    header = buf.find(b'\n' + INSERT_PREFIX, pos)
+                    if header != -1:
+                        pos = header + 1
+                    else:
+                        # No header in buf; keep only its last (partial) line
+                        newline = buf.rfind(b'\n', pos)
+                        if newline == -1:
+                            skip_line = True
+                        else:
+                            pos = newline + 1
+                        need_more = True
+            else:
+                if executor is not None and len(buf) - pos >= CHUNK_SIZE:
+                    rows, stop, closed = _parse_chunks(executor, buf, pos, workers)
+                else:
+                    rows, stop, closed = _parse_rows(buf, pos)
+                for row, end in rows:
+                    yield table, row, base + end
+                pos = stop
+                if closed:
+                    table, skip_line = None, True
+                else:
+                    need_more = True
+
+            if need_more:
+                if eof:
+                    return
+                buf, base, pos = buf[pos:], base + pos, 0
+                block = f.read(CHUNK_SIZE * workers)
+                if block:
+                    buf += block
+                else:
+                    eof = True
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def parse_sql_values(sql_text, table_name):
+    """
+    Extract all INSERT rows for a given table from the SQL dump text.
+    Returns a list of tuples, where each tuple is one row of raw string values.
+    """
+    pattern = rf"INSERT INTO `{table_name}` VALUES\n"
+    rows = []
+
+    chunks = sql_text.split(f"INSERT INTO `{table_name}` VALUES\n")
+    if len(chunks) < 2:
+        return rows
+
+    for chunk in chunks[1:]:
+        # Everything up to the terminating semicolon
+        data_block = chunk.split(';\n')[0]
+        rows.extend(parse_value_rows(data_block))
+
+    return rows
+
+
+def parse_value_rows(data_block):
+    """
+    Parse a block of SQL VALUES into a list of tuples.
+    Handles quoted strings with escaped characters, NULLs, and integers.
+    """
+    rows = []
+    i = 0
+    length = len(data_block)
+
+    while i < length:
+        # Find the start of a row
+        if data_block[i] == '(':
+            values, end_pos = parse_single_row(data_block, i + 1)
+            if values is not None:
+                rows.append(tuple(values))
+            i = end_pos + 1
+        else:
+            i += 1
+
+    return rows
+
+
+def parse_single_row(text, start):
+    """Parse a single parenthesized row starting after the opening '('."""
+    values = []
+    i = start
+    length = len(text)
+
+    while i < length:
+        # Skip whitespace
+        while i < length and text[i] in (' ', '\t', '\n', '\r'):
+            i += 1
+
+        if i >= length:
+            break
+
+        if text[i] == ')':
+            return values, i
+
+        if text[i] == ',':
+            i += 1
+            continue
+
+        if text[i] == "'":
+            val, i = parse_quoted_string(text, i)
+            values.append(val)
+        elif text[i:i+4].upper() == 'NULL':
+            values.append(None)
+            i += 4
+        else:
+            # Numeric value
+            end = i
+            while end < length and text[end] not in (',', ')'):
+                end += 1
+            values.append(text[i:end].strip())
+            i = end
+
+    return values, i
+
+
+def parse_quoted_string(text, start):
+    """Parse a SQL quoted string starting at the opening quote."""
+    i = start + 1
+    length = len(text)
+    chars = []
+
+    while i < length:
+        ch = text[i]
+        if ch == '\\' and i + 1 < length:
+            next_ch = text[i + 1]
+            if next_ch == "'":
+                chars.append("'")
+            elif next_ch == '"':
+                chars.append('"')
+            elif next_ch == '\\':
+                chars.append('\\')
+            elif next_ch == 'n':
+                chars.append('\n')
+            elif next_ch == 'r':
+                chars.append('\r')
+            elif next_ch == 't':
+                chars.append('\t')
+            elif next_ch == '0':
+                chars.append('\0')
+            else:
+                chars.append(next_ch)
+            i += 2
+        elif ch == "'" and i + 1 < length and text[i + 1] == "'":
+            chars.append("'")
+            i += 2
+        elif ch == "'":
+            return ''.join(chars), i + 1
+        else:
+            chars.append(ch)
+            i += 1
+
+    return ''.join(chars), i
+
+
+def parse_timestamp(ts_str):
+    """Parse a SQL timestamp string into a timezone-aware datetime."""
+    if ts_str is None:
+        return None
+    ts_str = ts_str.strip()
+    if len(ts_str) == 19 and ts_str[10] == ' ':
+        # The dump's usual 'YYYY-MM-DD HH:MM:SS'; much faster than strptime
+        try:
+            return datetime.fromisoformat(ts_str).replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f'):
+        try:
+            dt = datetime.strptime(ts_str, fmt)
+            return dt.replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            continue
+    return None
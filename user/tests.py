@@ -1,3 +1,395 @@
+import io
+import os
+import random
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User, Group
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from rest_framework.authtoken.models import Token
+
+from activeclaim.models import ActiveClaim
+from completeclaim.models import CompleteClaim
+from evaluation.models import Evaluation
+from reviewedclaim.models import ReviewedClaim
+from user.authentication import _token_cache
+from user.decorators import _group_cache, get_user_highest_role_level, ROLE_HIERARCHY
+from user.management.commands.migrate_case_data import TableImport
+from user.models import CaseImportCheckpoint, RoleVersion, UserProfile
+from user import sqldump
+from user.sqldump import iter_rows, iter_rows_fast, parse_sql_values
+
+
+def _group_queries(queries):
+    return [q for q in queries if 'auth_user_groups' in q['sql']]
+
+
+class RoleCacheTest(TestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.user = User.objects.create_user(username='lead', password='pw')
+        self.user.groups.add(Group.objects.get(name='Lead'))
+
+    def test_memoized_per_user_object(self):
+        with self.assertNumQueries(2):  # RoleVersion, then groups
+            get_user_highest_role_level(self.user)
+            get_user_highest_role_level(self.user)
+
+    def test_shared_across_user_objects(self):
+        get_user_highest_role_level(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            level = get_user_highest_role_level(User(pk=self.user.pk))
+        self.assertEqual(level, ROLE_HIERARCHY['Lead'])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(_group_queries(ctx.captured_queries), [])
+
+    def test_invalidated_by_another_process(self):
+        # Another process changed the groups: its signal bumped RoleVersion
+        # in the database but never reached this process's cache
+        get_user_highest_role_level(self.user)
+        entries = dict(_group_cache._data)
+        self.user.groups.add(Group.objects.get(name='Manager'))
+        _group_cache._data.update(entries)
+
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_user_highest_role_level(fresh), ROLE_HIERARCHY['Manager'])
+
+    def test_invalidated_on_group_change(self):
+        get_user_highest_role_level(self.user)
+        self.user.groups.add(Group.objects.get(name='Manager'))
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_user_highest_role_level(fresh), ROLE_HIERARCHY['Manager'])
+
+        Group.objects.get(name='Manager').user_set.clear()
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_user_highest_role_level(fresh), ROLE_HIERARCHY['Lead'])
+
+
+class EditUserRolesCacheTest(APITestCase):
+    def setUp(self):
+        _group_cache.clear()
+        self.manager = User.objects.create_user(username='manager', password='pw')
+        self.manager.groups.add(Group.objects.get(name='Manager'))
+        self.tech = User.objects.create_user(username='tech', password='pw')
+        self.tech.groups.add(Group.objects.get(name='Tech'))
+        self.client = APIClient()
+
+    def test_edit_user_roles_invalidates_cache(self):
+        self.client.force_authenticate(user=User.objects.get(pk=self.tech.pk))
+        response = self.client.get('/api/completeclaim/list/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.manager)
+        response = self.client.post(f'/api/user/users/{self.tech.pk}/edit_roles/', {'roles': ['Lead']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=User.objects.get(pk=self.tech.pk))
+        response = self.client.get('/api/completeclaim/list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class RoleQueryBenchmark(APITestCase):
+    """
+    Group queries per request for a view that checks roles twice
+    (role_required + the evaluator/Manager check in update_evaluation).
+
+    Before the role cache: 2 group queries on every request.
+    After: 1 on the first request after a change, 0 afterwards.
+    """
+
+    def setUp(self):
+        _group_cache.clear()
+        self.lead = User.objects.create_user(username='lead', password='pw')
+        self.lead.groups.add(Group.objects.get(name='Lead'))
+        self.evaluation = Evaluation.objects.create(
+            tech=self.lead, evaluator=self.lead,
+            period_start=timezone.now().date(), period_end=timezone.now().date(),
+        )
+        self.client = APIClient()
+
+    def _request_group_queries(self):
+        # A fresh User instance per request, as token authentication would load
+        self.client.force_authenticate(user=User.objects.get(pk=self.lead.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(f'/api/evaluation/update/{self.evaluation.pk}/', {'strengths': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(_group_queries(ctx.captured_queries))
+
+    def test_group_queries_per_request(self):
+        self.assertEqual(self._request_group_queries(), 1)  # cold cache
+        self.assertEqual(self._request_group_queries(), 0)  # warm cache
+        self.assertEqual(self._request_group_queries(), 0)
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    def setUp(self):
+        _token_cache.clear()
+        self.user = User.objects.create_user(username='tech', password='oldpassword', email='tech@example.com')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _token_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/user/test_token/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+
+    def test_cached_token_carries_roles_version(self):
+        self.user.groups.add(Group.objects.get(name='Lead'))
+        self._token_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/completeclaim/list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in ctx.captured_queries if 'user_roleversion' in q['sql'] and 'authtoken_token' not in q['sql']])
+
+        # Demoted by another process: the next request sees it
+        User.groups.through.objects.filter(user=self.user).delete()
+        RoleVersion.objects.filter(user=self.user).update(version=F('version') + 1)
+        response = self.client.get('/api/completeclaim/list/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_token_lookup_cached(self):
+        # A miss loads the user; a hit only checks that the token is still valid
+        queries = self._token_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"auth_user"."password"', queries[0]['sql'])
+        queries = self._token_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"auth_user"."password"', queries[0]['sql'])
+
+    def test_cached_token_revoked_by_another_process(self):
+        # Writes that skip the signals, as another server process's would look here
+        self._token_queries()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get('/api/user/test_token/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self._token_queries()
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM authtoken_token WHERE key = %s', [self.token.key])
+        response = self.client.get('/api/user/test_token/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_token_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token not-a-real-token')
+        response = self.client.get('/api/user/test_token/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reset_password_evicts_old_token(self):
+        self._token_queries()
+        response = self.client.post('/api/user/reset-password/', {'new_password': 'newpassword'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/user/test_token/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.get(user=self.user).key}")
+        response = self.client.get('/api/user/test_token/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+SAMPLE_DUMP = (
+    "-- MySQL dump\n"
+    "INSERT INTO `ActiveClaims` VALUES\n"
+    "(11,'A0000001',9001,'2024-05-01 08:00:00');\n"
+    "INSERT INTO `CheckedClaims` VALUES\n"
+    "(1,'C0000001',9001,9002,'2024-05-01 08:00:00','2024-05-01 09:00:00','2024-05-01 10:00:00','Checked',NULL),"
+    "(2,'C0000002',9001,9002,'2024-05-01 08:00:00','2024-05-01 09:00:00','2024-05-01 10:00:00','Pinged',77),\n"
+    "(3,'C0000003',9001,9002,'2024-05-01 08:00:00',\n"
+    "'2024-05-01 09:00:00','2024-05-01 10:00:00','Kudos',NULL),\n"
+    "(4,'C0000004',9001,9999,'2024-05-01 08:00:00','2024-05-01 09:00:00','2024-05-01 10:00:00','Done',NULL);\n"
+    "INSERT INTO `CompletedClaims` VALUES\n"
+    "(21,'D0000001',9001,'2024-05-01 08:00:00','2024-05-01 09:00:00');\n"
+    "INSERT INTO `Feedback` VALUES\n"
+    "(77,78,'moderate','It\\'s (mostly) fine; \\\"see\\\" notes\\nline two, ''quoted'' é'),"
+    "(79,80,'low','split\n"
+    "across ) lines; (ok)');\n"
+)
+
+
+class SqlDumpStreamTest(TestCase):
+    def test_iter_rows_matches_whole_text_parser(self):
+        data = SAMPLE_DUMP.encode('utf-8')
+        tables = ['ActiveClaims', 'CheckedClaims', 'CompletedClaims', 'Feedback']
+        streamed = list(iter_rows(io.BytesIO(data), tables))
+
+        for table in tables:
+            self.assertEqual(
+                [row for name, row, _ in streamed if name == table],
+                parse_sql_values(SAMPLE_DUMP, table),
+            )
+        self.assertEqual(streamed[-2][1][3], 'It\'s (mostly) fine; "see" notes\nline two, \'quoted\' é')
+        self.assertEqual(streamed[-1][1][3], 'split\nacross ) lines; (ok)')
+
+        # Each offset is the byte just past the row's closing parenthesis
+        for _, _, end in streamed:
+            self.assertEqual(data[end - 1:end], b')')
+
+    def test_iter_rows_skips_other_tables(self):
+        rows = list(iter_rows(io.BytesIO(SAMPLE_DUMP.encode('utf-8')), ['CompletedClaims']))
+        self.assertEqual([row[1] for _, row, _ in rows], ['D0000001'])
+
+
+# Strings that trip up tokenizers: every escape, doubled quotes, row and
+# statement delimiters inside strings, raw newlines and multi-byte text.
+TRICKY_STRINGS = [
+    "", "plain", "it\\'s", "it''s", "''", "\\''", "\\\\", "\\\\'", "a\\\\\\'b",
+    "\\n\\r\\t\\0\\\"\\x\\%\\_", "\\\n", "raw\nnewline\r\n", "),(", "'),('", "\\'),(\\'",
+    ");\nINSERT INTO `CheckedClaims` VALUES\n(", ";", ";\n", "NULL", "null", "é ✓ 🎉", "\\é",
+]
+# Values the fast tokenizer hands to parse_single_row() instead
+ODD_VALUES = ["null", " 'x' ", "1 2", "NULLX", "", "- 1", "'a' 'b'", "NULL'x'", "\t7\r"]
+
+
+def _tricky_dump(seed):
+    rng = random.Random(seed)
+    lines = ["-- dump\n", "INSERT INTO `Other` VALUES ('x),(', 1);\n"]
+    for _ in range(6):
+        rows = []
+        for _ in range(rng.randint(0, 8)):
+            values = []
+            for _ in range(rng.randint(0, 5)):
+                kind = rng.random()
+                if kind < 0.6:
+                    values.append("'" + rng.choice(TRICKY_STRINGS) + rng.choice(TRICKY_STRINGS) + "'")
+                elif kind < 0.7:
+                    values.append('NULL')
+                elif kind < 0.9:
+                    values.append(rng.choice(['0', '-12', '3.25', '1e5', '123456789012345678']))
+                else:
+                    values.append(rng.choice(ODD_VALUES))
+            rows.append('(' + ','.join(values) + ')')
+        table = rng.choice(['CheckedClaims', 'Feedback', 'Other'])
+        lines.append(
+            f"INSERT INTO `{table}` VALUES" + rng.choice(['\n', ' '])
+            + rng.choice([',', ',\n', ', ']).join(rows) + rng.choice([';\n', ';', '; -- done\n', '\n'])
+        )
+    return ''.join(lines).encode('utf-8')
+
+
+class SqlDumpTokenizerTest(TestCase):
+    """iter_rows_fast() against the reference iter_rows(), rows and offsets."""
+
+    tables = ['CheckedClaims', 'Feedback']
+
+    def assertSameRows(self, data, within=None, start=0, **kwargs):
+        reference = io.BytesIO(data)
+        reference.seek(start)
+        fast = io.BytesIO(data)
+        fast.seek(start)
+        self.assertEqual(
+            list(iter_rows_fast(fast, self.tables, within, **kwargs)),
+            list(iter_rows(reference, self.tables, within)),
+        )
+
+    def test_tricky_strings(self):
+        for seed in range(200):
+            with self.subTest(seed=seed):
+                self.assertSameRows(_tricky_dump(seed))
+
+    def test_block_boundaries(self):
+        # Tiny blocks cut rows, strings, headers and characters at every point
+        for chunk_size in (1, 2, 3, 7, 64):
+            with mock.patch.object(sqldump, 'CHUNK_SIZE', chunk_size):
+                for seed in range(20):
+                    with self.subTest(chunk_size=chunk_size, seed=seed):
+                        self.assertSameRows(_tricky_dump(seed))
+
+    def test_resume_inside_statement(self):
+        data = _tricky_dump(7)
+        for table, _, end in list(iter_rows(io.BytesIO(data), self.tables)):
+            self.assertSameRows(data, within=table, start=end)
+
+    def test_workers(self):
+        # Small blocks split between workers, with cuts falling inside strings
+        data = b''.join(_tricky_dump(seed) for seed in range(30))
+        with mock.patch.object(sqldump, 'CHUNK_SIZE', 300):
+            self.assertSameRows(data, workers=3)
+
+    def test_sample_dump(self):
+        self.assertSameRows(SAMPLE_DUMP.encode('utf-8'))
+
+
+class MigrateCaseDataTest(TestCase):
+    def setUp(self):
+        for discord_id in (9001, 9002):
+            user = User.objects.create(username=f'discord-{discord_id}')
+            UserProfile.objects.create(user=user, discord_id=discord_id)
+        fd, self.path = tempfile.mkstemp(suffix='.sql')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_DUMP)
+        self.addCleanup(os.unlink, self.path)
+
+    def migrate(self, **options):
+        output = io.StringIO()
+        call_command('migrate_case_data', self.path, stdout=output, no_color=True, **{'batch_size': 2, **options})
+        return output.getvalue()
+
+    def test_import(self):
+        self.migrate()
+
+        self.assertEqual(
+            sorted(ReviewedClaim.objects.values_list('casenum', 'status')),
+            [('C0000001', 'checked'), ('C0000002', 'pingedmed'), ('C0000003', 'kudos')],
+        )
+        pinged = ReviewedClaim.objects.get(casenum='C0000002')
+        self.assertTrue(pinged.comment.startswith("It's (mostly) fine"))
+        self.assertEqual(pinged.review_time.isoformat(), '2024-05-01T10:00:00+00:00')
+        self.assertEqual(CompleteClaim.objects.get().casenum, 'D0000001')
+        self.assertEqual(ActiveClaim.objects.get().casenum, 'A0000001')
+
+    def test_rerun_skips_existing_rows(self):
+        self.migrate()
+        self.migrate()
+
+        self.assertEqual(ReviewedClaim.objects.count(), 3)
+        self.assertEqual(CompleteClaim.objects.count(), 1)
+        self.assertEqual(ActiveClaim.objects.count(), 1)
+
+    def test_resume_after_crash(self):
+        save_checkpoint = TableImport.save_checkpoint
+        calls = []
+
+        def crash_on_third_batch(table_import):
+            calls.append(table_import.table)
+            if len(calls) == 3:
+                raise RuntimeError('killed')
+            save_checkpoint(table_import)
+
+        # One row per batch: ActiveClaims, then the first CheckedClaims row
+        # commit, and the process dies while writing the second.
+        with mock.patch.object(TableImport, 'save_checkpoint', crash_on_third_batch):
+            with self.assertRaises(RuntimeError):
+                self.migrate(batch_size=1)
+        self.assertEqual(list(ReviewedClaim.objects.values_list('casenum', flat=True)), ['C0000001'])
+        checkpoint = CaseImportCheckpoint.objects.get(table='CheckedClaims')
+        self.assertEqual(checkpoint.rows, 1)
+
+        output = self.migrate(batch_size=1, resume=True)
+
+        self.assertIn('Checkpoint: CheckedClaims row 1', output)
+        self.assertIn('ReviewedClaim: 2 created, 1 skipped, 0 errors (3 rows', output)
+        self.assertIn('ActiveClaim: 0 created, 0 skipped, 0 errors (0 rows', output)
+        self.assertEqual(ReviewedClaim.objects.count(), 3)
+        self.assertEqual(CompleteClaim.objects.count(), 1)
+        self.assertEqual(ActiveClaim.objects.count(), 1)
+        self.assertEqual(CaseImportCheckpoint.objects.get(table='CheckedClaims').rows, 4)
+
+    def test_resume_rejects_changed_dump(self):
+        self.migrate()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('-- appended\n')
 
-# Create your tests here.
+        with self.assertRaises(CommandError):
+            self.migrate(resume=True)
@@ -4,12 +4,13 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 
 from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from django.contrib.auth.models import User, Group
 from django.shortcuts import get_object_or_404
 
+from user.authentication import CachedTokenAuthentication
 from user.decorators import group_required, role_required
 
 from .serializers import UserSerializer
@@ -48,7 +49,7 @@ def get_routes(request):
     return Response(routes)
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def get_roles(request):
     roles = Group.objects.all()
@@ -56,7 +57,7 @@ def get_roles(request):
     return Response(serializer.data)
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def list_users(request):
     users = User.objects.all()
@@ -64,7 +65,7 @@ def list_users(request):
     return Response(serializer.data)
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 @role_required('Lead')  # Lead and above (Lead, Phone Analyst, Manager)
 def edit_user_roles(request, pk):
@@ -132,7 +133,7 @@ def signup(request):
 
 
 @api_view(['POST'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def reset_password(request):
     """
@@ -172,7 +173,7 @@ def reset_password(request):
     })
 
 @api_view(['GET'])
-@authentication_classes([SessionAuthentication, TokenAuthentication])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def test_token(request):
     return Response({f"passed for {request.user.email}"})
@@ -1,16 +1,48 @@
 import websockets
 import asyncio
+import json
+import os
 import threading
+from collections import deque
 
 
 WS_URL = "ws://localhost:8000/ws/caseflow/"
+# API token from /api/user/login/; without one only claim queue events arrive
+TOKEN = os.environ.get("CASEFLOW_TOKEN")
+# Events from different server processes can arrive slightly out of seq
+# order, so resume from the oldest of the last few seen, not the newest
+RESUME_WINDOW = 100
 
 async def listen_ws():
-    async with websockets.connect(WS_URL) as ws:
-        print(f"Connected to WebSocket {WS_URL}")
-        while True:
-            msg = await ws.recv()
-            print("Update:", msg)
+    recent = deque(maxlen=RESUME_WINDOW)
+    while True:
+        # Resume from a recent event so nothing is missed across reconnects;
+        # the replay repeats some events, which are skipped by seq below
+        last_seq = min(recent) if recent else None
+        params = []
+        if TOKEN:
+            params.append(f"token={TOKEN}")
+        if last_seq is not None:
+            params.append(f"last_seq={last_seq}")
+        url = f"{WS_URL}?{'&'.join(params)}" if params else WS_URL
+        try:
+            async with websockets.connect(url) as ws:
+                print(f"Connected to WebSocket {url}")
+                while True:
+                    msg = await ws.recv()
+                    frame = json.loads(msg)
+                    if frame.get("type") == "resync":
+                        print("Too far behind; re-fetch the lists")
+                        recent.clear()
+                    for event in frame.get("events", [frame]):
+                        if "seq" in event:
+                            if event["seq"] in recent:
+                                continue
+                            recent.append(event["seq"])
+                        print("Update:", event)
+        except (OSError, websockets.ConnectionClosed):
+            print("Disconnected, retrying...")
+            await asyncio.sleep(1)
 
 def start_ws_listener():
     asyncio.run(listen_ws())
@@ -20,4 +52,4 @@ if __name__ == "__main__":
 
     while True:
         input("Press enter to disconnect\n")
-        break
\ No newline at end of file
+        break
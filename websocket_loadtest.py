@@ -0,0 +1,90 @@
+"""
+Load test for the ws/caseflow/ broadcast.
+
+Connects N in-process clients to the Consumer, publishes a stream of claim
+events the way the views do, and reports frames/sec delivered and CPU use,
+first with batching off (CASEFLOW_BATCH_WINDOW=0) and then with the given
+window.
+
+Events are stored (and pruned) in a throwaway test database created for the
+run, never in the configured one.
+
+Usage:
+    SECRET_KEY=x DEBUG=true python websocket_loadtest.py --clients 200 --events 500 --rate 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+django.setup()
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test import override_settings
+
+from api.broadcast import CLAIMS, publish
+from api.consumers import Consumer
+
+
+async def run(clients, events, rate, window):
+    with override_settings(CASEFLOW_BATCH_WINDOW=window):
+        communicators = [WebsocketCommunicator(Consumer.as_asgi(), '/ws/caseflow/') for _ in range(clients)]
+        for communicator in communicators:
+            await communicator.connect()
+
+        frames = 0
+
+        async def read(communicator):
+            nonlocal frames
+            received = 0
+            while received < events:
+                text = await communicator.receive_from(timeout=30)
+                frames += 1
+                received += text.count('"casenum"')
+
+        readers = [asyncio.ensure_future(read(c)) for c in communicators]
+        wall, cpu = time.perf_counter(), time.process_time()
+        for i in range(events):
+            await sync_to_async(publish)({
+                "type": "activeclaim",
+                "event": "claim",
+                "casenum": f"{i:08d}",
+                "user": "loadtest"
+            }, CLAIMS)
+            await asyncio.sleep(1 / rate)
+        await asyncio.gather(*readers)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+        for communicator in communicators:
+            await communicator.disconnect()
+    return frames, wall, cpu
+
+
+async def main(args):
+    print(f"{args.clients} clients, {args.events} events at {args.rate}/s")
+    print(f"{'window':>8}{'frames':>10}{'frames/s':>12}{'cpu s':>9}{'cpu %':>8}")
+    for window in (0, args.window):
+        frames, wall, cpu = await run(args.clients, args.events, args.rate, window)
+        print(f"{window * 1000:>6.0f}ms{frames:>10}{frames / wall:>12.0f}{cpu:>9.2f}{cpu / wall:>8.0%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=100, help='Connected clients (default: 100)')
+    parser.add_argument('--events', type=int, default=200, help='Events to publish (default: 200)')
+    parser.add_argument('--rate', type=float, default=100, help='Events published per second (default: 100)')
+    parser.add_argument('--window', type=float, default=0.05, help='Batch window in seconds (default: 0.05)')
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        asyncio.run(main(args))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)